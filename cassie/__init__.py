@@ -1,5 +1,55 @@
-from cassie.build_xanthos_configs import *
-from cassie.build_cassandra_configs import *
-from cassie.build_job_scripts import *
+import importlib
+import sys
+import types
 
-__all__ = ['build_xanthos_configs', 'build_cassandra_configs', 'build_job_scripts']
+
+# public names and the submodule that provides each; submodules are only imported when a name is first used so
+# that `import cassie` stays fast and heavy dependencies (e.g., configobj) are only loaded when needed
+LAZY_ATTRIBUTES = {'build_xanthos_configs': 'cassie.build_xanthos_configs',
+                   'iter_xanthos_configs': 'cassie.build_xanthos_configs',
+                   'build_cassandra_configs': 'cassie.build_cassandra_configs',
+                   'BuildCassandraConfigs': 'cassie.build_cassandra_configs',
+                   'build_job_scripts': 'cassie.build_job_scripts',
+                   'iter_job_scripts': 'cassie.build_job_scripts',
+                   'build_study': 'cassie.pipeline',
+                   'Study': 'cassie.pipeline',
+                   'Template': 'cassie.template'}
+
+__all__ = ['build_xanthos_configs', 'build_cassandra_configs', 'build_job_scripts', 'iter_xanthos_configs',
+           'iter_job_scripts', 'build_study']
+
+
+class LazyModule(types.ModuleType):
+    """Package module type that keeps builder functions from being shadowed by their submodules.
+
+    Importing a submodule sets it as an attribute of the package.  Several builder functions share the name of the
+    submodule that defines them (e.g., `cassie.build_xanthos_configs`), so the function is kept in place of the
+    submodule to preserve `cassie.build_xanthos_configs(...)`.
+
+    """
+
+    def __setattr__(self, name, value):
+
+        if isinstance(value, types.ModuleType) and LAZY_ATTRIBUTES.get(name) == value.__name__:
+            value = getattr(value, name)
+
+        super().__setattr__(name, value)
+
+
+def __getattr__(name):
+
+    if name not in LAZY_ATTRIBUTES:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+    value = getattr(importlib.import_module(LAZY_ATTRIBUTES[name]), name)
+
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(LAZY_ATTRIBUTES))
+
+
+sys.modules[__name__].__class__ = LazyModule
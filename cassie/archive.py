@@ -0,0 +1,213 @@
+import argparse
+import io
+import json
+import math
+import os
+import tarfile
+import time
+from functools import partial
+
+from cassie.emit import EmitError, content_hash, map_chunks, render_chunk
+from cassie.instrument import clock, count, lap, stage
+
+
+# suffix added to the archive file name for the offset index
+INDEX_SUFFIX = '.index.json'
+
+# tar block size; member content is padded to a multiple of this
+BLOCK_SIZE = tarfile.BLOCKSIZE
+
+
+def index_file(archive_file):
+    """Get the full path to the offset index of an archive."""
+
+    return f"{archive_file}{INDEX_SUFFIX}"
+
+
+def write_archive(render, members, archive_file, workers=None, backend='thread', profile=None):
+    """Render one file per (model, scenario, task) member and write them all into a single uncompressed tar archive.
+
+    An offset index is written next to the archive as `<archive>.index.json`.  It records the member name, byte
+    offset, and size of every member so that a single member can be read with one seek instead of scanning the
+    archive.  Rendering may run in parallel; members are always written to the archive in order.
+
+    :param render:                      Callable taking a member and returning a (file name, text) tuple.  Must be
+                                        picklable when using the 'process' backend.
+    :type render:                       callable
+
+    :param members:                     Iterable of (model, scenario, task) members
+    :type members:                      iterable
+
+    :param archive_file:                Full path with file name and extension to the tar archive to write
+    :type archive_file:                 str
+
+    :param workers:                     Number of parallel workers used to render.  None or 1 renders serially.
+    :type workers:                      int
+
+    :param backend:                     Either 'thread' or 'process'
+    :type backend:                      str
+
+    :param profile:                     Optional Profile to record stage timings, counters, and progress into
+    :type profile:                      cassie.instrument.Profile
+
+    :return:                            List of (member, file name, content hash, written) records
+
+    :raises EmitError:                  If any member could not be rendered
+
+    """
+
+    records = []
+    index = []
+    failures = []
+    mtime = int(time.time())
+
+    render_chunks = partial(render_chunk, render, timed=profile is not None)
+    chunk_size = profile.progress_every if profile is not None else None
+
+    with tarfile.open(archive_file, 'w', format=tarfile.PAX_FORMAT) as tar:
+
+        for rendered, chunk_failures, timings in map_chunks(render_chunks, members, workers, backend, chunk_size):
+
+            failures.extend(chunk_failures)
+
+            for member, file_name, text in rendered:
+
+                model, scenario, task = member
+
+                content = text.encode()
+
+                info = tarfile.TarInfo(file_name)
+                info.size = len(content)
+                info.mtime = mtime
+                info.mode = 0o644
+
+                start = clock()
+
+                tar.addfile(info, io.BytesIO(content))
+
+                start = lap('write', start)
+
+                # content ends at the current offset once padded to a full block
+                offset = tar.offset - math.ceil(info.size / BLOCK_SIZE) * BLOCK_SIZE
+
+                index.append([model, scenario, task, file_name, offset, info.size])
+                records.append((member, file_name, content_hash(text), True))
+
+                lap('hash', start)
+
+                count('files')
+                count('bytes', info.size)
+
+            if profile is not None:
+                profile.merge(timings)
+                profile.advance(len(rendered) + len(chunk_failures))
+
+    with stage('manifest'):
+        with open(index_file(archive_file), 'w') as out:
+            json.dump({'archive': os.path.basename(archive_file), 'members': index}, out)
+
+    if failures:
+        raise EmitError(failures)
+
+    return records
+
+
+class ConfigArchive:
+    """Look up and extract members of an archive written by `write_archive`.
+
+    :param archive_file:                Full path with file name and extension to the tar archive
+    :type archive_file:                 str
+
+    """
+
+    def __init__(self, archive_file):
+
+        self.archive_file = archive_file
+
+        with open(index_file(archive_file)) as get:
+            records = json.load(get)['members']
+
+        self.index = {(model, scenario, int(task)): (file_name, offset, size)
+                      for model, scenario, task, file_name, offset, size in records}
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        model, scenario, task = key
+        return (model, scenario, int(task)) in self.index
+
+    def keys(self):
+        """Get all (model, scenario, task) keys in archive order."""
+
+        return list(self.index)
+
+    def lookup(self, model, scenario, task):
+        """Get the (file name, offset, size) record of a member.
+
+        :raises KeyError:               If the member is not in the archive
+
+        """
+
+        try:
+            return self.index[(model, scenario, int(task))]
+
+        except KeyError:
+            raise KeyError(f"No member for model '{model}', scenario '{scenario}', task {task} in "
+                           f"'{self.archive_file}'") from None
+
+    def read(self, model, scenario, task):
+        """Read the text content of a member."""
+
+        _, offset, size = self.lookup(model, scenario, task)
+
+        with open(self.archive_file, 'rb') as get:
+            get.seek(offset)
+            return get.read(size).decode()
+
+    def extract(self, model, scenario, task, destination_dir):
+        """Extract a member into `destination_dir`.
+
+        :return:                        Full path to the extracted file
+
+        """
+
+        file_name, _, _ = self.lookup(model, scenario, task)
+
+        output_file = os.path.join(destination_dir, file_name)
+
+        with open(output_file, 'w') as out:
+            out.write(self.read(model, scenario, task))
+
+        return output_file
+
+
+def main(args=None):
+    """Command line interface used by generated job scripts to extract a member to node-local disk.  Prints the
+    full path to the extracted file:
+
+        python -m cassie.archive extract <archive> <model> <scenario> <task> <destination dir>
+
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m cassie.archive',
+                                     description='Extract ensemble members from a cassie archive.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    extract = subparsers.add_parser('extract', help='extract one member and print the path of the extracted file')
+    extract.add_argument('archive')
+    extract.add_argument('model')
+    extract.add_argument('scenario')
+    extract.add_argument('task', type=int)
+    extract.add_argument('destination_dir')
+
+    args = parser.parse_args(args)
+
+    os.makedirs(args.destination_dir, exist_ok=True)
+
+    print(ConfigArchive(args.archive).extract(args.model, args.scenario, args.task, args.destination_dir))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+# builders that can be benchmarked
+BUILDERS = ('xanthos', 'cassandra', 'job_scripts')
+
+# default ensemble sizes in number of generated files
+DEFAULT_SIZES = (100, 1000, 10000, 100000)
+
+# default output locations:  tmpfs to measure rendering cost and the working directory to include the filesystem
+DEFAULT_TARGETS = ('/dev/shm', '.')
+
+# scenarios used to construct the synthetic ensembles
+SCENARIOS = ('rcp26', 'rcp45', 'rcp60', 'rcp85')
+
+# number of models used for the configuration file ensembles
+N_MODELS = 4
+
+# module whose import is timed, and the number of fresh interpreters timing it; the fastest import is kept
+IMPORT_MODULE = 'cassie.build_cassandra_configs'
+IMPORT_REPEAT = 5
+
+# prints the seconds taken to import a module in a fresh interpreter, leaving out the interpreter start up
+IMPORT_TIMER = "import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+
+
+def cassie_version():
+    """Get the installed version of cassie."""
+
+    try:
+        from importlib.metadata import version
+        return version('cassie')
+
+    except Exception:
+        return 'unknown'
+
+
+def peak_rss_bytes():
+    """Get the peak resident set size of this process in bytes."""
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # reported in bytes on macOS and kilobytes elsewhere
+    if sys.platform == 'darwin':
+        return peak
+
+    return peak * 1024
+
+
+def directory_usage(output_dir):
+    """Get the number of files and total bytes in a directory tree."""
+
+    n_files = 0
+    n_bytes = 0
+
+    for root, _, files in os.walk(output_dir):
+        for name in files:
+            n_files += 1
+            n_bytes += os.path.getsize(os.path.join(root, name))
+
+    return n_files, n_bytes
+
+
+def import_time(module=IMPORT_MODULE, repeat=IMPORT_REPEAT):
+    """Get the seconds taken to import `module` in a fresh interpreter; the fastest of `repeat` interpreters."""
+
+    command = [sys.executable, '-c', IMPORT_TIMER.format(module=module)]
+
+    return min(float(subprocess.run(command, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout)
+               for _ in range(repeat))
+
+
+def run_builder(builder, size, output_dir, workers=None, backend='thread'):
+    """Generate a synthetic ensemble of roughly `size` files with one builder."""
+
+    import cassie
+
+    if builder == 'job_scripts':
+        model_list = [f"MODEL-{i}" for i in range(max(1, size // len(SCENARIOS)))]
+
+        cassie.build_job_scripts(model_list, SCENARIOS, output_dir, '/cassandra/configs', '/cassandra/logs',
+                                 '/cassandra/cassandra_main.py', 'account', workers=workers, backend=backend)
+        return
+
+    model_list = [f"MODEL-{i}" for i in range(N_MODELS)]
+    n_runs = max(1, size // (N_MODELS * len(SCENARIOS)))
+
+    if builder == 'xanthos':
+        cassie.build_xanthos_configs(model_list, SCENARIOS, output_dir, n_runs, '/xanthos', 'output/bench',
+                                     '/xanthos/thresholds', pet_model_abbrev='trn', runoff_model_abbrev='abcd',
+                                     workers=workers, backend=backend)
+
+    else:
+        cassie.build_cassandra_configs(model_list, SCENARIOS, output_dir, n_runs, '/gcam/ModelInterface.jar',
+                                       '/gcam/dbxml/lib', xanthos_config_dir='/xanthos/configs',
+                                       xanthos_pet_model_abbrev='trn', xanthos_runoff_model_abbrev='abcd',
+                                       fldgen_emulator_dir='/fldgen/emulators', fldgen_tgav_file_dir='/fldgen/tgav',
+                                       an2month_file_dir='/fldgen/an2month', workers=workers, backend=backend)
+
+
+def run_case(builder, size, target, workers=None, backend='thread'):
+    """Run a single benchmark case in this process and return its measurements.
+
+    Intended to be called in a fresh interpreter so that peak RSS only reflects this case.
+
+    """
+
+    output_dir = tempfile.mkdtemp(prefix='cassie-bench-', dir=target)
+
+    try:
+        start = time.perf_counter()
+        run_builder(builder, size, output_dir, workers=workers, backend=backend)
+        seconds = time.perf_counter() - start
+
+        n_files, n_bytes = directory_usage(output_dir)
+
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    return {'builder': builder,
+            'size': size,
+            'target': target,
+            'workers': workers,
+            'backend': backend,
+            'files': n_files,
+            'bytes': n_bytes,
+            'seconds': seconds,
+            'files_per_second': n_files / seconds,
+            'bytes_per_second': n_bytes / seconds,
+            'peak_rss_bytes': peak_rss_bytes()}
+
+
+def run_suite(builders=BUILDERS, sizes=DEFAULT_SIZES, targets=DEFAULT_TARGETS, workers=None, backend='thread'):
+    """Run every (builder, size, target) case, each in its own interpreter.
+
+    Targets that do not exist (e.g., no /dev/shm) are skipped.  The import time of the package is measured once,
+    see `import_time`.
+
+    :return:                            Dictionary with environment information, the import time in seconds, and
+                                        the list of case results
+
+    """
+
+    import_seconds = import_time()
+
+    print(f"{'import':>12} {IMPORT_MODULE} {import_seconds * 1000:>8.1f} ms", file=sys.stderr)
+
+    results = []
+
+    for target in targets:
+
+        if not os.path.isdir(target):
+            print(f"Skipping missing target directory '{target}'", file=sys.stderr)
+            continue
+
+        for builder in builders:
+            for size in sizes:
+
+                command = [sys.executable, '-m', 'cassie.benchmark', 'case', builder, str(size), target,
+                           '--backend', backend]
+
+                if workers is not None:
+                    command += ['--workers', str(workers)]
+
+                output = subprocess.run(command, check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+                result = json.loads(output)
+
+                print(f"{builder:>12} {size:>8} {target:<12} {result['files_per_second']:>12.0f} files/s "
+                      f"{result['bytes_per_second'] / 2 ** 20:>8.1f} MiB/s "
+                      f"{result['peak_rss_bytes'] / 2 ** 20:>8.1f} MiB peak RSS", file=sys.stderr)
+
+                results.append(result)
+
+    return {'cassie_version': cassie_version(),
+            'python_version': platform.python_version(),
+            'platform': platform.platform(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'import_seconds': import_seconds,
+            'results': results}
+
+
+def compare(baseline, current, tolerance=0.1):
+    """Compare two benchmark results files.
+
+    :param baseline:                    Baseline results dictionary as written by `run_suite`
+    :type baseline:                     dict
+
+    :param current:                     Current results dictionary as written by `run_suite`
+    :type current:                      dict
+
+    :param tolerance:                   Fractional drop in files per second, or in imports per second, that is
+                                        tolerated before a case is reported as a regression
+    :type tolerance:                    float
+
+    :return:                            List of (case, baseline files/s, current files/s, ratio, regressed) tuples
+                                        for cases present in both results, followed by an ('import', module) case
+                                        of the baseline and current import seconds if both results have them
+
+    """
+
+    def case_key(result):
+        return result['builder'], result['size'], result['target'], result['workers'], result['backend']
+
+    baseline_cases = {case_key(result): result for result in baseline['results']}
+
+    comparison = []
+
+    for result in current['results']:
+        key = case_key(result)
+
+        if key not in baseline_cases:
+            continue
+
+        before = baseline_cases[key]['files_per_second']
+        after = result['files_per_second']
+        ratio = after / before
+
+        comparison.append((key, before, after, ratio, ratio < 1 - tolerance))
+
+    # results written before the import time was measured in a fresh interpreter do not have it
+    if baseline.get('import_seconds') and current.get('import_seconds'):
+        before, after = baseline['import_seconds'], current['import_seconds']
+        ratio = before / after
+
+        comparison.append((('import', IMPORT_MODULE), before, after, ratio, ratio < 1 - tolerance))
+
+    return comparison
+
+
+def main(args=None):
+    """Command line interface for the benchmark suite:
+
+        python -m cassie.benchmark run --output results.json
+        python -m cassie.benchmark compare baseline.json results.json
+
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m cassie.benchmark',
+                                     description='Benchmark the cassie builders at increasing ensemble sizes.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    run = subparsers.add_parser('run', help='run the benchmark suite and write the results as JSON')
+    run.add_argument('--builders', nargs='+', choices=BUILDERS, default=list(BUILDERS))
+    run.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES))
+    run.add_argument('--targets', nargs='+', default=list(DEFAULT_TARGETS),
+                     help='directories to generate files in; e.g., a tmpfs and a regular disk directory')
+    run.add_argument('--workers', type=int, default=None)
+    run.add_argument('--backend', default='thread')
+    run.add_argument('--output', help='JSON file to write the results to; printed if not given')
+
+    case = subparsers.add_parser('case', help='run a single case in this process and print its result as JSON')
+    case.add_argument('builder', choices=BUILDERS)
+    case.add_argument('size', type=int)
+    case.add_argument('target')
+    case.add_argument('--workers', type=int, default=None)
+    case.add_argument('--backend', default='thread')
+
+    comparison = subparsers.add_parser('compare', help='compare results against a baseline; exits with status 1 '
+                                                       'if any case regressed')
+    comparison.add_argument('baseline')
+    comparison.add_argument('current')
+    comparison.add_argument('--tolerance', type=float, default=0.1)
+
+    args = parser.parse_args(args)
+
+    if args.command == 'case':
+        print(json.dumps(run_case(args.builder, args.size, args.target, workers=args.workers, backend=args.backend)))
+
+    elif args.command == 'run':
+        results = run_suite(args.builders, args.sizes, args.targets, workers=args.workers, backend=args.backend)
+
+        if args.output is None:
+            print(json.dumps(results, indent=2))
+        else:
+            with open(args.output, 'w') as out:
+                json.dump(results, out, indent=2)
+
+    else:
+        with open(args.baseline) as get:
+            baseline = json.load(get)
+
+        with open(args.current) as get:
+            current = json.load(get)
+
+        regressed = False
+
+        for key, before, after, ratio, case_regressed in compare(baseline, current, tolerance=args.tolerance):
+            regressed = regressed or case_regressed
+            flag = 'REGRESSION' if case_regressed else ''
+
+            if key[0] == 'import':
+                print(f"{' '.join(key):<50} {before * 1000:>12.1f} -> {after * 1000:>12.1f} ms      "
+                      f"({ratio:.2f}x) {flag}")
+            else:
+                print(f"{' '.join(str(part) for part in key):<50} {before:>12.0f} -> {after:>12.0f} files/s "
+                      f"({ratio:.2f}x) {flag}")
+
+        return 1 if regressed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
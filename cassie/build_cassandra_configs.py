@@ -1,8 +1,61 @@
 import os
-from binascii import crc32
+import warnings
 
 from configobj import ConfigObj
 
+from cassie.archive import write_archive
+from cassie.build_xanthos_configs import run_prefix, xanthos_names
+from cassie.capacity import plan_files
+from cassie.catalog import write_catalog
+from cassie.emit import emit_files
+from cassie.instrument import clock, lap, make_profile, profiled, stage
+from cassie.layout import check_fanout, count_layout_dirs, layout_name, make_layout
+from cassie.manifest import emit_incremental
+from cassie.overlay import OverlayRenderer, overlay_members
+from cassie.resources import component_weights, resource_plan
+from cassie.seeds import (SEED_BLOCK, check_seed_mode, crc_seed, make_seed_table, seed_collisions, signify32,
+                          unique_seed_table, unique_seeds, write_seed_table)
+from cassie.shard import check_shard, shard_members, shard_name
+from cassie.stage import fldgen_input_names
+from cassie.validate import make_index, validate_inputs
+
+
+# available serializers for the configuration files
+WRITERS = ('native', 'configobj')
+
+# characters that cause ConfigObj to quote a value when at either end of it
+QUOTE_EDGE_CHARACTERS = ' \r\n\x0b\t\'"'
+
+
+class NativeConfig(dict):
+    """Dictionary with a file name attribute; stands in for a ConfigObj when computing per-run values."""
+
+    filename = None
+
+
+def format_entry(key, value):
+    """Format a `key = value` line exactly as ConfigObj writes it.
+
+    Plain strings and numbers are formatted directly; anything ConfigObj would quote is delegated to ConfigObj.
+
+    """
+
+    if isinstance(value, (int, float)):
+        value_str = str(value)
+
+    elif isinstance(value, str):
+        value_str = value
+
+    else:
+        return ConfigObj({key: value}).write()[0]
+
+    if (value_str and value_str[0] not in QUOTE_EDGE_CHARACTERS and value_str[-1] not in QUOTE_EDGE_CHARACTERS
+            and ',' not in value_str and '#' not in value_str and '\n' not in value_str
+            and not ("'" in value_str and '"' in value_str)):
+        return f"{key} = {value_str}"
+
+    return ConfigObj({key: value}).write()[0]
+
 
 class BuildCassandraConfigs:
     """Generate Cassandra configuration files.
@@ -104,6 +157,145 @@ class BuildCassandraConfigs:
 
     :type an2month_file_dir:             str
 
+    # parallel generation options
+    :param workers:                             Number of parallel workers used to generate the files.  None or 1
+                                                generates the files serially.
+    :type workers:                              int
+
+    :param backend:                             Parallel backend; either 'thread' (I/O-bound writing) or 'process'
+                                                (CPU-bound rendering)
+    :type backend:                              str
+
+    # single archive output option
+    :param archive:                             File name of a single uncompressed tar archive to write all
+                                                configuration files into instead of writing one file per run.
+                                                Relative names are placed in `output_dir`, which is still used to
+                                                construct each run's file path.  An offset index is written next to
+                                                it; see cassie.archive.ConfigArchive to look up or extract members.
+                                                E.g., 'cassandra_configs.tar'
+    :type archive:                              str
+
+    # incremental rebuild options
+    :param manifest:                            File name of a manifest used for incremental rebuilds.  Relative
+                                                names are placed in `output_dir`.  When given, only files whose
+                                                content changed since the previous build are written and files that
+                                                are no longer generated are handled according to `stale`.
+                                                E.g., '.cassie_manifest.json'
+    :type manifest:                             str
+
+    :param stale:                               'report' to warn about files from a previous build that are no
+                                                longer generated, or 'remove' to delete them.  Only used with
+                                                `manifest`.
+    :type stale:                                str
+
+    # run catalog options
+    :param catalog:                             File name of a run catalog to write with one row per run holding the
+                                                model, scenario, task, Xanthos OutputNameStr, Cassandra config path,
+                                                Fldgen RNGseed, expected log directory, and content hash.  Relative
+                                                names are placed in `output_dir`.  Use a '.npy' extension for a NumPy
+                                                structured array or '.csv' for CSV; see cassie.catalog.RunCatalog.
+                                                E.g., 'runs.npy'
+    :type catalog:                              str
+
+    :param cassandra_log_dir:                   Full path to the directory Cassandra log files are written to; used
+                                                for the expected log directory in the run catalog
+    :type cassandra_log_dir:                    str
+
+    # serializer option
+    :param writer:                              'native' (default) to render the lines shared by every run of a
+                                                model and scenario once and only format the per-run keys, or
+                                                'configobj' to build and write a full ConfigObj for every file.  Both
+                                                produce identical files.
+    :type writer:                               str
+
+    # instrumentation options
+    :param profile:                             Record where the build time goes; either a full path with file name
+                                                and extension to write a timing summary to (JSON, or folded stacks for
+                                                flame graphs if it ends with '.folded') or a cassie.instrument.Profile
+                                                to record into.  See cassie.instrument.Profile for the stages and
+                                                counters recorded.
+    :type profile:                              str; Profile
+
+    :param progress:                            Callable run as `progress(done, profile)` as files are generated,
+                                                where `done` is the number of files generated so far
+    :type progress:                             callable
+
+    # overlay option
+    :param overlay:                             If True, write one base file plus one overlay file holding the
+                                                per-task lines for each model and scenario instead of one file per
+                                                run; see cassie.overlay for the layout and merge rule.  Job scripts
+                                                materialize each task's file at start (see `cassandra_overlay` in
+                                                build_job_scripts).  Cannot be combined with `archive`.  The content
+                                                hash column of the run catalog is empty in this mode.
+    :type overlay:                              bool
+
+    # sharding options
+    :param shard_index:                         Index of the slice of the ensemble to generate, from 0 to
+                                                `num_shards` - 1
+    :type shard_index:                          int
+
+    :param num_shards:                          Number of disjoint, contiguous slices the ensemble is split into so
+                                                several nodes can each generate one.  Every shard must use the same
+                                                `output_dir`, since RNG seeds depend on the full path of each file.
+                                                Manifests and catalogs are written per shard (e.g.,
+                                                'runs.shard-3-of-8.npy'); combine them once every shard has finished
+                                                with `python -m cassie.shard merge`.  Cannot be combined with
+                                                `archive`.
+    :type num_shards:                           int
+
+    # validation option
+    :param validate:                            If True, check that the Fldgen emulator, TGAV, and an2month files
+                                                referenced by the configuration files exist before anything is
+                                                written, scanning each input directory once.  Pass a
+                                                cassie.validate.DirectoryIndex to share the scans with other builders.
+    :type validate:                             bool; DirectoryIndex
+
+    # staging option
+    :param stage_dir:                           Node-local directory the job scripts copy the Fldgen emulator, TGAV,
+                                                and an2month files to before running (see `stage_dir` in
+                                                build_job_scripts).  When given, the configuration files point to the
+                                                copies in this directory; the `*_dir` options still name the shared
+                                                directories the files are copied from and checked in.
+    :type stage_dir:                            str
+
+    # output layout option
+    :param fanout:                              If given, write the configuration files of each model and scenario
+                                                into "<model>/<scenario>/shard-NNN" subdirectories of `output_dir`
+                                                holding up to `fanout` runs each, instead of all in `output_dir`.  The
+                                                Xanthos configuration file of each run is named in the same layout in
+                                                `xanthos_config_dir`, so build the Xanthos configuration files and job
+                                                scripts with the same `fanout`.  The RNG seeds depend on the full path
+                                                of each file and so differ from the flat layout.  Cannot be combined
+                                                with `archive` or `overlay`.
+    :type fanout:                               int
+
+    # RNG seed options
+    :param seed_mode:                           'crc' (default) to derive the Fldgen RNGseed of each run from the CRC32
+                                                of its full file path as in earlier builds, or 'unique' to give every
+                                                run of the ensemble a different seed that does not depend on the
+                                                output path, shard, or layout; see cassie.seeds
+    :type seed_mode:                            str
+
+    :param seed:                                Study seed from 0 to 2**32 - 1 selecting the seeds of 'unique' mode
+    :type seed:                                 int
+
+    :param seed_table:                          File name of a table of the RNGseed of every run of the ensemble to
+                                                write with (model, scenario, task, rng_seed) rows.  Relative names
+                                                are placed in `output_dir`.  Use a '.npy' extension for a NumPy
+                                                structured array or '.csv' for CSV.  Only the first shard writes it,
+                                                since it covers the whole ensemble.  A warning is given if runs share
+                                                a seed.  E.g., 'seeds.csv'
+    :type seed_table:                           str
+
+    # dry run options
+    :param dry_run:                             If True, write nothing and have `build_config` return the plan of the
+                                                files the build would write for every shard; see cassie.capacity
+    :type dry_run:                              bool
+
+    :param quota:                               With `dry_run`, True to compare the plan to the free space of the
+                                                filesystem holding `output_dir`, or a dictionary with 'bytes' and/or
+                                                'inodes' limits to also compare to; see cassie.capacity.check_quota
+    :type quota:                                bool; dict
 
     """
 
@@ -140,12 +332,105 @@ class BuildCassandraConfigs:
         self.fldgen_tgav_file_dir = kwargs.get('fldgen_tgav_file_dir', None)
         self.an2month_file_dir = kwargs.get('an2month_file_dir', None)
 
+        # parallel generation options
+        self.workers = kwargs.get('workers', None)
+        self.backend = kwargs.get('backend', 'thread')
+
+        # single archive output option
+        self.archive = kwargs.get('archive', None)
+
+        # incremental rebuild options
+        self.manifest = kwargs.get('manifest', None)
+        self.stale = kwargs.get('stale', 'report')
+
+        # run catalog options
+        self.catalog = kwargs.get('catalog', None)
+        self.cassandra_log_dir = kwargs.get('cassandra_log_dir', None)
+
+        # serializer option
+        self.writer = kwargs.get('writer', 'native')
+
+        if self.writer not in WRITERS:
+            raise ValueError(f"Unknown writer '{self.writer}'; use one of {WRITERS}")
+
+        # instrumentation options
+        self.profile = kwargs.get('profile', None)
+        self.progress = kwargs.get('progress', None)
+
+        # overlay option
+        self.overlay = kwargs.get('overlay', False)
+
+        if self.overlay and self.archive is not None:
+            raise ValueError("`overlay` cannot be combined with `archive`")
+
+        # sharding options
+        self.shard_index = kwargs.get('shard_index', 0)
+        self.num_shards = kwargs.get('num_shards', 1)
+
+        check_shard(self.shard_index, self.num_shards)
+
+        if self.num_shards > 1 and self.archive is not None:
+            raise ValueError("`num_shards` cannot be combined with `archive`")
+
+        # validation option
+        self.validate = kwargs.get('validate', False)
+
+        # staging option
+        self.stage_dir = kwargs.get('stage_dir', None)
+
+        # output layout option
+        self.fanout = kwargs.get('fanout', None)
+
+        check_fanout(self.fanout)
+
+        if self.fanout is not None and (self.archive is not None or self.overlay):
+            raise ValueError("`fanout` cannot be combined with `archive` or `overlay`")
+
+        # RNG seed options
+        self.seed_mode = kwargs.get('seed_mode', 'crc')
+        self.seed = kwargs.get('seed', 0)
+        self.seed_table = kwargs.get('seed_table', None)
+
+        check_seed_mode(self.seed_mode, self.seed)
+
+        if self.seed_table is not None and not self.fldgen_build:
+            raise ValueError("`seed_table` requires `fldgen_build`")
+
+        # dry run options
+        self.dry_run = kwargs.get('dry_run', False)
+        self.quota = kwargs.get('quota', None)
+
+        # index of each (model, scenario) combination and the blocks of 'unique' mode seeds computed so far, built
+        # when first needed
+        self._seeds = None
+
+        # lines rendered once per (model, scenario) by the native writer
+        self._skeletons = {}
+
+    # options that control how files are generated but not their content
+    RUNTIME_OPTIONS = ('workers', 'backend', 'archive', 'manifest', 'stale', 'writer', 'catalog', 'cassandra_log_dir',
+                       'profile', 'progress', 'shard_index', 'num_shards', 'validate', 'seed_table', 'dry_run',
+                       'quota', '_skeletons', '_seeds')
+
+    # keys that change for every run; all other keys only depend on the model and scenario
+    PER_RUN_KEYS = (('XanthosComponent', 'config_file'),
+                    ('XanthosComponent', 'OutputNameStr'),
+                    ('FldgenComponent', 'RNGseed'))
+
+    def parameters(self):
+        """Get the options that determine the content of the generated files."""
+
+        return {key: value for key, value in vars(self).items() if key not in self.RUNTIME_OPTIONS}
+
+    def __getstate__(self):
+
+        # the profile, progress callback, and validation index stay in the parent process when rendering with the
+        # 'process' backend
+        return {key: value for key, value in vars(self).items() if key not in ('profile', 'progress', 'validate')}
+
     @staticmethod
     def signify32(x):
-        if x > 0x7fffffff:
-            return x - 4294967296  # x - 2**32
-        else:
-            return x
+        return signify32(x)
 
     def build_global(self, config):
         """Build the global section of the config file."""
@@ -164,31 +449,22 @@ class BuildCassandraConfigs:
         config['XanthosComponent'] = {}
 
         # set run name prefix
-        run_prefix = ''
-
-        if self.xanthos_pet_model_abbrev is not None:
-            run_prefix += f"{self.xanthos_pet_model_abbrev}_"
-
-        if self.xanthos_runoff_model_abbrev is not None:
-            run_prefix += f"{self.xanthos_runoff_model_abbrev}_"
+        prefix = run_prefix(self.xanthos_pet_model_abbrev, self.xanthos_runoff_model_abbrev,
+                            self.xanthos_router_model_abbrev)
 
-        if self.xanthos_router_model_abbrev is not None:
-            run_prefix += f"{self.xanthos_router_model_abbrev}_"
+        # names shared with the Xanthos configuration files
+        xanthos_project_name, xanthos_output_name_str, xanthos_file_name = xanthos_names(prefix, model, scenario, task)
 
-        # construct project name
-        xanthos_project_name = f"{run_prefix}{model}_{scenario}"
-
-        # construct output name string
-        xanthos_output_name_str = f"{xanthos_project_name}_{task}"
-
-        config['XanthosComponent']['config_file'] = os.path.join(self.xanthos_config_dir, f"{xanthos_output_name_str}.ini")
+        config['XanthosComponent']['config_file'] = os.path.join(self.xanthos_config_dir,
+                                                                 layout_name(xanthos_file_name, model, scenario, task,
+                                                                             self.fanout))
         config['XanthosComponent']['OutputNameStr'] = xanthos_output_name_str
         config['XanthosComponent']['ProjectName'] = xanthos_project_name
         config['XanthosComponent']['mp.weight'] = self.xanthos_mpi_weight
 
         return config
 
-    def build_fldgen(self, config, model, scenario):
+    def build_fldgen(self, config, model, scenario, task):
         """Construct the fldgen section of the config file."""
 
         # TODO:  depreciate this
@@ -203,48 +479,418 @@ class BuildCassandraConfigs:
                         }
 
         config['FldgenComponent'] = {}
-        
+
+        # input files are read from the node-local copies when staging
+        paths = self.fldgen_inputs(model, scenario, self.stage_dir)
+
         config['FldgenComponent']['loadpkgs'] = self.fldgen_loadpkgs
         config['FldgenComponent']['pkgdir'] = self.fldgen_pkgdir
-        config['FldgenComponent']['emulator'] = os.path.join(self.fldgen_emulator_dir, f"fldgen-{model}.rds")
-        config['FldgenComponent']['tgav_file'] = os.path.join(self.fldgen_tgav_file_dir, f"fldgen-{model}_{scenario}.csv.gz")
+        config['FldgenComponent']['emulator'] = paths['emulator']
+        config['FldgenComponent']['tgav_file'] = paths['tgav_file']
         config['FldgenComponent']['ngrids'] = self.fldgen_ngrids
         config['FldgenComponent']['scenario'] = scenario
-        config['FldgenComponent']['a2mfrac'] = os.path.join(self.an2month_file_dir, f"alpha_{model}_{scenario}.rds")
+        config['FldgenComponent']['a2mfrac'] = paths['a2mfrac']
         config['FldgenComponent']['startyr'] = self.fldgen_startyr
         config['FldgenComponent']['nyear'] = self.fldgen_throughyr - self.fldgen_startyr + 1
-        config['FldgenComponent']['RNGseed'] = self.signify32(crc32(config.filename.encode()))
+
+        start = clock()
+        config['FldgenComponent']['RNGseed'] = self.rng_seed(model, scenario, task, config.filename)
+        lap('build;seed', start)
+
         config['FldgenComponent']['mp.weight'] = self.fldgen_mpi_weight
 
         return config
 
-    def build_config(self):
-        """Construct Cassandra configuration file from user options."""
+    def rng_seed(self, model, scenario, task, file_path):
+        """Get the Fldgen RNGseed of a run from the full path of its file in 'crc' mode, or from its place in the
+        ensemble in 'unique' mode; see cassie.seeds."""
+
+        if self.seed_mode == 'crc':
+            return crc_seed(file_path)
+
+        if self._seeds is None:
+            pairs = ((model, scenario) for scenario in self.scenario_list for model in self.model_list)
+            self._seeds = {pair: index for index, pair in enumerate(pairs)}, {}
+
+        pair_index, blocks = self._seeds
+        block = (pair_index[(model, scenario)], task // SEED_BLOCK)
+
+        if block not in blocks:
+            first = block[1] * SEED_BLOCK
+            tasks = range(first, min(first + SEED_BLOCK, self.runs_per_config))
+            blocks[block] = unique_seeds(len(pair_index), self.runs_per_config, self.seed, pairs=block[:1],
+                                         tasks=tasks)[0]
+
+        return int(blocks[block][task % SEED_BLOCK])
+
+    def ensemble_seeds(self):
+        """Get the RNGseed of every run of the ensemble, including those of other shards, as a seed table in
+        scenario, model, task order; see cassie.seeds.make_seed_table."""
+
+        if self.seed_mode == 'unique':
+            return unique_seed_table(self.model_list, self.scenario_list, self.runs_per_config, self.seed)
+
+        return make_seed_table((model, scenario, i,
+                                self.rng_seed(model, scenario, i,
+                                              os.path.join(self.output_dir, self.config_name(model, scenario, i))))
+                               for model, scenario, i in self.iter_members())
+
+    def fldgen_inputs(self, model, scenario, stage_dir=None):
+        """Get the full paths of the Fldgen input files of a (model, scenario) combination keyed by their
+        FldgenComponent option; in the shared directories, or in `stage_dir` if given."""
+
+        names = fldgen_input_names(model, scenario)
+
+        if stage_dir is not None:
+            return {key: os.path.join(stage_dir, name) for key, name in names.items()}
+
+        dirs = {'emulator': self.fldgen_emulator_dir, 'tgav_file': self.fldgen_tgav_file_dir,
+                'a2mfrac': self.an2month_file_dir}
+
+        return {key: os.path.join(dirs[key], name) for key, name in names.items()}
+
+    def config_name(self, model, scenario, i):
+        """Get the path of a run's configuration file relative to `output_dir`."""
+
+        return layout_name(f"{model}_{scenario}_{i}.cfg", model, scenario, i, self.fanout)
+
+    def build_configobj(self, model, scenario, i):
+        """Construct the ConfigObj for a single run.
+
+        :return:                        (file name, ConfigObj) tuple
+
+        """
+
+        file_name = self.config_name(model, scenario, i)
+
+        # instantiate config file
+        config = ConfigObj()
+
+        # set file output path
+        config.filename = os.path.join(self.output_dir, file_name)
+
+        # build required global section
+        config = self.build_global(config)
+
+        # build xanthos section if desired
+        if self.xanthos_build:
+            config = self.build_xanthos(config, model, scenario, i)
+
+        # build fldgen section if desired
+        if self.fldgen_build:
+            config = self.build_fldgen(config, model, scenario, i)
+
+        return file_name, config
+
+    @staticmethod
+    def write_configobj(config):
+        """Get the text ConfigObj writes for a config without writing it to disk."""
+
+        filename = config.filename
+
+        # without a file name ConfigObj returns the lines instead of writing them
+        config.filename = None
+        lines = config.write()
+        config.filename = filename
+
+        return '\n'.join(lines) + '\n'
+
+    def native_skeleton(self, model, scenario):
+        """Get the lines rendered by ConfigObj for a (model, scenario) combination along with the line index of each
+        key that changes for every run.  Rendered once per combination and cached.
+
+        :return:                        (lines, slots) tuple where slots maps (section, key) to a line index; both
+                                        are None if the lines cannot be mapped to keys (e.g., multiline values)
+
+        """
+
+        key = (model, scenario)
+
+        if key not in self._skeletons:
+
+            start = clock()
+
+            _, config = self.build_configobj(model, scenario, 0)
+
+            lines = self.write_configobj(config).splitlines()
+
+            lap('skeleton', start)
+
+            # each section writes its marker line followed by one line per key
+            slots = {}
+            index = 0
+
+            for section in config.sections:
+                index += 1
+
+                for name in config[section].scalars:
+                    if (section, name) in self.PER_RUN_KEYS:
+                        slots[(section, name)] = index
+                    index += 1
+
+            if index == len(lines):
+                self._skeletons[key] = (lines, slots)
+            else:
+                self._skeletons[key] = (None, None)
+
+        return self._skeletons[key]
+
+    def render_config(self, member):
+        """Construct the Cassandra configuration file for a single (model, scenario, task) member.
+
+        With the default 'native' writer, the lines that are the same for every run of a (model, scenario)
+        combination are rendered by ConfigObj once and only the per-run keys are formatted for each file.  The
+        'configobj' writer builds and writes a full ConfigObj for every file.  Both produce identical text.
+
+        :return:                        (file name, text) tuple
+
+        """
+
+        model, scenario, i = member
+
+        lines, slots = (None, None) if self.writer == 'configobj' else self.native_skeleton(model, scenario)
+
+        start = clock()
+
+        if lines is None:
+            file_name, config = self.build_configobj(model, scenario, i)
+            start = lap('build', start)
+
+            text = self.write_configobj(config)
+            lap('serialize', start)
+
+            return file_name, text
+
+        file_name = self.config_name(model, scenario, i)
+
+        # the section builders only need item assignment and a file name, so a plain dictionary stands in for the
+        # ConfigObj to compute the per-run values
+        config = NativeConfig()
+        config.filename = os.path.join(self.output_dir, file_name)
+
+        if self.xanthos_build:
+            self.build_xanthos(config, model, scenario, i)
+
+        if self.fldgen_build:
+            self.build_fldgen(config, model, scenario, i)
+
+        start = lap('build', start)
+
+        lines = list(lines)
+
+        for (section, name), index in slots.items():
+            lines[index] = format_entry(name, config[section][name])
+
+        lap('serialize', start)
+
+        return file_name, '\n'.join(lines) + '\n'
+
+    def iter_members(self):
+        """Lazily generate the (model, scenario, task) members of the ensemble in scenario, model, task order."""
 
         for scenario in self.scenario_list:
             for model in self.model_list:
                 for i in range(self.runs_per_config):
-                    
-                    # instantiate config file
-                    config = ConfigObj()
-                    
-                    # set file output path
-                    config.filename = os.path.join(self.output_dir, f"{model}_{scenario}_{i}.cfg")
+                    yield model, scenario, i
+
+    def iter_configs(self):
+        """Lazily generate Cassandra configuration files without writing them to disk.  Files are rendered one at a
+        time as they are requested so memory use does not grow with the size of the ensemble.
+
+        :return:                        Generator of (relative path, text) tuples in scenario, model, task order;
+                                        base and overlay files per (model, scenario) in overlay mode
+
+        """
+
+        render, members = self.renderer()
+
+        for member in members:
+            yield render(member)
+
+    def renderer(self):
+        """Get the render callable and members to generate; one config per run, or a base and an overlay file per
+        (model, scenario) in overlay mode.  Only the members of this builder's shard are generated.
+
+        :return:                        (render callable, iterable of members) tuple
 
-                    # build required global section
-                    config = self.build_global(config)
+        """
 
-                    # build xanthos section if desired
-                    if self.xanthos_build:
-                        config = self.build_xanthos(config, model, scenario, i)
+        n_pairs = len(self.model_list) * len(self.scenario_list)
+
+        if not self.overlay:
+            render, members, n_members = self.render_config, self.iter_members(), n_pairs * self.runs_per_config
+
+        else:
+            pairs = ((model, scenario) for scenario in self.scenario_list for model in self.model_list)
+            render = OverlayRenderer(self.render_config, self.runs_per_config)
+            members, n_members = overlay_members(pairs), 2 * n_pairs
+
+        return render, shard_members(members, n_members, self.shard_index, self.num_shards)
+
+    def input_files(self):
+        """Lazily generate the (description, full path) of every input file the configuration files reference, once
+        per model or (model, scenario) rather than once per run.  Xanthos configuration files are not included since
+        they are generated by cassie.
+
+        :return:                        Generator of (description, full path) tuples
+
+        """
+
+        if not self.fldgen_build:
+            return
+
+        for scenario in self.scenario_list:
+            for model in self.model_list:
 
-                    # build fldgen section if desired
-                    if self.fldgen_build:
-                        config = self.build_fldgen(config, model, scenario)
+                # the shared files, which are also the ones copied when staging
+                fldgen = self.fldgen_inputs(model, scenario)
+
+                yield 'Fldgen emulator', fldgen['emulator']
+                yield 'Fldgen TGAV file', fldgen['tgav_file']
+                yield 'an2month fractions', fldgen['a2mfrac']
+
+    def plan(self, quota=None):
+        """Plan the files the build writes for every shard without writing them; see cassie.capacity.plan_files.
+        `quota` defaults to the `quota` option."""
+
+        if self.archive is not None:
+            output = 'archive'
+        elif self.overlay:
+            output = 'overlay'
+        else:
+            output = 'files'
+
+        directories = count_layout_dirs(len(self.model_list), len(self.scenario_list), self.runs_per_config,
+                                        self.fanout)
+
+        # the RNG seeds of the runs differ in length
+        return plan_files(self.render_config, [(model, scenario) for model in self.model_list
+                                               for scenario in self.scenario_list],
+                          self.runs_per_config, self.output_dir, directories=directories, output=output,
+                          quota=self.quota if quota is None else quota, exact=not self.fldgen_build)
+
+    def resource_plan(self, cores_per_node, nodes=1, concurrency=1):
+        """Plan the MPI ranks and cores of each run from the components enabled in the configuration files and
+        their `mp.weight`; see cassie.resources.resource_plan.  Pass the plan to build_job_scripts as `resources`
+        and its `xanthos_jobs` to build_xanthos_configs."""
+
+        weights = component_weights(self.xanthos_build, self.fldgen_build, self.xanthos_mpi_weight,
+                                    self.fldgen_mpi_weight)
+
+        return resource_plan(cores_per_node, nodes=nodes, weights=weights, concurrency=concurrency)
+
+    def build_config(self):
+        """Construct Cassandra configuration file from user options.
+
+        :return:                        When `manifest` is given, a dictionary with the number of files 'written'
+                                        and 'unchanged' and the list of 'stale' file names; the plan of the build
+                                        with `dry_run`
+
+        :raises MissingInputError:      If `validate` is set and input files do not exist
+
+        """
+
+        if self.dry_run:
+            return self.plan()
+
+        render, members = self.renderer()
+        summary = None
+
+        manifest, catalog, stale = self.manifest, self.catalog, self.stale
+
+        # stale files are checked across the whole build when the shard manifests are merged
+        if self.num_shards > 1:
+            manifest = manifest and shard_name(manifest, self.shard_index, self.num_shards)
+            catalog = catalog and shard_name(catalog, self.shard_index, self.num_shards)
+            stale = 'ignore'
+
+        profile = make_profile(self.profile, self.progress)
+
+        with profiled(profile, 'build_cassandra_configs', self.profile):
+
+            index = make_index(self.validate)
+
+            if index is not None:
+                with stage('validate'):
+                    validate_inputs(self.input_files(), index)
+
+            if self.fanout is not None:
+                with stage('layout'):
+                    make_layout(self.output_dir, self.model_list, self.scenario_list, self.runs_per_config,
+                                self.fanout)
+
+            if self.archive is not None:
+                records = write_archive(render, members, os.path.join(self.output_dir, self.archive),
+                                        workers=self.workers, backend=self.backend, profile=profile)
+
+            elif manifest is not None:
+                records, summary = emit_incremental(render, members, self.output_dir,
+                                                    os.path.join(self.output_dir, manifest), self.parameters(),
+                                                    stale=stale, workers=self.workers, backend=self.backend,
+                                                    profile=profile)
+
+            else:
+                records, _ = emit_files(render, members, self.output_dir, workers=self.workers,
+                                        backend=self.backend, profile=profile)
+
+            if catalog is not None:
+                with stage('catalog'):
+
+                    # overlay files hold many runs, so rows name the file each run materializes to
+                    if self.overlay:
+                        rows = (self.catalog_row((model, scenario, i), f"{model}_{scenario}_{i}.cfg", '')
+                                for (model, scenario, kind), _, _, _ in records if kind == 'overlay'
+                                for i in range(self.runs_per_config))
+                    else:
+                        rows = (self.catalog_row(member, file_name, digest)
+                                for member, file_name, digest, _ in records)
+
+                    write_catalog(rows, os.path.join(self.output_dir, catalog))
+
+            # the seed table covers every shard, so only the first shard writes it
+            if self.seed_table is not None and self.shard_index == 0:
+                with stage('seeds'):
+                    seeds = self.ensemble_seeds()
+                    write_seed_table(seeds, os.path.join(self.output_dir, self.seed_table))
+
+                collisions = seed_collisions(seeds)
+
+                if collisions:
+                    warnings.warn(f"{collisions} run(s) share their RNGseed with another run; use seed_mode='unique' "
+                                  f"to give every run a different seed")
+
+        return summary
+
+    def catalog_row(self, member, file_name, digest):
+        """Construct the run catalog row for a member.  The Xanthos output name is empty if Xanthos is not built,
+        the RNG seed is 0 if Fldgen is not built, and the log directory is empty if `cassandra_log_dir` is not set.
+
+        :return:                        Tuple ordered as the columns of cassie.catalog.RunCatalog
+
+        """
+
+        model, scenario, i = member
+
+        # the section builders only need item assignment and a file name
+        config = NativeConfig()
+        config.filename = os.path.join(self.output_dir, file_name)
+
+        output_name_str = ''
+        rng_seed = 0
+
+        if self.xanthos_build:
+            output_name_str = self.build_xanthos(config, model, scenario, i)['XanthosComponent']['OutputNameStr']
+
+        if self.fldgen_build:
+            rng_seed = self.build_fldgen(config, model, scenario, i)['FldgenComponent']['RNGseed']
+
+        if self.cassandra_log_dir is None:
+            log_dir = ''
+        else:
+            log_dir = os.path.join(self.cassandra_log_dir, f"{model}_{scenario}_{i}")
+
+        return model, scenario, i, output_name_str, config.filename, rng_seed, log_dir, digest
 
-                    # write output config file
-                    config.write()
-        
 
 def build_cassandra_configs(model_list, scenario_list, output_dir, runs_per_config, global_model_interface_jar,
                             global_dbxml_lib, global_inputdir='./input-data', global_rgnconfig='rgn32',
@@ -343,6 +989,149 @@ def build_cassandra_configs(model_list, scenario_list, output_dir, runs_per_conf
 
     :type fldgen_tgav_file_dir:                 str
 
+    # parallel generation options
+    :param workers:                             Number of parallel workers used to generate the files.  None or 1
+                                                generates the files serially.
+    :type workers:                              int
+
+    :param backend:                             Parallel backend; either 'thread' (I/O-bound writing) or 'process'
+                                                (CPU-bound rendering)
+    :type backend:                              str
+
+    # single archive output option
+    :param archive:                             File name of a single uncompressed tar archive to write all
+                                                configuration files into instead of writing one file per run.
+                                                Relative names are placed in `output_dir`, which is still used to
+                                                construct each run's file path.  An offset index is written next to
+                                                it; see cassie.archive.ConfigArchive to look up or extract members.
+                                                E.g., 'cassandra_configs.tar'
+    :type archive:                              str
+
+    # incremental rebuild options
+    :param manifest:                            File name of a manifest used for incremental rebuilds.  Relative
+                                                names are placed in `output_dir`.  When given, only files whose
+                                                content changed since the previous build are written and files that
+                                                are no longer generated are handled according to `stale`.
+                                                E.g., '.cassie_manifest.json'
+    :type manifest:                             str
+
+    :param stale:                               'report' to warn about files from a previous build that are no
+                                                longer generated, or 'remove' to delete them.  Only used with
+                                                `manifest`.
+    :type stale:                                str
+
+    # run catalog options
+    :param catalog:                             File name of a run catalog to write with one row per run holding the
+                                                model, scenario, task, Xanthos OutputNameStr, Cassandra config path,
+                                                Fldgen RNGseed, expected log directory, and content hash.  Relative
+                                                names are placed in `output_dir`.  Use a '.npy' extension for a NumPy
+                                                structured array or '.csv' for CSV; see cassie.catalog.RunCatalog.
+                                                E.g., 'runs.npy'
+    :type catalog:                              str
+
+    :param cassandra_log_dir:                   Full path to the directory Cassandra log files are written to; used
+                                                for the expected log directory in the run catalog
+    :type cassandra_log_dir:                    str
+
+    # serializer option
+    :param writer:                              'native' (default) to render the lines shared by every run of a
+                                                model and scenario once and only format the per-run keys, or
+                                                'configobj' to build and write a full ConfigObj for every file.  Both
+                                                produce identical files.
+    :type writer:                               str
+
+    # instrumentation options
+    :param profile:                             Record where the build time goes; either a full path with file name
+                                                and extension to write a timing summary to (JSON, or folded stacks for
+                                                flame graphs if it ends with '.folded') or a cassie.instrument.Profile
+                                                to record into.  See cassie.instrument.Profile for the stages and
+                                                counters recorded.
+    :type profile:                              str; Profile
+
+    :param progress:                            Callable run as `progress(done, profile)` as files are generated,
+                                                where `done` is the number of files generated so far
+    :type progress:                             callable
+
+    # overlay option
+    :param overlay:                             If True, write one base file plus one overlay file holding the
+                                                per-task lines for each model and scenario instead of one file per
+                                                run; see cassie.overlay for the layout and merge rule.  Job scripts
+                                                materialize each task's file at start (see `cassandra_overlay` in
+                                                build_job_scripts).  Cannot be combined with `archive`.  The content
+                                                hash column of the run catalog is empty in this mode.
+    :type overlay:                              bool
+
+    # sharding options
+    :param shard_index:                         Index of the slice of the ensemble to generate, from 0 to
+                                                `num_shards` - 1
+    :type shard_index:                          int
+
+    :param num_shards:                          Number of disjoint, contiguous slices the ensemble is split into so
+                                                several nodes can each generate one.  Every shard must use the same
+                                                `output_dir`, since RNG seeds depend on the full path of each file.
+                                                Manifests and catalogs are written per shard (e.g.,
+                                                'runs.shard-3-of-8.npy'); combine them once every shard has finished
+                                                with `python -m cassie.shard merge`.  Cannot be combined with
+                                                `archive`.
+    :type num_shards:                           int
+
+    # validation option
+    :param validate:                            If True, check that the Fldgen emulator, TGAV, and an2month files
+                                                referenced by the configuration files exist before anything is
+                                                written, scanning each input directory once.  Pass a
+                                                cassie.validate.DirectoryIndex to share the scans with other builders.
+    :type validate:                             bool; DirectoryIndex
+
+    # staging option
+    :param stage_dir:                           Node-local directory the job scripts copy the Fldgen emulator, TGAV,
+                                                and an2month files to before running (see `stage_dir` in
+                                                build_job_scripts).  When given, the configuration files point to the
+                                                copies in this directory; the `*_dir` options still name the shared
+                                                directories the files are copied from and checked in.
+    :type stage_dir:                            str
+
+    # output layout option
+    :param fanout:                              If given, write the configuration files of each model and scenario
+                                                into "<model>/<scenario>/shard-NNN" subdirectories of `output_dir`
+                                                holding up to `fanout` runs each, instead of all in `output_dir`.  The
+                                                Xanthos configuration file of each run is named in the same layout in
+                                                `xanthos_config_dir`, so build the Xanthos configuration files and job
+                                                scripts with the same `fanout`.  The RNG seeds depend on the full path
+                                                of each file and so differ from the flat layout.  Cannot be combined
+                                                with `archive` or `overlay`.
+    :type fanout:                               int
+
+    # RNG seed options
+    :param seed_mode:                           'crc' (default) to derive the Fldgen RNGseed of each run from the CRC32
+                                                of its full file path as in earlier builds, or 'unique' to give every
+                                                run of the ensemble a different seed that does not depend on the
+                                                output path, shard, or layout; see cassie.seeds
+    :type seed_mode:                            str
+
+    :param seed:                                Study seed from 0 to 2**32 - 1 selecting the seeds of 'unique' mode
+    :type seed:                                 int
+
+    :param seed_table:                          File name of a table of the RNGseed of every run of the ensemble to
+                                                write with (model, scenario, task, rng_seed) rows.  Relative names
+                                                are placed in `output_dir`.  Use a '.npy' extension for a NumPy
+                                                structured array or '.csv' for CSV.  Only the first shard writes it,
+                                                since it covers the whole ensemble.  A warning is given if runs share
+                                                a seed.  E.g., 'seeds.csv'
+    :type seed_table:                           str
+
+    # dry run options
+    :param dry_run:                             If True, write nothing and have `build_config` return the plan of the
+                                                files the build would write for every shard; see cassie.capacity
+    :type dry_run:                              bool
+
+    :param quota:                               With `dry_run`, True to compare the plan to the free space of the
+                                                filesystem holding `output_dir`, or a dictionary with 'bytes' and/or
+                                                'inodes' limits to also compare to; see cassie.capacity.check_quota
+    :type quota:                                bool; dict
+
+    :return:                                    When `manifest` is given, a dictionary with the number of files
+                                                'written' and 'unchanged' and the list of 'stale' file names
+
     """
 
     # initialize builder
@@ -358,4 +1147,4 @@ def build_cassandra_configs(model_list, scenario_list, output_dir, runs_per_conf
                                 fldgen_build=fldgen_build,
                                 **kwargs)
 
-    cas.build_config()
+    return cas.build_config()
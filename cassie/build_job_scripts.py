@@ -1,10 +1,57 @@
+import math
 import os
-import pkg_resources
+from functools import partial
+
+from cassie.capacity import DEFAULT_BLOCK_SIZE, check_quota, digit_total, disk_size, filesystem
+from cassie.emit import emit_files
+from cassie.instrument import make_profile, profiled
+from cassie.layout import check_fanout, layout_expr
+from cassie.local import count_array
+from cassie.shard import shard_members
+from cassie.stage import STAGE_LIST, render_stage_blocks, render_stage_list, stage_inputs
+from cassie.template import load_template
+
+
+# default template contained in this package
+SBATCH_TEMPLATE = 'sbatch_template.sh'
+
+# default template used when the configuration files are stored in archives
+SBATCH_ARCHIVE_TEMPLATE = 'sbatch_archive_template.sh'
+
+# default template used when several configurations are bundled into each array task
+SBATCH_BUNDLE_TEMPLATE = 'sbatch_bundle_template.sh'
+
+# default template used when the configuration files are written as shared bases plus per-task overlays
+SBATCH_OVERLAY_TEMPLATE = 'sbatch_overlay_template.sh'
+
+# default template used for a single array job covering the whole ensemble
+SBATCH_ARRAY_TEMPLATE = 'sbatch_array_template.sh'
+
+# default SLURM MaxArraySize; larger consolidated ensembles are bundled to fit in a single array job
+MAX_ARRAY_SIZE = 1001
+
+# file names of the consolidated array job script and its array task id to member lookup table
+ARRAY_SCRIPT = 'run_ensemble.sh'
+ARRAY_LOOKUP = 'ensemble_lookup.txt'
+
+# tags that can be replaced in the template file
+SBATCH_TAGS = ('model', 'scenario', 'account', 'partition', 'ntasks', 'nodes', 'walltime', 'jobname', 'logdir',
+               'cassconfigdir', 'casslogdir', 'cassmainscript', 'cassarchive', 'xanthosarchive', 'localdir',
+               'tasklist', 'tasklistdir', 'bundlesize', 'concurrency', 'ranks', 'arrayrange', 'lookup', 'stagedir',
+               'stagelist', 'stagein', 'stagemember', 'stageout', 'cpuspertask', 'configsubdir')
 
 
 def build_job_scripts(model_list, scenario_list, output_dir, cassandra_config_dir, cassandra_log_dir,
                       cassandra_main_script, sbatch_account, sbatch_partition='slurm', sbatch_walltime='01:00:00',
-                      sbatch_ntasks=3, sbatch_nodes=3, sbatch_jobname='cassie', sbatch_logdir='.', template=None):
+                      sbatch_ntasks=3, sbatch_nodes=3, sbatch_jobname='cassie', sbatch_logdir='.', template=None,
+                      workers=None, backend='thread', cassandra_archive=None, xanthos_archive=None,
+                      archive_local_dir='/tmp/cassie', runs_per_config=None, bundle_size=None, bundle_concurrency=1,
+                      task_list_dir=None, consolidated=False, max_array_size=MAX_ARRAY_SIZE, max_running_nodes=None,
+                      profile=None, progress=None, cassandra_overlay=False, shard_index=0, num_shards=1,
+                      walltime_logs=None, walltime_quantile=0.95, walltime_margin=0.2, stage_dir=None,
+                      fldgen_emulator_dir=None, fldgen_tgav_file_dir=None, an2month_file_dir=None,
+                      drought_thresholds_dir=None, xanthos_template=None, resources=None, fanout=None, dry_run=False,
+                      quota=None):
     """Generate SLURM job scripts to run Cassandra.
 
     :param model_list:                  List of GCM names to use.
@@ -48,54 +95,530 @@ def build_job_scripts(model_list, scenario_list, output_dir, cassandra_config_di
     :param sbatch_logdir:               SBATCH setting for --output (where to write SLURM out to)
     :type sbatch_logdir:                str
 
-    :param template:                    Full path with filename and sh extension to an alternate template file.  The
-                                        template contained in this package is used by default.
-    :type template:                     str
+    :param template:                    Full path with filename and sh extension to an alternate template file, or a
+                                        compiled cassie.template.Template.  The template contained in this package is
+                                        used by default.
+    :type template:                     str; Template
+
+    :param workers:                     Number of parallel workers used to generate the files.  None or 1 generates
+                                        the files serially.
+    :type workers:                      int
+
+    :param backend:                     Parallel backend; either 'thread' (I/O-bound writing) or 'process'
+                                        (CPU-bound rendering)
+    :type backend:                      str
+
+    :param cassandra_archive:           Full path to a Cassandra configuration archive written using the `archive`
+                                        option of build_cassandra_configs.  When given, each task extracts only its
+                                        own configuration file to `archive_local_dir` at task start instead of
+                                        reading it from `cassandra_config_dir`.
+    :type cassandra_archive:            str
+
+    :param xanthos_archive:             Full path to a Xanthos configuration archive written using the `archive`
+                                        option of build_xanthos_configs.  When given along with
+                                        `cassandra_archive`, each task also extracts its Xanthos configuration file
+                                        to `archive_local_dir`; the Cassandra configuration files must have been
+                                        built with `xanthos_config_dir` set to `archive_local_dir`.
+    :type xanthos_archive:              str
+
+    :param archive_local_dir:           Node-local directory the archive members are extracted to, or overlay
+                                        configuration files are merged into
+    :type archive_local_dir:            str
+
+    :param runs_per_config:             Number of runs per (model, scenario) configuration setup; required when
+                                        bundling
+    :type runs_per_config:              int
+
+    :param bundle_size:                 Number of configurations each array task runs.  When given, a task list file
+                                        "tasks_<model>_<scenario>.txt" is written for every script and each array
+                                        task runs its bundle of task ids from it, paying the environment setup once
+                                        per bundle.  The exit code of every configuration is recorded in a status
+                                        file in `sbatch_logdir`, and the array range is set in the script.
+    :type bundle_size:                  int
+
+    :param bundle_concurrency:          Number of configurations of a bundle that run at the same time; the
+                                        `sbatch_ntasks` MPI ranks are divided evenly between them
+    :type bundle_concurrency:           int
+
+    :param task_list_dir:               Full path to the directory the task list and lookup files are read from by
+                                        the job scripts.  Defaults to `output_dir`.
+    :type task_list_dir:                str
+
+    :param consolidated:                If True, write a single array job script "run_ensemble.sh" for the whole
+                                        ensemble along with "ensemble_lookup.txt", which maps each array task id to
+                                        its (model, scenario, task) so the study is submitted once.  Requires
+                                        `runs_per_config`.  May be combined with `bundle_size`.
+    :type consolidated:                 bool
+
+    :param max_array_size:              Largest array the scheduler accepts (SLURM MaxArraySize).  A consolidated
+                                        ensemble with more members is automatically bundled to fit.
+    :type max_array_size:               int
+
+    :param max_running_nodes:           Maximum number of nodes the array job may use at once; sets the `%N`
+                                        throttle of the array range to `max_running_nodes // sbatch_nodes`.  Only
+                                        used when the array range is generated (bundled or consolidated).
+    :type max_running_nodes:            int
+
+    :param profile:                     Record where the build time goes; either a full path with file name and
+                                        extension to write a timing summary to (JSON, or folded stacks for flame
+                                        graphs if it ends with '.folded') or a cassie.instrument.Profile to record
+                                        into
+    :type profile:                      str; Profile
+
+    :param progress:                    Callable run as `progress(done, profile)` as files are generated, where
+                                        `done` is the number of files generated so far
+    :type progress:                     callable
+
+    :param cassandra_overlay:           If True, the Cassandra and Xanthos configuration files were written with
+                                        `overlay=True`; each task merges its own configuration files into a
+                                        directory under `archive_local_dir` at task start and removes them at the
+                                        end.  Cannot be combined with `cassandra_archive`, `bundle_size`, or
+                                        `consolidated`.
+    :type cassandra_overlay:            bool
+
+    :param shard_index:                 Index of the slice of the job files to generate, from 0 to `num_shards` - 1
+    :type shard_index:                  int
+
+    :param num_shards:                  Number of disjoint, contiguous slices the job files are split into so
+                                        several nodes can each generate one; together the shards write the same
+                                        files as a single build
+    :type num_shards:                   int
+
+    :param walltime_logs:               Directory or list of directories of the SLURM output files of previous runs.
+                                        When given, the time limit of each script is estimated from the runtimes of
+                                        its model and scenario (see cassie.walltime.estimate_walltimes) instead of
+                                        using `sbatch_walltime`, which is kept for combinations without history.
+    :type walltime_logs:                str; list
+
+    :param walltime_quantile:           Quantile of the previous runtimes the estimated time limit covers
+    :type walltime_quantile:            float
+
+    :param walltime_margin:             Safety margin added to the quantile as a fraction of it
+    :type walltime_margin:              float
+
+    :param stage_dir:                   Node-local directory (e.g., "/tmp/cassie/inputs") to copy the shared input
+                                        files of each model and scenario to before Cassandra runs.  A stage list
+                                        "stage_inputs.txt" is written with the input files of every combination, and
+                                        each task copies its files once per node under a lock, so the tasks running
+                                        on a node share one copy instead of all reading the shared filesystem.  The
+                                        copies are removed when the last task on the node using them ends.  The
+                                        Cassandra and Xanthos configuration files must be built with the same
+                                        `stage_dir` so they point to the copies.
+    :type stage_dir:                    str
+
+    :param fldgen_emulator_dir:         Shared directory of the Fldgen emulator files to stage
+    :type fldgen_emulator_dir:          str
+
+    :param fldgen_tgav_file_dir:        Shared directory of the Fldgen TGAV files to stage
+    :type fldgen_tgav_file_dir:         str
+
+    :param an2month_file_dir:           Shared directory of the an2month fractions to stage
+    :type an2month_file_dir:            str
+
+    :param drought_thresholds_dir:      Shared directory of the Xanthos drought thresholds to stage
+    :type drought_thresholds_dir:       str
+
+    :param xanthos_template:            Template the Xanthos configuration files are built with, if not the default.
+                                        The drought thresholds staged are the files in `drought_thresholds_dir` that
+                                        the configuration files rendered from it reference.
+    :type xanthos_template:             str
+
+    :param resources:                   Resource plan from BuildCassandraConfigs.resource_plan or
+                                        cassie.resources.resource_plan.  When given, `sbatch_ntasks` and
+                                        `sbatch_nodes` are replaced by the planned tasks and nodes, each task
+                                        requests the planned `--cpus-per-task`, and every run is launched with the
+                                        planned number of MPI ranks.  Build the Xanthos configuration files with
+                                        `xanthos_jobs` from the same plan.
+    :type resources:                    dict
+
+    :param fanout:                      `fanout` the Cassandra configuration files were built with; each task reads
+                                        its configuration file from the "<model>/<scenario>/shard-NNN" subdirectory
+                                        of `cassandra_config_dir` holding it.  Cannot be combined with
+                                        `cassandra_archive` or `cassandra_overlay`.
+    :type fanout:                       int
+
+    :param dry_run:                     If True, write nothing and return the plan of the files the build would
+                                        write for every shard along with the number of scripts and array tasks and
+                                        the core hours and node hours they request; see `job_script_plan`
+    :type dry_run:                      bool
+
+    :param quota:                       With `dry_run`, True to compare the plan to the free space of the filesystem
+                                        holding `output_dir`, or a dictionary with 'bytes' and/or 'inodes' limits to
+                                        also compare to; see cassie.capacity.check_quota
+    :type quota:                        bool; dict
+
+    :return:                            When `walltime_logs` is given, a report of the runtime statistics and time
+                                        limit of each script ('scripts'), the core hours requested with
+                                        `sbatch_walltime` and the estimated time limits ('core_hours'), and the
+                                        node hours held in the queue and the shorter time limits ('queue', see
+                                        cassie.walltime.queue_savings); the plan of the build with `dry_run`
+
+    """
+
+    if task_list_dir is None:
+        task_list_dir = output_dir
+
+    walltimes = report = None
+
+    if walltime_logs is not None:
+        # cassie.walltime reads the output files with the patterns of cassie.resume, which imports this module
+        from cassie.walltime import estimate_walltimes
+
+        walltimes, report = estimate_walltimes(model_list, scenario_list, walltime_logs,
+                                               quantile_level=walltime_quantile, margin=walltime_margin,
+                                               default=sbatch_walltime)
+
+    render = job_script_renderer(model_list, scenario_list, cassandra_config_dir, cassandra_log_dir,
+                                 cassandra_main_script, sbatch_account, sbatch_partition=sbatch_partition,
+                                 sbatch_walltime=sbatch_walltime, sbatch_ntasks=sbatch_ntasks, sbatch_nodes=sbatch_nodes,
+                                 sbatch_jobname=sbatch_jobname, sbatch_logdir=sbatch_logdir, template=template,
+                                 cassandra_archive=cassandra_archive, xanthos_archive=xanthos_archive,
+                                 archive_local_dir=archive_local_dir, runs_per_config=runs_per_config,
+                                 bundle_size=bundle_size, bundle_concurrency=bundle_concurrency,
+                                 task_list_dir=task_list_dir, consolidated=consolidated, max_array_size=max_array_size,
+                                 max_running_nodes=max_running_nodes, cassandra_overlay=cassandra_overlay,
+                                 walltimes=walltimes, stage_dir=stage_dir, fldgen_emulator_dir=fldgen_emulator_dir,
+                                 fldgen_tgav_file_dir=fldgen_tgav_file_dir, an2month_file_dir=an2month_file_dir,
+                                 drought_thresholds_dir=drought_thresholds_dir, xanthos_template=xanthos_template,
+                                 resources=resources, fanout=fanout)
+
+    members = job_file_members(model_list, scenario_list, bundle_size=bundle_size, consolidated=consolidated,
+                               staged=stage_dir is not None)
+
+    if dry_run:
+        return job_script_plan(render, members, output_dir, quota=quota)
+
+    members = shard_members(members, len(members), shard_index, num_shards)
+
+    profile_option, profile = profile, make_profile(profile, progress)
+
+    with profiled(profile, 'build_job_scripts', profile_option):
+        emit_files(render, members, output_dir, workers=workers, backend=backend, profile=profile)
+
+    if report is not None:
+        from cassie.walltime import queue_savings, requested_core_hours
+
+        array_str = render.args[1]['arrayrange']
+
+        # the core and node hours requested are only known when the array range is part of the scripts
+        if array_str:
+            n_tasks = count_array(array_str)
+            pairs = [(None, None)] if consolidated else [(model, scenario) for model in model_list
+                                                         for scenario in scenario_list]
+            array_tasks = {pair: n_tasks for pair in pairs}
+
+            cores_per_task = render.args[1]['ntasks'] * render.args[1]['cpuspertask']
+
+            report['core_hours'] = requested_core_hours(walltimes, sbatch_walltime, array_tasks, cores_per_task)
+            report['queue'] = queue_savings(walltimes, sbatch_walltime, array_tasks, render.args[1]['nodes'])
+
+    return report
+
+
+def iter_job_scripts(model_list, scenario_list, cassandra_config_dir, cassandra_log_dir, cassandra_main_script,
+                     sbatch_account, **kwargs):
+    """Lazily generate SLURM job scripts, along with task lists when bundling, the lookup table when consolidated,
+    and the stage list when staging, without writing them to disk.
+
+    Keyword arguments are the same as those of build_job_scripts; the output options are not used.  When bundling
+    or consolidating, `task_list_dir` defaults to the current directory.
+
+    :return:                            Generator of (relative path, text) tuples
+
+    """
+
+    render = job_script_renderer(model_list, scenario_list, cassandra_config_dir, cassandra_log_dir,
+                                 cassandra_main_script, sbatch_account, **kwargs)
+
+    for member in job_file_members(model_list, scenario_list, bundle_size=kwargs.get('bundle_size'),
+                                   consolidated=kwargs.get('consolidated', False),
+                                   staged=kwargs.get('stage_dir') is not None):
+        yield render(member)
+
+
+def job_file_members(model_list, scenario_list, bundle_size=None, consolidated=False, staged=False):
+    """Get the (kind, model, scenario) members of the files to generate.  Kinds are 'script' and 'tasks' for the
+    per (model, scenario) job scripts and task lists, 'array' and 'lookup' for the consolidated array job, and
+    'stage' for the stage list shared by every script.
+
+    """
+
+    if consolidated:
+        members = [('array', None, None), ('lookup', None, None)]
+
+    else:
+        members = [('script', model, scenario) for model in model_list for scenario in scenario_list]
+
+        if bundle_size is not None:
+            members += [('tasks', model, scenario) for model in model_list for scenario in scenario_list]
+
+    if staged:
+        members.append(('stage', None, None))
+
+    return members
+
+
+def job_script_renderer(model_list, scenario_list, cassandra_config_dir, cassandra_log_dir, cassandra_main_script,
+                        sbatch_account, sbatch_partition='slurm', sbatch_walltime='01:00:00', sbatch_ntasks=3,
+                        sbatch_nodes=3, sbatch_jobname='cassie', sbatch_logdir='.', template=None,
+                        cassandra_archive=None, xanthos_archive=None, archive_local_dir='/tmp/cassie',
+                        runs_per_config=None, bundle_size=None, bundle_concurrency=1, task_list_dir='.',
+                        consolidated=False, max_array_size=MAX_ARRAY_SIZE, max_running_nodes=None,
+                        cassandra_overlay=False, walltimes=None, stage_dir=None, fldgen_emulator_dir=None,
+                        fldgen_tgav_file_dir=None, an2month_file_dir=None, drought_thresholds_dir=None,
+                        xanthos_template=None, resources=None, fanout=None):
+    """Compile the template and bind the content shared by every script.  `walltimes` optionally maps
+    (model, scenario) to the time limit of its script, or (None, None) for the consolidated array job, in place of
+    `sbatch_walltime`.
+
+    :return:                            Picklable callable taking a (kind, model, scenario) member from
+                                        job_file_members and returning a (file name, text) tuple
 
     """
 
+    if (bundle_size is not None or consolidated) and runs_per_config is None:
+        raise ValueError("`runs_per_config` is required when using `bundle_size` or `consolidated`")
+
+    if (bundle_size is not None or consolidated) and cassandra_archive is not None:
+        raise ValueError("`bundle_size` and `consolidated` cannot be combined with `cassandra_archive`")
+
+    if cassandra_overlay and (bundle_size is not None or consolidated or cassandra_archive is not None):
+        raise ValueError("`cassandra_overlay` cannot be combined with `bundle_size`, `consolidated`, or "
+                         "`cassandra_archive`")
+
+    check_fanout(fanout)
+
+    if fanout is not None and (cassandra_archive is not None or cassandra_overlay):
+        raise ValueError("`fanout` cannot be combined with `cassandra_archive` or `cassandra_overlay`")
+
+    # MPI ranks of each run and cores of each task
+    ranks, cpus_per_task = max(1, sbatch_ntasks // bundle_concurrency), 1
+
+    if resources is not None:
+
+        if resources['concurrency'] != bundle_concurrency:
+            raise ValueError(f"The resource plan is for {resources['concurrency']} concurrent run(s), not "
+                             f"`bundle_concurrency` {bundle_concurrency}")
+
+        sbatch_ntasks, sbatch_nodes = resources['ntasks'], resources['nodes']
+        ranks, cpus_per_task = resources['ranks'], resources['cpus_per_task']
+
+    # number of members each array index covers
+    if consolidated:
+        n_members = len(model_list) * len(scenario_list) * runs_per_config
+
+        if bundle_size is None and n_members > max_array_size:
+            bundle_size = math.ceil(n_members / max_array_size)
+
+    else:
+        n_members = runs_per_config
+
     # use default configuration template file if user does not give one
-    if template is None:
-        template = pkg_resources.resource_filename('cassie', 'data/sbatch_template.sh')
-
-    # existing tags to replace in the template file
-    model_tag = '<model>'
-    scenario_tag = '<scenario>'
-    account_tag = '<account>'
-    partition_tag = '<partition>'
-    ntasks_tag = '<ntasks>'
-    nodes_tag = '<nodes>'
-    time_tag = '<walltime>'
-    jobname_tag = '<jobname>'
-    logdir_tag = '<logdir>'
-    cassandra_configdir_tag = '<cassconfigdir>'
-    cassandra_logdir_tag = '<casslogdir>'
-    cassandra_script_tag = '<cassmainscript>'
-
-    for model in model_list:
-        for scenario in scenario_list:
-
-            output_file = os.path.join(output_dir, f'run_{model.lower()}_{scenario}.sh')
-
-            with open(output_file, 'w') as out:
-                with open(template) as get:
-
-                    f = get.read()
-
-                    # replace tag names with dynamic content
-                    fx = f.replace(model_tag, model)
-                    fx = fx.replace(scenario_tag, scenario)
-
-                    fx = fx.replace(account_tag, sbatch_account)
-                    fx = fx.replace(partition_tag, sbatch_partition)
-                    fx = fx.replace(ntasks_tag, str(sbatch_ntasks))
-                    fx = fx.replace(nodes_tag, str(sbatch_nodes))
-                    fx = fx.replace(time_tag, sbatch_walltime)
-                    fx = fx.replace(jobname_tag, sbatch_jobname)
-                    fx = fx.replace(logdir_tag, sbatch_logdir)
-
-                    fx = fx.replace(cassandra_configdir_tag, cassandra_config_dir)
-                    fx = fx.replace(cassandra_logdir_tag, cassandra_log_dir)
-                    fx = fx.replace(cassandra_script_tag, cassandra_main_script)
-
-                    out.write(fx)
+    if consolidated:
+        default_template = SBATCH_ARRAY_TEMPLATE
+    elif bundle_size is not None:
+        default_template = SBATCH_BUNDLE_TEMPLATE
+    elif cassandra_overlay:
+        default_template = SBATCH_OVERLAY_TEMPLATE
+    elif cassandra_archive is None:
+        default_template = SBATCH_TEMPLATE
+    else:
+        default_template = SBATCH_ARCHIVE_TEMPLATE
+
+    template = load_template(template, default_template)
+
+    # every tag available to the template; tags the template does not use are ignored
+    template.validate(SBATCH_TAGS)
+
+    # content that is shared by every script
+    values = {'account': sbatch_account,
+              'partition': sbatch_partition,
+              'ntasks': sbatch_ntasks,
+              'nodes': sbatch_nodes,
+              'walltime': sbatch_walltime,
+              'jobname': sbatch_jobname,
+              'logdir': sbatch_logdir,
+              'cassconfigdir': cassandra_config_dir,
+              'casslogdir': cassandra_log_dir,
+              'cassmainscript': cassandra_main_script,
+              'cassarchive': cassandra_archive or '',
+              'xanthosarchive': xanthos_archive or '',
+              'localdir': archive_local_dir,
+              'tasklistdir': task_list_dir,
+              'lookup': os.path.join(task_list_dir, ARRAY_LOOKUP),
+              'bundlesize': bundle_size or 1,
+              'concurrency': bundle_concurrency,
+              'ranks': ranks,
+              'cpuspertask': cpus_per_task,
+              'arrayrange': array_range(n_members, bundle_size or 1, sbatch_nodes, max_running_nodes),
+              'stagedir': stage_dir or '',
+              'stagelist': os.path.join(task_list_dir, STAGE_LIST),
+              'configsubdir': layout_expr('${model}', '${scenario}', fanout)}
+
+    # shared input files of every (model, scenario) combination copied to `stage_dir` by the scripts
+    inputs = None
+
+    if stage_dir is not None:
+        inputs = stage_inputs(model_list, scenario_list, fldgen_emulator_dir=fldgen_emulator_dir,
+                              fldgen_tgav_file_dir=fldgen_tgav_file_dir, an2month_file_dir=an2month_file_dir,
+                              drought_thresholds_dir=drought_thresholds_dir, xanthos_template=xanthos_template)
+
+    return partial(render_job_file, template, values, (model_list, scenario_list, runs_per_config, inputs, fanout),
+                   walltimes or {})
+
+
+def job_script_plan(render, members, output_dir, quota=None):
+    """Plan the files of a job script build without writing them, along with the array tasks the scripts run and
+    the resources they request.  Scripts and stage lists are rendered; the size of task lists and the lookup table
+    is computed from the number of runs.  Without an array range in the scripts, each script is counted as running
+    one array task per run, as submitted with `sbatch --array=0-<runs_per_config - 1>`; the array tasks, core hours,
+    and node hours are None if `runs_per_config` is not given either.
+
+    :param render:                      Render callable from `job_script_renderer`
+    :type render:                       callable
+
+    :param members:                     List of members from `job_file_members`
+    :type members:                      list
+
+    :param output_dir:                  Directory the scripts would be written to
+    :type output_dir:                   str
+
+    :param quota:                       See cassie.capacity.check_quota
+    :type quota:                        bool; dict
+
+    :return:                            Plan dictionary of cassie.capacity with the number of 'scripts' and
+                                        'array_tasks', and the 'core_hours' and 'node_hours' requested
+
+    """
+
+    from cassie.walltime import requested_core_hours
+
+    _, values, (model_list, scenario_list, runs_per_config, _, _), walltimes = render.args
+
+    block_size, _, _ = filesystem(output_dir)
+    block_size = block_size or DEFAULT_BLOCK_SIZE
+
+    sizes = []
+
+    for member in members:
+        kind, model, scenario = member
+
+        if kind == 'tasks':
+            sizes.append(digit_total(runs_per_config) + runs_per_config)
+
+        elif kind == 'lookup':
+            sizes.append(sum((len(model) + len(scenario) + 3) * runs_per_config + digit_total(runs_per_config)
+                             for model in model_list for scenario in scenario_list))
+
+        else:
+            sizes.append(len(render(member)[1].encode()))
+
+    plan = {'files': len(sizes),
+            'directories': 0,
+            'inodes': len(sizes),
+            'bytes': sum(sizes),
+            'disk_bytes': sum(disk_size(size, block_size) for size in sizes),
+            'exact': True}
+
+    scripts = [(model, scenario) for kind, model, scenario in members if kind in ('script', 'array')]
+
+    if values['arrayrange']:
+        n_tasks = count_array(values['arrayrange'])
+    else:
+        n_tasks = runs_per_config
+
+    plan['scripts'] = len(scripts)
+    plan['array_tasks'] = plan['core_hours'] = plan['node_hours'] = None
+
+    if n_tasks is not None:
+        cores_per_task = values['ntasks'] * values['cpuspertask']
+
+        core_hours = requested_core_hours(walltimes, values['walltime'], {pair: n_tasks for pair in scripts},
+                                          cores_per_task)['estimated']
+
+        plan['array_tasks'] = n_tasks * len(scripts)
+        plan['core_hours'] = core_hours
+        plan['node_hours'] = core_hours / cores_per_task * values['nodes']
+
+    if quota not in (None, False):
+        plan['quota'] = check_quota(plan, output_dir, quota)
+
+    return plan
+
+
+def array_range(n_members, bundle_size, sbatch_nodes, max_running_nodes=None):
+    """Get the SLURM --array range covering `n_members` in bundles of `bundle_size`, with a `%N` throttle derived
+    from the node budget when `max_running_nodes` is given.  An empty string is returned if `n_members` is None.
+
+    """
+
+    if not n_members:
+        return ''
+
+    range_str = f"0-{math.ceil(n_members / bundle_size) - 1}"
+
+    if max_running_nodes is not None:
+        range_str += f"%{max(1, max_running_nodes // sbatch_nodes)}"
+
+    return range_str
+
+
+def render_job_file(template, values, ensemble, walltimes, member):
+    """Render a single job file.
+
+    :param ensemble:                    (model list, scenario list, runs per config, stage inputs, fanout) tuple used
+                                        for task lists, the lookup table, the stage list, and configuration paths
+    :type ensemble:                     tuple
+
+    :param walltimes:                   Dictionary of (model, scenario) to a time limit replacing the shared one
+    :type walltimes:                    dict
+
+    :param member:                      (kind, model, scenario) tuple from job_file_members
+    :type member:                       tuple
+
+    :return:                            (file name, text) tuple
+
+    """
+
+    kind, model, scenario = member
+    model_list, scenario_list, runs_per_config, inputs, fanout = ensemble
+
+    if kind == 'script':
+        tasklist = os.path.join(values['tasklistdir'], task_list_name(model, scenario))
+
+        walltime = walltimes.get((model, scenario), values['walltime'])
+        configsubdir = layout_expr(model, scenario, fanout)
+
+        stage_blocks = render_stage_blocks(values['stagedir'] or None, values['stagelist'], model, scenario)
+
+        return job_script_name(model, scenario), template.render(dict(values, model=model, scenario=scenario,
+                                                                           tasklist=tasklist, walltime=walltime,
+                                                                           configsubdir=configsubdir, **stage_blocks))
+
+    if kind == 'tasks':
+        return task_list_name(model, scenario), ''.join(f"{tid}\n" for tid in range(runs_per_config))
+
+    if kind == 'stage':
+        return STAGE_LIST, render_stage_list(inputs)
+
+    if kind == 'array':
+        stage_blocks = render_stage_blocks(values['stagedir'] or None, values['stagelist'])
+
+        return ARRAY_SCRIPT, template.render(dict(values, walltime=walltimes.get((None, None), values['walltime']),
+                                                  **stage_blocks))
+
+    # one "model scenario task" line per array member in model, scenario, task order
+    return ARRAY_LOOKUP, ''.join(f"{model} {scenario} {tid}\n" for model in model_list for scenario in scenario_list
+                                 for tid in range(runs_per_config))
+
+
+def job_script_name(model, scenario):
+    """Get the file name of the job script for a (model, scenario) combination."""
+
+    return f'run_{model.lower()}_{scenario}.sh'
+
+
+def task_list_name(model, scenario):
+    """Get the file name of the task list for a (model, scenario) combination."""
+
+    return f'tasks_{model.lower()}_{scenario}.txt'
@@ -1,11 +1,32 @@
 import os
-import pkg_resources
+from functools import partial
+
+from cassie.archive import write_archive
+from cassie.capacity import plan_files
+from cassie.emit import emit_files
+from cassie.instrument import make_profile, profiled, stage
+from cassie.layout import check_fanout, count_layout_dirs, layout_name, make_layout
+from cassie.manifest import emit_incremental
+from cassie.overlay import OverlayRenderer, overlay_members
+from cassie.shard import shard_members, shard_name
+from cassie.template import load_template
+from cassie.validate import make_index, referenced_paths, validate_inputs
+
+
+# default template contained in this package
+XANTHOS_TEMPLATE = 'xanthos_thorn_abcd_drought_template.ini'
+
+# tags that can be replaced in the template file
+XANTHOS_TAGS = ('projectname', 'outputnamestr', 'rootdir', 'outputvars', 'model', 'scenario', 'task', 'outdir',
+                'thresholdsdir', 'droughtstats', 'jobs')
 
 
 def build_xanthos_configs(model_list, scenario_list, output_dir, n_configs, xanthos_root_dir, xanthos_output_dir,
                           drought_thresholds_dir, xanthos_output_variables='q', pet_model_abbrev=None,
                           runoff_model_abbrev=None, router_model_abbrev=None, template=None,
-                          generate_drought_stats=0):
+                          generate_drought_stats=0, workers=None, backend='thread', archive=None, manifest=None,
+                          stale='report', profile=None, progress=None, overlay=False, shard_index=0, num_shards=1,
+                          validate=False, stage_dir=None, xanthos_jobs=-1, fanout=None, dry_run=False, quota=None):
     """Generate Xanthos configuration files for use in Cassandra.  A default template is used that is customized for
     running the Thornthwaite PET with the abcd runoff model to execute the drought module.  You can provide your own
     template file as well that has custom configurations.
@@ -34,9 +55,9 @@ def build_xanthos_configs(model_list, scenario_list, output_dir, n_configs, xant
     :type xanthos_output_dir:           str
 
     :param drought_thresholds_dir:      The full path to the directory containing the drought thresholds.  The
-                                        expected threshold filename format for the files within is:
-                                        "drought_thresholds_<model>_16610101-22991231.npy" where model matches the
-                                        those in the "model_list" parameter of this function.
+                                        default template expects the threshold filename format for the files within
+                                        to be:  "drought_thresholds_<model>.npy" where model matches those in the
+                                        "model_list" parameter of this function.
                                         E.g., '/path/to/my/dir'
                                         NOTE:  no trailing slash
     :type drought_thresholds_dir:       str
@@ -59,70 +80,325 @@ def build_xanthos_configs(model_list, scenario_list, output_dir, n_configs, xant
                                         E.g., 'mrtm'
     :type router_model_abbrev:          str
 
-    :param template:                    Full path with filename and ini extension to an alternate template file.  The
-                                        template contained in this package is used by default.
-    :type template:                     str
+    :param template:                    Full path with filename and ini extension to an alternate template file, or a
+                                        compiled cassie.template.Template.  The template contained in this package is
+                                        used by default.
+    :type template:                     str; Template
 
     :param generate_drought_stats:      1 to generate drought statistics, 0 to NOT generate
     :type generate_drought_stats:       int
 
+    :param workers:                     Number of parallel workers used to generate the files.  None or 1 generates
+                                        the files serially.
+    :type workers:                      int
+
+    :param backend:                     Parallel backend; either 'thread' (I/O-bound writing) or 'process'
+                                        (CPU-bound rendering)
+    :type backend:                      str
+
+    :param archive:                     File name of a single uncompressed tar archive to write all configuration
+                                        files into instead of writing one file per run.  Relative names are placed
+                                        in `output_dir`.  An offset index is written next to it; see
+                                        cassie.archive.ConfigArchive to look up or extract members.
+                                        E.g., 'xanthos_configs.tar'
+    :type archive:                      str
+
+    :param manifest:                    File name of a manifest used for incremental rebuilds.  Relative names are
+                                        placed in `output_dir`.  When given, only files whose content changed since
+                                        the previous build are written and files that are no longer generated are
+                                        handled according to `stale`.
+                                        E.g., '.cassie_manifest.json'
+    :type manifest:                     str
+
+    :param stale:                       'report' to warn about files from a previous build that are no longer
+                                        generated, or 'remove' to delete them.  Only used with `manifest`.
+    :type stale:                        str
+
+    :param profile:                     Record where the build time goes; either a full path with file name and
+                                        extension to write a timing summary to (JSON, or folded stacks for flame
+                                        graphs if it ends with '.folded') or a cassie.instrument.Profile to record
+                                        into
+    :type profile:                      str; Profile
+
+    :param progress:                    Callable run as `progress(done, profile)` as files are generated, where
+                                        `done` is the number of files generated so far
+    :type progress:                     callable
+
+    :param overlay:                     If True, write one base file plus one overlay file holding the per-task
+                                        lines for each model and scenario instead of one file per run; see
+                                        cassie.overlay for the layout and merge rule.  Cannot be combined with
+                                        `archive`.
+    :type overlay:                      bool
+
+    :param shard_index:                 Index of the slice of the ensemble to generate, from 0 to `num_shards` - 1
+    :type shard_index:                  int
+
+    :param num_shards:                  Number of disjoint, contiguous slices the ensemble is split into so several
+                                        nodes can each generate one.  Every shard must use the same `output_dir`.
+                                        Manifests are written per shard (e.g., '.cassie_manifest.shard-3-of-8.json')
+                                        and stale files are not checked; combine them once every shard has finished
+                                        with cassie.shard.merge_manifests.  Cannot be combined with `archive`.
+    :type num_shards:                   int
+
+    :param validate:                    If True, check that the drought threshold files referenced by the
+                                        configuration files exist before anything is written, scanning each input
+                                        directory once.  Only checked when `generate_drought_stats` is 1.  Pass a
+                                        cassie.validate.DirectoryIndex to share the scans with other builders.
+    :type validate:                     bool; DirectoryIndex
+
+    :param stage_dir:                   Node-local directory the job scripts copy the drought thresholds to before
+                                        running (see `stage_dir` in build_job_scripts).  When given, the
+                                        configuration files point to the copies in this directory, and
+                                        `drought_thresholds_dir` is the shared directory they are copied from.
+    :type stage_dir:                    str
+
+    :param xanthos_jobs:                Number of cores Xanthos runs basins in parallel on (-1, all cores; -2, all but
+                                        one core).  Use `xanthos_jobs` of the resource plan (see
+                                        BuildCassandraConfigs.resource_plan) so Xanthos only uses the cores of its
+                                        MPI rank on nodes shared with other ranks.
+    :type xanthos_jobs:                 int
+
+    :param fanout:                      If given, write the files of each model and scenario into
+                                        "<model>/<scenario>/shard-NNN" subdirectories of `output_dir` holding up to
+                                        `fanout` tasks each, the layout the Cassandra configuration files built with
+                                        the same `fanout` reference.  Cannot be combined with `archive` or
+                                        `overlay`.
+    :type fanout:                       int
+
+    :param dry_run:                     If True, write nothing and return the plan of the files the build would
+                                        write for every shard; see cassie.capacity
+    :type dry_run:                      bool
+
+    :param quota:                       With `dry_run`, True to compare the plan to the free space of the filesystem
+                                        holding `output_dir`, or a dictionary with 'bytes' and/or 'inodes' limits to
+                                        also compare to; see cassie.capacity.check_quota
+    :type quota:                        bool; dict
+
+    :return:                            When `manifest` is given, a dictionary with the number of files 'written'
+                                        and 'unchanged' and the list of 'stale' file names; the plan of the build
+                                        with `dry_run`
+
+    :raises MissingInputError:          If `validate` is set and input files do not exist
+
     """
 
-    # use default configuration template file if user does not give one
-    if template is None:
-        template = pkg_resources.resource_filename('cassie', 'data/xanthos_thorn_abcd_drought_template.ini')
-
-    # existing tags to replace in the template file
-    projectname_tag = '<projectname>'
-    outputnamestr_tag = '<outputnamestr>'
-    rootdir_tag = '<rootdir>'
-    outputvars_tag = '<outputvars>'
-    model_tag = '<model>'
-    scenario_tag = '<scenario>'
-    task_tag = '<task>'
-    outdir_tag = '<outdir>'
-    thresholdsdir_tag = '<thresholdsdir>'
-    droughtstats_tag = '<droughtstats>'
+    render = xanthos_renderer(xanthos_root_dir, xanthos_output_dir, drought_thresholds_dir,
+                              xanthos_output_variables=xanthos_output_variables, pet_model_abbrev=pet_model_abbrev,
+                              runoff_model_abbrev=runoff_model_abbrev, router_model_abbrev=router_model_abbrev,
+                              template=template, generate_drought_stats=generate_drought_stats, stage_dir=stage_dir,
+                              xanthos_jobs=xanthos_jobs, fanout=fanout)
 
-    # set run name prefix
-    run_prefix = ''
+    members = iter_members(model_list, scenario_list, n_configs)
+    n_members = len(model_list) * len(scenario_list) * n_configs
+
+    if fanout is not None and (archive is not None or overlay):
+        raise ValueError("`fanout` cannot be combined with `archive` or `overlay`")
+
+    if overlay:
+
+        if archive is not None:
+            raise ValueError("`overlay` cannot be combined with `archive`")
+
+        render = OverlayRenderer(render, n_configs)
+        members = overlay_members((model, scenario) for model in model_list for scenario in scenario_list)
+        n_members = 2 * len(model_list) * len(scenario_list)
+
+    if num_shards > 1 and archive is not None:
+        raise ValueError("`num_shards` cannot be combined with `archive`")
+
+    members = shard_members(members, n_members, shard_index, num_shards)
+
+    if dry_run:
+        return plan_files(render.render if overlay else render,
+                          [(model, scenario) for model in model_list for scenario in scenario_list], n_configs,
+                          output_dir, directories=count_layout_dirs(len(model_list), len(scenario_list), n_configs,
+                                                                    fanout),
+                          output='archive' if archive is not None else 'overlay' if overlay else 'files', quota=quota)
+
+    profile_option, profile = profile, make_profile(profile, progress)
+
+    with profiled(profile, 'build_xanthos_configs', profile_option):
+
+        index = make_index(validate)
+
+        if index is not None and generate_drought_stats:
+            with stage('validate'):
+                validate_inputs(xanthos_input_files(render.render if overlay else render, model_list, scenario_list,
+                                                    [drought_thresholds_dir], stage_dir), index)
+
+        if fanout is not None:
+            with stage('layout'):
+                make_layout(output_dir, model_list, scenario_list, n_configs, fanout)
+
+        if archive is not None:
+            write_archive(render, members, os.path.join(output_dir, archive), workers=workers, backend=backend,
+                          profile=profile)
+
+        elif manifest is not None:
+            template, values, prefix, _ = (render.render if overlay else render).args
+
+            parameters = {'model_list': model_list, 'scenario_list': scenario_list, 'n_configs': n_configs,
+                          'run_prefix': prefix, 'template': template.source, 'overlay': overlay, 'fanout': fanout,
+                          **values}
+
+            # stale files are checked across the whole build when the shard manifests are merged
+            if num_shards > 1:
+                manifest, stale = shard_name(manifest, shard_index, num_shards), 'ignore'
+
+            _, summary = emit_incremental(render, members, output_dir, os.path.join(output_dir, manifest),
+                                          parameters, stale=stale, workers=workers, backend=backend, profile=profile)
+
+            return summary
+
+        else:
+            emit_files(render, members, output_dir, workers=workers, backend=backend, profile=profile)
+
+
+def iter_xanthos_configs(model_list, scenario_list, n_configs, xanthos_root_dir, xanthos_output_dir,
+                         drought_thresholds_dir, xanthos_output_variables='q', pet_model_abbrev=None,
+                         runoff_model_abbrev=None, router_model_abbrev=None, template=None, generate_drought_stats=0,
+                         overlay=False, shard_index=0, num_shards=1, stage_dir=None, xanthos_jobs=-1, fanout=None):
+    """Lazily generate Xanthos configuration files without writing them to disk.  Files are rendered one at a time
+    as they are requested so memory use does not grow with the size of the ensemble.
+
+    Parameters are the same as those of build_xanthos_configs; the output options are not used.
+
+    :return:                            Generator of (relative path, text) tuples in model, scenario, task order
 
-    if pet_model_abbrev is not None:
-        run_prefix += f"{pet_model_abbrev}_"
+    """
+
+    render = xanthos_renderer(xanthos_root_dir, xanthos_output_dir, drought_thresholds_dir,
+                              xanthos_output_variables=xanthos_output_variables, pet_model_abbrev=pet_model_abbrev,
+                              runoff_model_abbrev=runoff_model_abbrev, router_model_abbrev=router_model_abbrev,
+                              template=template, generate_drought_stats=generate_drought_stats, stage_dir=stage_dir,
+                              xanthos_jobs=xanthos_jobs, fanout=fanout)
+
+    members = iter_members(model_list, scenario_list, n_configs)
+    n_members = len(model_list) * len(scenario_list) * n_configs
+
+    if overlay:
+
+        if fanout is not None:
+            raise ValueError("`fanout` cannot be combined with `overlay`")
+
+        render = OverlayRenderer(render, n_configs)
+        members = overlay_members((model, scenario) for model in model_list for scenario in scenario_list)
+        n_members = 2 * len(model_list) * len(scenario_list)
+
+    members = shard_members(members, n_members, shard_index, num_shards)
+
+    for member in members:
+        yield render(member)
+
+
+def xanthos_input_files(render, model_list, scenario_list, input_dirs, stage_dir=None):
+    """Lazily generate the (key, full path) of every file in `input_dirs` referenced by the configuration files.
+    Paths are read from the rendered file of task 0 of each (model, scenario) so that custom templates are covered.
+    When the files were rendered with `stage_dir`, the node-local copies they reference are mapped back to the
+    shared file in the first of `input_dirs`.
+
+    :return:                            Generator of (key, full path) tuples
+
+    """
+
+    for model in model_list:
+        for scenario in scenario_list:
+            _, text = render((model, scenario, 0))
+
+            if stage_dir is None:
+                yield from referenced_paths(text, input_dirs)
+
+            else:
+                for key, path in referenced_paths(text, [stage_dir]):
+                    yield key, os.path.join(input_dirs[0], os.path.relpath(path, stage_dir))
 
-    if runoff_model_abbrev is not None:
-        run_prefix += f"{runoff_model_abbrev}_"
 
-    if router_model_abbrev is not None:
-        run_prefix += f"{router_model_abbrev}_"
+def iter_members(model_list, scenario_list, n_configs):
+    """Lazily generate the (model, scenario, task) members of the ensemble in model, scenario, task order."""
 
     for model in model_list:
         for scenario in scenario_list:
             for i in range(n_configs):
+                yield model, scenario, i
 
-                # construct project name
-                project_name = f"{run_prefix}{model}_{scenario}"
 
-                # construct output name string
-                output_name_str = f"{project_name}_{i}"
+def xanthos_renderer(xanthos_root_dir, xanthos_output_dir, drought_thresholds_dir, xanthos_output_variables='q',
+                     pet_model_abbrev=None, runoff_model_abbrev=None, router_model_abbrev=None, template=None,
+                     generate_drought_stats=0, stage_dir=None, xanthos_jobs=-1, fanout=None):
+    """Compile the template and bind the content shared by every file.  With `stage_dir`, the drought thresholds
+    are read from the node-local copies in that directory.  With `fanout`, file names are relative paths in the
+    hierarchical layout (see cassie.layout).
+
+    :return:                            Picklable callable taking a (model, scenario, task) member and returning a
+                                        (file name, text) tuple
+
+    """
+
+    # use default configuration template file if user does not give one
+    template = load_template(template, XANTHOS_TEMPLATE)
+
+    # every tag available to the template; tags the template does not use are ignored
+    template.validate(XANTHOS_TAGS)
 
-                # xanthos config file output name
-                output_file = os.path.join(output_dir, f"{output_name_str}.ini")
+    # set run name prefix
+    prefix = run_prefix(pet_model_abbrev, runoff_model_abbrev, router_model_abbrev)
+
+    # content that is shared by every file
+    values = {'rootdir': xanthos_root_dir,
+              'outputvars': xanthos_output_variables,
+              'outdir': xanthos_output_dir,
+              'thresholdsdir': drought_thresholds_dir if stage_dir is None else stage_dir,
+              'droughtstats': generate_drought_stats,
+              'jobs': xanthos_jobs}
+
+    check_fanout(fanout)
+
+    return partial(render_xanthos_config, template, values, prefix, fanout)
+
+
+def render_xanthos_config(template, values, run_prefix, fanout, member):
+    """Render the Xanthos configuration file for a single (model, scenario, task) member.
+
+    :return:                            (file name, text) tuple
+
+    """
+
+    model, scenario, i = member
+
+    project_name, output_name_str, file_name = xanthos_names(run_prefix, model, scenario, i)
+
+    member_values = dict(values, projectname=project_name, outputnamestr=output_name_str, model=model,
+                         scenario=scenario, task=i)
+
+    return layout_name(file_name, model, scenario, i, fanout), template.render(member_values)
+
+
+def run_prefix(pet_model_abbrev=None, runoff_model_abbrev=None, router_model_abbrev=None):
+    """Get the run name prefix shared by the Xanthos and Cassandra configuration files from the model name
+    abbreviations; e.g., 'trn_abcd_'."""
+
+    prefix = ''
+
+    for abbrev in (pet_model_abbrev, runoff_model_abbrev, router_model_abbrev):
+        if abbrev is not None:
+            prefix += f"{abbrev}_"
+
+    return prefix
+
+
+def xanthos_names(run_prefix, model, scenario, task):
+    """Get the names of a Xanthos run.  The Cassandra configuration files reference the Xanthos configuration file
+    by this file name, so both builders use this function.
+
+    :return:                            (project name, output name string, configuration file name) tuple
+
+    """
 
-                with open(output_file, 'w') as out:
-                    with open(template) as get:
-                        f = get.read()
+    # construct project name
+    project_name = f"{run_prefix}{model}_{scenario}"
 
-                        # replace tag names with dynamic content
-                        fx = f.replace(projectname_tag, project_name)
-                        fx = fx.replace(outputnamestr_tag, output_name_str)
-                        fx = fx.replace(rootdir_tag, xanthos_root_dir)
-                        fx = fx.replace(outputvars_tag, xanthos_output_variables)
-                        fx = fx.replace(model_tag, model)
-                        fx = fx.replace(scenario_tag, scenario)
-                        fx = fx.replace(task_tag, str(i))
-                        fx = fx.replace(outdir_tag, xanthos_output_dir)
-                        fx = fx.replace(thresholdsdir_tag, drought_thresholds_dir)
-                        fx = fx.replace(droughtstats_tag, str(generate_drought_stats))
+    # construct output name string
+    output_name_str = f"{project_name}_{task}"
 
-                        out.write(fx)
+    # xanthos config file output name
+    return project_name, output_name_str, f"{output_name_str}.ini"
@@ -0,0 +1,260 @@
+"""Dry-run capacity planning of an ensemble.
+
+The builders take `dry_run=True` to report what a build would cost instead of writing it:  the number of files,
+directories, and inodes, the bytes of content, and the bytes used on disk once each file is rounded up to whole
+filesystem blocks.  build_job_scripts also reports the number of scripts and array tasks and the core hours and
+node hours they request.
+
+Nothing is rendered per run.  Files only differ in size between runs through the digits of the task number, so the
+first task with each number of digits (0, 10, 100, ...) of every (model, scenario) combination is rendered and
+counted once per task with that many digits.  The sizes are exact unless other per-run values (e.g., the Fldgen
+RNG seeds of Cassandra configuration files) differ in length, or for the offsets in an archive index; the 'exact'
+entry of a plan is False when its sizes are estimates.  A plan takes milliseconds whatever the number of runs.
+
+With `quota`, the plan is compared to the free space and free inodes of the filesystem holding the output directory
+and to optional 'bytes' and 'inodes' limits, such as the quota of a project directory.
+
+"""
+import json
+import math
+import os
+import tarfile
+import warnings
+
+from cassie.overlay import OVERLAY_HEADER, base_name, render_overlay
+
+
+# block size assumed when the filesystem does not report one
+DEFAULT_BLOCK_SIZE = 4096
+
+# counts of a plan summed when combining the plans of several builders
+CAPACITY_KEYS = ('files', 'directories', 'inodes', 'bytes', 'disk_bytes', 'scripts', 'array_tasks', 'core_hours',
+                 'node_hours')
+
+
+def digit_samples(n_tasks):
+    """Get the first task with each number of digits below `n_tasks` along with the number of tasks with that many
+    digits; e.g., [(0, 10), (10, 90), (100, 150)] for 250 tasks."""
+
+    samples = []
+    start, stop = 0, 10
+
+    while start < n_tasks:
+        samples.append((start, min(stop, n_tasks) - start))
+        start, stop = stop, stop * 10
+
+    return samples
+
+
+def digit_total(n_tasks):
+    """Get the total number of digits of the task numbers 0 to `n_tasks` - 1."""
+
+    return sum(len(str(task)) * count for task, count in digit_samples(n_tasks))
+
+
+def disk_size(size, block_size):
+    """Get the bytes a file of `size` bytes uses on disk, rounded up to whole blocks."""
+
+    return math.ceil(size / block_size) * block_size
+
+
+def filesystem(path):
+    """Get the block size, free bytes, and free inodes of the filesystem holding `path`, or of its nearest existing
+    parent directory since a dry run creates nothing.  Free inodes are None if the filesystem does not limit them;
+    all are None if the filesystem cannot be queried.
+
+    :return:                            (block size, free bytes, free inodes) tuple
+
+    """
+
+    path = os.path.abspath(path)
+
+    while not os.path.exists(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+
+    if not hasattr(os, 'statvfs'):
+        return None, None, None
+
+    stats = os.statvfs(path)
+
+    return stats.f_frsize, stats.f_bavail * stats.f_frsize, stats.f_favail if stats.f_files else None
+
+
+def file_capacity(render, pairs, n_tasks, directories=0, output='files', block_size=None, exact=True):
+    """Estimate the files a builder writes for every (model, scenario, task) member without writing them.
+
+    :param render:                      Render callable of the builder taking a (model, scenario, task) member
+    :type render:                       callable
+
+    :param pairs:                       List of (model, scenario) combinations
+    :type pairs:                        list
+
+    :param n_tasks:                     Number of tasks of each combination
+    :type n_tasks:                      int
+
+    :param directories:                 Number of directories created in the output directory
+    :type directories:                  int
+
+    :param output:                      'files' for one file per member, 'overlay' for a base and overlay file per
+                                        combination, or 'archive' for a single tar archive and its index
+    :type output:                       str
+
+    :param block_size:                  Filesystem block size in bytes
+    :type block_size:                   int
+
+    :param exact:                       False if per-run values other than the task number differ in length between
+                                        the runs, so that the sizes are estimates
+    :type exact:                        bool
+
+    :return:                            Dictionary with the number of 'files', 'directories', and 'inodes', the
+                                        'bytes' of content and 'disk_bytes' used on disk, and whether the sizes are
+                                        'exact'
+
+    """
+
+    block_size = block_size or DEFAULT_BLOCK_SIZE
+
+    files = n_bytes = n_disk_bytes = 0
+
+    # size and count of the files standing in for the members of each combination
+    if output == 'files':
+        for model, scenario in pairs:
+            for task, count in digit_samples(n_tasks):
+                size = len(render((model, scenario, task))[1].encode())
+                n_bytes += size * count
+                n_disk_bytes += disk_size(size, block_size) * count
+
+        files = len(pairs) * n_tasks
+
+    elif output == 'overlay':
+        for model, scenario in pairs:
+            file_name, base_text = render((model, scenario, 0))
+            header_size = len(f"{OVERLAY_HEADER}{base_name(file_name)}\n".encode())
+
+            # the block of each task is the overlay of that task alone less the header; task 0 is the base, so its
+            # block is counted alone and task 1 stands in for the other one digit tasks
+            samples = digit_samples(n_tasks)
+            if n_tasks > 1:
+                samples[:1] = [(0, 1), (1, samples[0][1] - 1)]
+
+            overlay_size = header_size
+            for task, count in samples:
+                text = render_overlay(base_name(file_name), base_text, [(task,) + render((model, scenario, task))])
+                overlay_size += (len(text.encode()) - header_size) * count
+
+            base_size = len(base_text.encode())
+            n_bytes += base_size + overlay_size
+            n_disk_bytes += disk_size(base_size, block_size) + disk_size(overlay_size, block_size)
+
+        files = 2 * len(pairs)
+
+    elif output == 'archive':
+        archive_size = index_size = 0
+
+        for model, scenario in pairs:
+            for task, count in digit_samples(n_tasks):
+                file_name, text = render((model, scenario, task))
+                size = len(text.encode())
+
+                # a header block and the content padded to whole blocks
+                archive_size += (tarfile.BLOCKSIZE + disk_size(size, tarfile.BLOCKSIZE)) * count
+                index_size += (len(json.dumps([model, scenario, task, file_name, archive_size, size])) + 2) * count
+
+        # two zero blocks end the archive, which is padded to a whole record
+        archive_size = disk_size(archive_size + 2 * tarfile.BLOCKSIZE, tarfile.RECORDSIZE)
+
+        files = 2
+        n_bytes = archive_size + index_size
+        n_disk_bytes = disk_size(archive_size, block_size) + disk_size(index_size, block_size)
+
+    else:
+        raise ValueError(f"Unknown output '{output}'; use 'files', 'overlay', or 'archive'")
+
+    return {'files': files,
+            'directories': directories,
+            'inodes': files + directories,
+            'bytes': n_bytes,
+            'disk_bytes': n_disk_bytes,
+            'exact': exact and output != 'archive'}
+
+
+def combine_capacity(plans):
+    """Sum the plans of several builders into the plan of a whole study.  Counts a plan does not have are skipped;
+    the combined sizes are 'exact' if those of every plan are."""
+
+    combined = {'exact': True}
+
+    for plan in plans:
+        for key in CAPACITY_KEYS:
+            if plan.get(key) is not None:
+                combined[key] = combined.get(key, 0) + plan[key]
+
+        combined['exact'] = combined['exact'] and plan.get('exact', True)
+
+    return combined
+
+
+def check_quota(plan, path, quota=True):
+    """Compare a plan to the free space of the filesystem holding `path` and to optional limits, and warn if it
+    does not fit.
+
+    :param plan:                        Plan from `file_capacity` or the dry run of a builder
+    :type plan:                         dict
+
+    :param path:                        Output directory the files would be written to
+    :type path:                         str
+
+    :param quota:                       True to only compare to the free space of the filesystem, or a dictionary
+                                        with 'bytes' and/or 'inodes' limits to also compare to
+    :type quota:                        bool; dict
+
+    :return:                            Dictionary with the 'path', the 'bytes_free' and 'inodes_free' of the
+                                        filesystem, the 'bytes_limit' and 'inodes_limit', whether the plan 'fits',
+                                        and the list of 'exceeded' limits
+
+    """
+
+    limits = quota if isinstance(quota, dict) else {}
+
+    _, bytes_free, inodes_free = filesystem(path)
+
+    result = {'path': path,
+              'bytes_free': bytes_free,
+              'inodes_free': inodes_free,
+              'bytes_limit': limits.get('bytes'),
+              'inodes_limit': limits.get('inodes'),
+              'exceeded': []}
+
+    for name, needed in (('bytes', plan['disk_bytes']), ('inodes', plan['inodes'])):
+        for kind in ('free', 'limit'):
+            available = result[f"{name}_{kind}"]
+
+            if available is not None and needed > available:
+                result['exceeded'].append(f"{name}_{kind}")
+
+    result['fits'] = not result['exceeded']
+
+    if not result['fits']:
+        warnings.warn(f"The build needs {plan['disk_bytes']} bytes and {plan['inodes']} inodes in '{path}', which "
+                      f"exceeds {', '.join(result['exceeded'])}")
+
+    return result
+
+
+def plan_files(render, pairs, n_tasks, output_dir, directories=0, output='files', quota=None, exact=True):
+    """Plan the files of a builder in `output_dir`; see `file_capacity` and `check_quota`.  The block size is read
+    from the filesystem holding `output_dir`.
+
+    :return:                            Plan dictionary, with a 'quota' comparison if `quota` is given
+
+    """
+
+    block_size, _, _ = filesystem(output_dir)
+
+    plan = file_capacity(render, pairs, n_tasks, directories=directories, output=output, block_size=block_size,
+                         exact=exact)
+
+    if quota not in (None, False):
+        plan['quota'] = check_quota(plan, output_dir, quota)
+
+    return plan
@@ -0,0 +1,210 @@
+import csv
+import os
+
+
+# catalog columns and their NumPy types; string widths are sized to the data when the catalog is built
+FIELDS = (('model', 'U'),
+          ('scenario', 'U'),
+          ('task', 'i4'),
+          ('xanthos_output_name', 'U'),
+          ('cassandra_config', 'U'),
+          ('rng_seed', 'i8'),
+          ('log_dir', 'U'),
+          ('content_hash', 'U'))
+
+FIELD_NAMES = tuple(name for name, _ in FIELDS)
+
+
+class RunCatalog:
+    """Columnar index of every ensemble member, one row per (model, scenario, task), backed by a NumPy structured
+    array.  Filtering is vectorized over whole columns so it scales to millions of rows without creating a Python
+    object per row.
+
+    Columns:  model, scenario, task, xanthos_output_name, cassandra_config, rng_seed, log_dir, content_hash
+
+    :param data:                        Structured array with the catalog columns
+    :type data:                         numpy.ndarray
+
+    """
+
+    def __init__(self, data):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        """Get a column by name, or a new catalog from an index, slice, or boolean mask."""
+
+        if isinstance(key, str):
+            return self.data[key]
+
+        return RunCatalog(self.data[key])
+
+    def __repr__(self):
+        return f"RunCatalog({len(self)} runs)"
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a catalog from an iterable of row tuples ordered as the catalog columns."""
+
+        return cls(make_table(rows))
+
+    @classmethod
+    def read(cls, catalog_file):
+        """Read a catalog written by `write`; the format is chosen from the extension (.npy or .csv)."""
+
+        return cls(read_table(catalog_file))
+
+    def write(self, catalog_file):
+        """Write the catalog; the format is chosen from the extension (.npy for a NumPy structured array that loads
+        without parsing, otherwise CSV)."""
+
+        write_table(self.data, catalog_file)
+
+    def mask(self, model=None, scenario=None, tasks=None):
+        """Get a boolean mask of the rows matching every given criterion.
+
+        :param model:                   Model name or list of model names
+        :type model:                    str; list
+
+        :param scenario:                Scenario name or list of scenario names
+        :type scenario:                 str; list
+
+        :param tasks:                   A range of task numbers (e.g., range(200, 400)) or an iterable of task
+                                        numbers
+        :type tasks:                    range; iterable
+
+        :return:                        Boolean NumPy array
+
+        """
+
+        import numpy as np
+
+        selected = np.ones(len(self.data), dtype=bool)
+
+        for name, value in (('model', model), ('scenario', scenario)):
+
+            if value is None:
+                continue
+
+            if isinstance(value, str):
+                selected &= self.data[name] == value
+            else:
+                selected &= np.isin(self.data[name], list(value))
+
+        if isinstance(tasks, range):
+            task = self.data['task']
+            selected &= (task >= tasks.start) & (task < tasks.stop) & ((task - tasks.start) % tasks.step == 0)
+
+        elif tasks is not None:
+            selected &= np.isin(self.data['task'], list(tasks))
+
+        return selected
+
+    def select(self, model=None, scenario=None, tasks=None):
+        """Get a new catalog with the rows matching every given criterion; e.g., all rcp85 tasks 200-399:
+
+            catalog.select(scenario='rcp85', tasks=range(200, 400))
+
+        See `mask` for parameters.
+
+        """
+
+        return RunCatalog(self.data[self.mask(model=model, scenario=scenario, tasks=tasks)])
+
+
+def make_table(rows, fields=FIELDS):
+    """Build a NumPy structured array from an iterable of row tuples.
+
+    :param rows:                        Iterable of row tuples ordered as `fields`
+    :type rows:                         iterable
+
+    :param fields:                      Tuple of (column name, NumPy type) pairs; 'U' string columns are sized to
+                                        their longest value
+    :type fields:                       tuple
+
+    :return:                            NumPy structured array
+
+    """
+
+    import numpy as np
+
+    columns = list(zip(*rows)) or [() for _ in fields]
+
+    arrays = [np.array(column, dtype=kind if kind != 'U' else str) for column, (_, kind) in zip(columns, fields)]
+
+    # size string columns to their longest value
+    dtype = [(name, kind if kind != 'U' else f"U{max(1, array.dtype.itemsize // 4)}")
+             for (name, kind), array in zip(fields, arrays)]
+
+    data = np.empty(len(arrays[0]), dtype=dtype)
+
+    for (name, _), array in zip(fields, arrays):
+        data[name] = array
+
+    return data
+
+
+def write_table(data, table_file):
+    """Write a structured array; the format is chosen from the extension (.npy for a NumPy structured array,
+    otherwise CSV with a header of the column names)."""
+
+    if table_file.endswith('.npy'):
+        import numpy as np
+        np.save(table_file, data, allow_pickle=False)
+        return
+
+    with open(table_file, 'w', newline='') as out:
+        writer = csv.writer(out)
+        writer.writerow(data.dtype.names)
+        writer.writerows(data.tolist())
+
+
+def read_table(table_file, fields=FIELDS):
+    """Read a structured array written by `write_table` with the given columns; see `make_table`."""
+
+    if table_file.endswith('.npy'):
+        import numpy as np
+        return np.load(table_file, allow_pickle=False)
+
+    with open(table_file, newline='') as get:
+        reader = csv.reader(get)
+        next(reader)
+        return make_table(reader, fields)
+
+
+def write_catalog(rows, catalog_file):
+    """Build a catalog from row tuples and write it.
+
+    :param rows:                        Iterable of row tuples ordered as the catalog columns
+    :type rows:                         iterable
+
+    :param catalog_file:                Full path with file name and extension (.npy or .csv) to write to
+    :type catalog_file:                 str
+
+    :return:                            RunCatalog
+
+    """
+
+    catalog = RunCatalog.from_rows(rows)
+
+    catalog.write(catalog_file)
+
+    return catalog
+
+
+def read_catalog(catalog_file):
+    """Read a catalog written by `write_catalog`.
+
+    :param catalog_file:                Full path with file name and extension (.npy or .csv)
+    :type catalog_file:                 str
+
+    :return:                            RunCatalog
+
+    """
+
+    if not os.path.isfile(catalog_file):
+        raise FileNotFoundError(f"Catalog file '{catalog_file}' does not exist")
+
+    return RunCatalog.read(catalog_file)
@@ -0,0 +1,53 @@
+import importlib
+import sys
+
+
+# commands of the `cassie` entry point and the module whose `main` runs each; modules are only imported when their
+# command runs so that the entry point starts fast enough to call from submission loops
+COMMANDS = {'build': ('cassie.pipeline', 'generate the files of a study spec in a single pass'),
+            'local': ('cassie.local', 'run generated job scripts on this machine'),
+            'resume': ('cassie.resume', 'resubmit only the members of an ensemble that are not done'),
+            'shard': ('cassie.shard', 'merge the per-shard manifests and catalogs of a sharded build'),
+            'overlay': ('cassie.overlay', 'materialize a configuration file from a base and overlay'),
+            'archive': ('cassie.archive', 'extract ensemble members from a cassie archive'),
+            'benchmark': ('cassie.benchmark', 'benchmark the builders at increasing ensemble sizes')}
+
+
+def usage():
+    """Get the usage text of the `cassie` entry point."""
+
+    lines = ['usage: cassie <command> [options]', '', 'commands:']
+    lines.extend(f"  {command:<12}{description}" for command, (_, description) in COMMANDS.items())
+    lines.extend(['', "run `cassie <command> --help` for the options of a command"])
+
+    return '\n'.join(lines)
+
+
+def main(args=None):
+    """Console entry point dispatching to the command line interface of each module:
+
+        cassie build study.json --workers 8
+        cassie local run_*.sh --cores 16
+
+    """
+
+    if args is None:
+        args = sys.argv[1:]
+
+    if not args or args[0] in ('-h', '--help'):
+        print(usage())
+        return 0 if args else 2
+
+    command, args = args[0], args[1:]
+
+    if command not in COMMANDS:
+        print(f"cassie: unknown command '{command}'\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    module_name, _ = COMMANDS[command]
+
+    return importlib.import_module(module_name).main(args) or 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+#!/bin/bash
+#SBATCH --account=<account>
+#SBATCH --partition=<partition>
+#SBATCH --ntasks=<ntasks>
+#SBATCH --cpus-per-task=<cpuspertask>
+#SBATCH --nodes=<nodes>
+#SBATCH --time=<walltime>
+#SBATCH --job-name=<jobname>
+#SBATCH --output=<logdir>/%A.%a.out
+
+## Cassandra has been tested with OpenMPI 3.1.0 and
+## python/anaconda 3.6.4
+
+source /etc/profile.d/modules.sh >& /dev/null
+module load gcc/8.1.0
+module load python/anaconda3.6
+source /share/apps/python/anaconda3.6/etc/profile.d/conda.sh
+module load R/3.4.3
+module load intel
+
+echo "Started at $(date)"
+echo "nodes: $SLURM_JOB_NODELIST"
+
+python -m rpy2.situation
+
+tid=$SLURM_ARRAY_TASK_ID
+
+# NOTICE:  Since I am only running 1 combination of model and rcp for 1 climate field each
+#    task (fldgen setting `ngrid=1`), the following should be
+#    executed:  `sbatch --array=0-39 <this script>`
+
+# extract only this task's configuration files from the ensemble archives to node-local disk
+localdir="<localdir>"
+mkdir -p $localdir
+xanthosarchive="<xanthosarchive>"
+if [ -n "$xanthosarchive" ]; then
+    xanthos_config=$(python -m cassie.archive extract $xanthosarchive <model> <scenario> ${tid} $localdir)
+fi
+config=$(python -m cassie.archive extract <cassarchive> <model> <scenario> ${tid} $localdir)
+logdir="<casslogdir>/<model>_<scenario>_${tid}"
+cassandra=<cassmainscript>
+<stagein>
+echo "mpirun -np <ranks> $cassandra --mp -v -l $logdir $config"
+
+mpirun -np <ranks> $cassandra --mp -v -l $logdir $config
+status=$?
+
+rm -f $config $xanthos_config
+<stageout>
+echo "Ended at $(date)"
+
+exit $status
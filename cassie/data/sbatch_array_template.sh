@@ -0,0 +1,78 @@
+#!/bin/bash
+#SBATCH --account=<account>
+#SBATCH --partition=<partition>
+#SBATCH --ntasks=<ntasks>
+#SBATCH --cpus-per-task=<cpuspertask>
+#SBATCH --nodes=<nodes>
+#SBATCH --time=<walltime>
+#SBATCH --job-name=<jobname>
+#SBATCH --output=<logdir>/%A.%a.out
+#SBATCH --array=<arrayrange>
+
+## Cassandra has been tested with OpenMPI 3.1.0 and
+## python/anaconda 3.6.4
+
+source /etc/profile.d/modules.sh >& /dev/null
+module load gcc/8.1.0
+module load python/anaconda3.6
+source /share/apps/python/anaconda3.6/etc/profile.d/conda.sh
+module load R/3.4.3
+module load intel
+
+echo "Started at $(date)"
+echo "nodes: $SLURM_JOB_NODELIST"
+
+python -m rpy2.situation
+
+# NOTICE:  This single array job runs the whole ensemble.  Line i (starting at 0) of the lookup file holds the
+#    "model scenario task" of member i; each array task runs a bundle of up to <bundlesize> member(s) starting
+#    at member (array task id * <bundlesize>), <concurrency> at a time with <ranks> MPI rank(s) each.  The array
+#    range and throttle above cover every member:  `sbatch <this script>`
+
+lookup="<lookup>"
+bundle_size=<bundlesize>
+concurrency=<concurrency>
+cassandra=<cassmainscript>
+
+# exit code of every member in this bundle as "model scenario task exit_code" lines
+status="<logdir>/bundle_${SLURM_ARRAY_JOB_ID}_${SLURM_ARRAY_TASK_ID}.status"
+touch $status
+<stagein>
+run_task() {
+    local model=$1
+    local scenario=$2
+    local tid=$3
+    local config="<cassconfigdir>/<configsubdir>${model}_${scenario}_${tid}.cfg"
+    local logdir="<casslogdir>/${model}_${scenario}_${tid}"
+<stagemember>
+    echo "mpirun -np <ranks> $cassandra --mp -v -l $logdir $config"
+
+    mpirun -np <ranks> $cassandra --mp -v -l $logdir $config
+
+    echo "${model} ${scenario} ${tid} $?" >> $status
+}
+
+first=$((SLURM_ARRAY_TASK_ID * bundle_size + 1))
+last=$((first + bundle_size - 1))
+
+while read model scenario tid; do
+
+    # mpirun forwards its stdin to rank 0; keep it from reading the rest of the lookup lines
+    run_task $model $scenario $tid < /dev/null &
+
+    # keep at most $concurrency members running
+    while [ $(jobs -rp | wc -l) -ge $concurrency ]; do
+        wait -n
+    done
+done < <(sed -n "${first},${last}p" $lookup)
+
+wait
+<stageout>
+failed=$(awk '$4 != 0' $status | wc -l)
+
+echo "Ended at $(date)"
+echo "$failed failed member(s); see $status"
+
+if [ $failed -gt 0 ]; then
+    exit 1
+fi
@@ -0,0 +1,74 @@
+#!/bin/bash
+#SBATCH --account=<account>
+#SBATCH --partition=<partition>
+#SBATCH --ntasks=<ntasks>
+#SBATCH --cpus-per-task=<cpuspertask>
+#SBATCH --nodes=<nodes>
+#SBATCH --time=<walltime>
+#SBATCH --job-name=<jobname>
+#SBATCH --output=<logdir>/%A.%a.out
+#SBATCH --array=<arrayrange>
+
+## Cassandra has been tested with OpenMPI 3.1.0 and
+## python/anaconda 3.6.4
+
+source /etc/profile.d/modules.sh >& /dev/null
+module load gcc/8.1.0
+module load python/anaconda3.6
+source /share/apps/python/anaconda3.6/etc/profile.d/conda.sh
+module load R/3.4.3
+module load intel
+
+echo "Started at $(date)"
+echo "nodes: $SLURM_JOB_NODELIST"
+
+python -m rpy2.situation
+
+# NOTICE:  Each array task runs a bundle of up to <bundlesize> configurations from the task list so that the
+#    environment setup above is paid once per bundle; <concurrency> configuration(s) run at a time with
+#    <ranks> MPI rank(s) each.  The array range above covers every bundle:  `sbatch <this script>`
+
+tasklist="<tasklist>"
+bundle_size=<bundlesize>
+concurrency=<concurrency>
+cassandra=<cassmainscript>
+
+# exit code of every configuration in this bundle as "<task id> <exit code>" lines
+status="<logdir>/bundle_${SLURM_ARRAY_JOB_ID}_${SLURM_ARRAY_TASK_ID}.status"
+touch $status
+<stagein>
+run_task() {
+    local tid=$1
+    local config="<cassconfigdir>/<configsubdir><model>_<scenario>_${tid}.cfg"
+    local logdir="<casslogdir>/<model>_<scenario>_${tid}"
+
+    echo "mpirun -np <ranks> $cassandra --mp -v -l $logdir $config"
+
+    mpirun -np <ranks> $cassandra --mp -v -l $logdir $config
+
+    echo "${tid} $?" >> $status
+}
+
+first=$((SLURM_ARRAY_TASK_ID * bundle_size + 1))
+last=$((first + bundle_size - 1))
+
+for tid in $(sed -n "${first},${last}p" $tasklist); do
+
+    run_task $tid &
+
+    # keep at most $concurrency configurations running
+    while [ $(jobs -rp | wc -l) -ge $concurrency ]; do
+        wait -n
+    done
+done
+
+wait
+
+failed=$(awk '$2 != 0' $status | wc -l)
+<stageout>
+echo "Ended at $(date)"
+echo "$failed failed configuration(s); see $status"
+
+if [ $failed -gt 0 ]; then
+    exit 1
+fi
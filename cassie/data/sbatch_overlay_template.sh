@@ -0,0 +1,49 @@
+#!/bin/bash
+#SBATCH --account=<account>
+#SBATCH --partition=<partition>
+#SBATCH --ntasks=<ntasks>
+#SBATCH --cpus-per-task=<cpuspertask>
+#SBATCH --nodes=<nodes>
+#SBATCH --time=<walltime>
+#SBATCH --job-name=<jobname>
+#SBATCH --output=<logdir>/%A.%a.out
+
+## Cassandra has been tested with OpenMPI 3.1.0 and
+## python/anaconda 3.6.4
+
+source /etc/profile.d/modules.sh >& /dev/null
+module load gcc/8.1.0
+module load python/anaconda3.6
+source /share/apps/python/anaconda3.6/etc/profile.d/conda.sh
+module load R/3.4.3
+module load intel
+
+echo "Started at $(date)"
+echo "nodes: $SLURM_JOB_NODELIST"
+
+python -m rpy2.situation
+
+tid=$SLURM_ARRAY_TASK_ID
+
+# NOTICE:  Since I am only running 1 combination of model and rcp for 1 climate field each
+#    task (fldgen setting `ngrid=1`), the following should be
+#    executed:  `sbatch --array=0-39 <this script>`
+
+# merge this task's configuration files from the shared base and overlay files onto node-local disk; the
+#    Xanthos configuration file the Cassandra configuration names is merged as well if it is an overlay
+localdir="<localdir>/<model>_<scenario>_${tid}"
+config=$(python -m cassie.overlay materialize <cassconfigdir>/<model>_<scenario>_${tid}.cfg $localdir --follow XanthosComponent config_file)
+logdir="<casslogdir>/<model>_<scenario>_${tid}"
+cassandra=<cassmainscript>
+<stagein>
+echo "mpirun -np <ranks> $cassandra --mp -v -l $logdir $config"
+
+mpirun -np <ranks> $cassandra --mp -v -l $logdir $config
+status=$?
+
+# the task directory only holds merged copies
+rm -rf $localdir
+<stageout>
+echo "Ended at $(date)"
+
+exit $status
@@ -2,6 +2,7 @@
 #SBATCH --account=<account>
 #SBATCH --partition=<partition>
 #SBATCH --ntasks=<ntasks>
+#SBATCH --cpus-per-task=<cpuspertask>
 #SBATCH --nodes=<nodes>
 #SBATCH --time=<walltime>
 #SBATCH --job-name=<jobname>
@@ -26,14 +27,17 @@ tid=$SLURM_ARRAY_TASK_ID
 
 # NOTICE:  Since I am only running 1 combination of model and rcp for 1 climate field each
 #    task (fldgen setting `ngrid=1`), the following should be
-#    executed:  `sbatch --array=0-39 <script>`
+#    executed:  `sbatch --array=0-39 <this script>`
 
-config="<cassconfigdir>/<model>_<scenario>_${tid}.cfg"
+config="<cassconfigdir>/<configsubdir><model>_<scenario>_${tid}.cfg"
 logdir="<casslogdir>/<model>_<scenario>_${tid}"
 cassandra=<cassmainscript>
+<stagein>
+echo "mpirun -np <ranks> $cassandra --mp -v -l $logdir $config"
 
-echo "mpirun -np 3 $cassandra --mp -v -l $logdir $config"
-
-mpirun -np 3 $cassandra --mp -v -l $logdir $config
-
+mpirun -np <ranks> $cassandra --mp -v -l $logdir $config
+status=$?
+<stageout>
 echo "Ended at $(date)"
+
+exit $status
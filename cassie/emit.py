@@ -0,0 +1,282 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from cassie.instrument import clock, collecting, count, lap
+
+
+# available parallel backends:  threads for I/O-bound writing, processes for CPU-bound rendering
+BACKENDS = {'thread': ThreadPoolExecutor,
+            'process': ProcessPoolExecutor}
+
+# number of chunks each worker receives on average; more chunks balance load better at the cost of dispatch overhead
+CHUNKS_PER_WORKER = 4
+
+
+class EmitError(RuntimeError):
+    """Raised after an emission run when one or more files could not be generated or written.
+
+    :param failures:                    List of (file path, error message) tuples; one per failed file
+    :type failures:                     list
+
+    """
+
+    def __init__(self, failures):
+
+        self.failures = failures
+
+        detail = '\n'.join(f"  {path}:  {message}" for path, message in failures)
+
+        super().__init__(f"{len(failures)} file(s) failed:\n{detail}")
+
+
+def content_hash(text):
+    """Get the SHA-256 hex digest of rendered text."""
+
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def emit_chunk(render, output_dir, members, previous=None, timed=False):
+    """Render and write the files for a chunk of members.
+
+    :param render:                      Callable taking a member and returning a (file name, text) tuple where the
+                                        file name is relative to `output_dir`
+    :type render:                       callable
+
+    :param output_dir:                  Full path to the directory to write the files to
+    :type output_dir:                   str
+
+    :param members:                     Iterable of members to generate files for
+    :type members:                      iterable
+
+    :param previous:                    Optional dictionary of file name to content hash for files that already
+                                        exist in `output_dir`.  When given, files whose content is unchanged are not
+                                        rewritten.
+    :type previous:                     dict
+
+    :param timed:                       If True, record stage timings and counters for the chunk
+    :type timed:                        bool
+
+    :return:                            List of (member, file name, content hash, written) records for generated
+                                        files, list of (file path, error message) tuples for files that failed, and
+                                        the chunk's Timings or None when `timed` is False
+
+    """
+
+    records = []
+    failures = []
+
+    with collecting(timed) as timings:
+
+        for member in members:
+
+            output_file = None
+
+            try:
+                if timings is None:
+                    file_name, text = render(member)
+                else:
+                    file_name, text = timings.call('render', render, member)
+
+                start = clock()
+
+                output_file = os.path.join(output_dir, file_name)
+
+                digest = content_hash(text)
+
+                start = lap('hash', start)
+
+                if previous is not None and previous.get(file_name) == digest:
+                    records.append((member, file_name, digest, False))
+                    count('unchanged')
+                    continue
+
+                with open(output_file, 'w') as out:
+                    out.write(text)
+
+                lap('write', start)
+
+                records.append((member, file_name, digest, True))
+
+                if timings is not None:
+                    timings.count('files')
+                    timings.count('bytes', len(text.encode()))
+
+            except Exception as error:
+                failures.append((output_file or repr(member), f"{type(error).__name__}: {error}"))
+                count('failed')
+
+    return records, failures, timings
+
+
+def chunk_members(members, n_chunks):
+    """Split a list of members into at most `n_chunks` contiguous chunks of near equal size."""
+
+    n_chunks = max(1, min(n_chunks, len(members)))
+    size, remainder = divmod(len(members), n_chunks)
+
+    chunks = []
+    start = 0
+
+    for index in range(n_chunks):
+        stop = start + size + (1 if index < remainder else 0)
+        chunks.append(members[start:stop])
+        start = stop
+
+    return chunks
+
+
+def render_chunk(render, members, timed=False):
+    """Render the files for a chunk of members without writing them.
+
+    :param render:                      Callable taking a member and returning a (file name, text) tuple
+    :type render:                       callable
+
+    :param members:                     Iterable of members to render
+    :type members:                      iterable
+
+    :param timed:                       If True, record stage timings for the chunk
+    :type timed:                        bool
+
+    :return:                            List of (member, file name, text) tuples for rendered members, list of
+                                        (member, error message) tuples for members that failed, and the chunk's
+                                        Timings or None when `timed` is False
+
+    """
+
+    rendered = []
+    failures = []
+
+    with collecting(timed) as timings:
+
+        for member in members:
+
+            try:
+                if timings is None:
+                    file_name, text = render(member)
+                else:
+                    file_name, text = timings.call('render', render, member)
+
+                rendered.append((member, file_name, text))
+
+            except Exception as error:
+                failures.append((repr(member), f"{type(error).__name__}: {error}"))
+                count('failed')
+
+    return rendered, failures, timings
+
+
+def map_chunks(function, members, workers=None, backend='thread', chunk_size=None):
+    """Apply `function` to contiguous chunks of `members`, optionally in parallel, yielding results in order.
+
+    :param function:                    Callable taking a list of members.  Must be picklable when using the
+                                        'process' backend.
+    :type function:                     callable
+
+    :param members:                     Iterable of members
+    :type members:                      iterable
+
+    :param workers:                     Number of parallel workers to use.  None or 1 runs serially.
+    :type workers:                      int
+
+    :param backend:                     Either 'thread' or 'process'
+    :type backend:                      str
+
+    :param chunk_size:                  When running serially, apply `function` to successive chunks of this many
+                                        members instead of to all members at once (e.g., to report progress)
+    :type chunk_size:                   int
+
+    :return:                            Generator of chunk results in member order
+
+    """
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'; use one of {sorted(BACKENDS)}")
+
+    # members are streamed without being collected when running serially
+    if workers is None or workers <= 1:
+
+        if chunk_size is None:
+            yield function(members)
+            return
+
+        members = iter(members)
+
+        while True:
+            chunk = list(islice(members, chunk_size))
+
+            if not chunk:
+                return
+
+            yield function(chunk)
+
+    members = list(members)
+    chunks = chunk_members(members, workers * CHUNKS_PER_WORKER)
+
+    with BACKENDS[backend](max_workers=workers) as executor:
+        yield from executor.map(function, chunks)
+
+
+def emit_files(render, members, output_dir, workers=None, backend='thread', previous=None, raise_errors=True,
+               profile=None):
+    """Render and write one file per member, optionally in parallel.
+
+    Output is identical to the serial path regardless of the number of workers or backend since each member is
+    rendered independently.  Errors do not stop the run; every failed file is reported at the end.
+
+    :param render:                      Callable taking a member and returning a (file name, text) tuple where the
+                                        file name is relative to `output_dir`.  Must be picklable when using the
+                                        'process' backend.
+    :type render:                       callable
+
+    :param members:                     Iterable of members to generate files for
+    :type members:                      iterable
+
+    :param output_dir:                  Full path to the directory to write the files to
+    :type output_dir:                   str
+
+    :param workers:                     Number of parallel workers to use.  None or 1 runs serially.
+    :type workers:                      int
+
+    :param backend:                     Either 'thread' to write files from a thread pool or 'process' to render
+                                        and write files from a process pool.
+    :type backend:                      str
+
+    :param previous:                    Optional dictionary of file name to content hash for files that already
+                                        exist in `output_dir`; files whose rendered content is unchanged are skipped
+    :type previous:                     dict
+
+    :param raise_errors:                If True, raise an EmitError when any file fails
+    :type raise_errors:                 bool
+
+    :param profile:                     Optional Profile to record stage timings, counters, and progress into
+    :type profile:                      cassie.instrument.Profile
+
+    :return:                            List of (member, file name, content hash, written) records and list of
+                                        (file path, error message) tuples for files that failed
+
+    :raises EmitError:                  If any file could not be generated or written and `raise_errors` is True
+
+    """
+
+    records = []
+    failures = []
+
+    emit = partial(emit_chunk, render, output_dir, previous=previous, timed=profile is not None)
+    chunk_size = profile.progress_every if profile is not None else None
+
+    for chunk_records, chunk_failures, timings in map_chunks(emit, members, workers=workers, backend=backend,
+                                                             chunk_size=chunk_size):
+        records.extend(chunk_records)
+        failures.extend(chunk_failures)
+
+        if profile is not None:
+            profile.merge(timings)
+            profile.advance(len(chunk_records) + len(chunk_failures))
+
+    if failures and raise_errors:
+        raise EmitError(failures)
+
+    return records, failures
@@ -0,0 +1,358 @@
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+
+# number of members rendered between progress callbacks when generating serially
+PROGRESS_EVERY = 1000
+
+# separator between nested stage names; matches the folded stack format read by flamegraph.pl and speedscope
+STACK_SEPARATOR = ';'
+
+
+class ThreadState(threading.local):
+    """Stage timings of the current thread; None when instrumentation is off so that `stage` costs one lookup."""
+
+    timings = None
+
+
+_state = ThreadState()
+
+# number of threads recording in this process; checked first so that `stage` is a single global lookup when off
+_recording = 0
+_lock = threading.Lock()
+
+# returned by `stage` when instrumentation is off
+NULL_STAGE = nullcontext()
+
+
+class Timings:
+    """Accumulated wall time per nested stage and event counters.  Picklable so that process workers can send the
+    timings of a chunk back to the parent.
+
+    Stages are keyed by their stack; e.g., ('render', 'build', 'seed').
+
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.stack = ()
+
+    def add(self, stack, seconds, calls=1):
+        """Add time spent in a stage stack."""
+
+        total = self.stages.get(stack)
+
+        if total is None:
+            self.stages[stack] = [seconds, calls]
+        else:
+            total[0] += seconds
+            total[1] += calls
+
+    def count(self, name, n=1):
+        """Increment a counter."""
+
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def call(self, name, function, *args):
+        """Call `function` timed as stage `name`, so that laps and stages inside it nest under `name`."""
+
+        with Stage(self, name):
+            return function(*args)
+
+    def merge(self, other, prefix=()):
+        """Add another set of timings, nesting its stages under `prefix`."""
+
+        for stack, (seconds, calls) in other.stages.items():
+            self.add(prefix + stack, seconds, calls)
+
+        for name, n in other.counters.items():
+            self.count(name, n)
+
+
+class Stage:
+    """Context manager timing one pass through a stage of the active Timings."""
+
+    __slots__ = ('timings', 'name', 'parent', 'start')
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.parent = self.timings.stack
+        self.timings.stack = self.parent + (self.name,)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.timings.add(self.timings.stack, time.perf_counter() - self.start)
+        self.timings.stack = self.parent
+
+
+def stage(name):
+    """Time a block as a stage nested in the enclosing stage, when instrumentation is on for this thread:
+
+        with stage('catalog'):
+            ...
+
+    Use `clock` and `lap` instead for code that runs once per file.
+
+    """
+
+    if not _recording:
+        return NULL_STAGE
+
+    timings = _state.timings
+
+    if timings is None:
+        return NULL_STAGE
+
+    return Stage(timings, name)
+
+
+def clock():
+    """Get the time to start a lap from, or None when instrumentation is off for this thread.  Laps are the cheap
+    alternative to `stage` for code run once per file; when off, each call is a single global lookup:
+
+        start = clock()
+        ...
+        start = lap('render', start)
+        ...
+        lap('write', start)
+
+    """
+
+    if not _recording or _state.timings is None:
+        return None
+
+    return time.perf_counter()
+
+
+def lap(name, start):
+    """Record the time since `start` as stage `name` nested in the enclosing stage, where 'a;b' nests `b` in `a`,
+    and return the time to start the next lap from.  Does nothing and returns None if `start` is None.
+
+    """
+
+    if start is None:
+        return None
+
+    now = time.perf_counter()
+    timings = _state.timings
+
+    timings.add(timings.stack + tuple(name.split(STACK_SEPARATOR)), now - start)
+
+    return now
+
+
+def count(name, n=1):
+    """Increment a counter when instrumentation is on for this thread."""
+
+    if not _recording:
+        return
+
+    timings = _state.timings
+
+    if timings is not None:
+        timings.count(name, n)
+
+
+@contextmanager
+def collecting(enabled=True):
+    """Record the stages and counters of the enclosed block into a new Timings, which is yielded; yields None and
+    records nothing if `enabled` is False."""
+
+    if not enabled:
+        yield None
+        return
+
+    with recording(Timings()) as timings:
+        yield timings
+
+
+@contextmanager
+def recording(timings):
+    """Record the stages and counters of the enclosed block on this thread into `timings`."""
+
+    global _recording
+
+    previous = _state.timings
+    _state.timings = timings
+
+    with _lock:
+        _recording += 1
+
+    try:
+        yield timings
+
+    finally:
+        _state.timings = previous
+
+        with _lock:
+            _recording -= 1
+
+
+class Profile:
+    """Opt-in record of where the time of a build goes, with a progress callback.
+
+    Stages are timed where they run, including inside worker threads and processes, and summed, so with parallel
+    workers the time of a stage may exceed the wall time of the build.  The stages recorded are:
+
+        render          rendering a file; for Cassandra configs this is split into
+                            skeleton    rendering the lines shared by a model and scenario, once per combination
+                            build       computing the values of the sections
+                            seed        computing the RNG seed (nested in build)
+                            serialize   formatting the configuration text
+        hash            content hashing
+        write           opening and writing a file, or adding it to an archive
+        validate        checking that the input files referenced by the configuration files exist
+        layout          creating the shard directories of a hierarchical layout
+        scan            reading the previous manifest and listing the output directory
+        manifest        writing the manifest or archive index
+        catalog         writing the run catalog
+        seeds           writing the seed table
+
+    Counters are kept for the number of 'files' and 'bytes' written, 'unchanged' files that were skipped, and
+    'failed' files.
+
+    :param progress:                    Optional callable run as `progress(done, profile)` after each group of
+                                        members is generated, where `done` is the number of members generated so far
+    :type progress:                     callable
+
+    :param progress_every:              Number of members between progress callbacks when generating serially; with
+                                        parallel workers the callback runs once per chunk
+    :type progress_every:               int
+
+    """
+
+    def __init__(self, progress=None, progress_every=PROGRESS_EVERY):
+        self.progress = progress
+        self.progress_every = progress_every
+        self.timings = Timings()
+        self.done = 0
+        self.seconds = 0.0
+
+    @contextmanager
+    def record(self, name):
+        """Time the enclosed block as the top level stage `name` and turn instrumentation on for this thread."""
+
+        start = time.perf_counter()
+
+        try:
+            with recording(self.timings), Stage(self.timings, name):
+                yield self
+
+        finally:
+            self.seconds += time.perf_counter() - start
+
+    def merge(self, timings):
+        """Add the timings of a chunk generated elsewhere (e.g., by a worker) under the current stage."""
+
+        if timings is not None:
+            self.timings.merge(timings, prefix=self.timings.stack)
+
+    def advance(self, n):
+        """Count `n` more members as generated and report progress."""
+
+        self.done += n
+
+        if self.progress is not None:
+            self.progress(self.done, self)
+
+    def summary(self):
+        """Get the timings as a JSON serializable dictionary.
+
+        :return:                        Dictionary with the wall 'seconds', 'counters', throughput in
+                                        'files_per_second' and 'bytes_per_second', and 'stages' mapping each stage
+                                        stack (e.g., "build_cassandra_configs;render;build") to its total
+                                        'seconds', 'self_seconds' excluding nested stages, and 'calls'
+
+        """
+
+        stages = self.timings.stages
+
+        # time spent in each stage's children
+        nested = {}
+
+        for stack, (seconds, _) in stages.items():
+            if len(stack) > 1:
+                nested[stack[:-1]] = nested.get(stack[:-1], 0.0) + seconds
+
+        counters = dict(self.timings.counters)
+        seconds = self.seconds or 0.0
+
+        return {'seconds': seconds,
+                'counters': counters,
+                'files_per_second': counters.get('files', 0) / seconds if seconds else None,
+                'bytes_per_second': counters.get('bytes', 0) / seconds if seconds else None,
+                'stages': {STACK_SEPARATOR.join(stack): {'seconds': total,
+                                                         'self_seconds': max(0.0, total - nested.get(stack, 0.0)),
+                                                         'calls': calls}
+                           for stack, (total, calls) in sorted(stages.items())}}
+
+    def folded(self):
+        """Get the timings in folded stack format (one "stage;nested;stage microseconds" line per stage), as read by
+        flamegraph.pl, inferno, and speedscope."""
+
+        lines = []
+
+        for stack, values in self.summary()['stages'].items():
+            microseconds = int(round(values['self_seconds'] * 1e6))
+
+            if microseconds:
+                lines.append(f"{stack} {microseconds}")
+
+        return '\n'.join(lines) + '\n'
+
+    def write(self, output_file):
+        """Write the summary as JSON, or in folded stack format if the file name ends with '.folded'."""
+
+        with open(output_file, 'w') as out:
+
+            if output_file.endswith('.folded'):
+                out.write(self.folded())
+            else:
+                json.dump(self.summary(), out, indent=2)
+
+
+def make_profile(profile=None, progress=None):
+    """Get the Profile to record a build with from the `profile` and `progress` builder options.
+
+    :param profile:                     A Profile to record into, a full path with file name and extension to write
+                                        the summary to when the build finishes (see `Profile.write`), or None
+    :type profile:                      Profile; str
+
+    :param progress:                    Optional progress callable; see Profile
+    :type progress:                     callable
+
+    :return:                            Profile, or None when instrumentation is off
+
+    """
+
+    if isinstance(profile, Profile):
+        if progress is not None:
+            profile.progress = progress
+        return profile
+
+    if profile is None and progress is None:
+        return None
+
+    return Profile(progress=progress)
+
+
+@contextmanager
+def profiled(profile, name, output_file=None):
+    """Record the enclosed build as stage `name` of `profile` and write the summary to `output_file` when it is a
+    path.  Does nothing if `profile` is None."""
+
+    if profile is None:
+        yield None
+        return
+
+    with profile.record(name):
+        yield profile
+
+    if isinstance(output_file, str):
+        profile.write(output_file)
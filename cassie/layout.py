@@ -0,0 +1,73 @@
+import math
+import os
+
+
+def layout_dir(model, scenario, task, fanout=None):
+    """Get the subdirectory of a member's files relative to the output directory; "<model>/<scenario>/shard-NNN"
+    where NNN is the task divided by `fanout`, or '' for the flat layout when `fanout` is None.
+
+    :param fanout:                      Largest number of members in each shard directory
+    :type fanout:                       int
+
+    """
+
+    if fanout is None:
+        return ''
+
+    return os.path.join(model, scenario, f"shard-{task // fanout:03d}")
+
+
+def layout_name(file_name, model, scenario, task, fanout=None):
+    """Get the path of a member's file relative to the output directory."""
+
+    return os.path.join(layout_dir(model, scenario, task, fanout), file_name)
+
+
+def layout_dirs(model_list, scenario_list, n_tasks, fanout):
+    """Get every shard directory of an ensemble relative to the output directory, in model, scenario, shard order."""
+
+    return [layout_dir(model, scenario, task, fanout) for model in model_list for scenario in scenario_list
+            for task in range(0, n_tasks, fanout)]
+
+
+def count_layout_dirs(n_models, n_scenarios, n_tasks, fanout=None):
+    """Get the number of directories the layout creates in the output directory, counting the model and scenario
+    directories as well as the shard directories."""
+
+    if fanout is None:
+        return 0
+
+    return n_models * (1 + n_scenarios * (1 + math.ceil(n_tasks / fanout)))
+
+
+def make_layout(output_dir, model_list, scenario_list, n_tasks, fanout=None):
+    """Create the shard directories of an ensemble in `output_dir` once, before any file is written, rather than
+    checking for the directory of every file.  Nothing is done for the flat layout."""
+
+    if fanout is None:
+        return
+
+    check_fanout(fanout)
+
+    for directory in layout_dirs(model_list, scenario_list, n_tasks, fanout):
+        os.makedirs(os.path.join(output_dir, directory), exist_ok=True)
+
+
+def check_fanout(fanout):
+    """Raise a ValueError if `fanout` is not None or a positive integer."""
+
+    if fanout is not None and (not isinstance(fanout, int) or fanout < 1):
+        raise ValueError(f"`fanout` must be a positive integer, not {fanout!r}")
+
+
+def layout_expr(model, scenario, fanout=None, task='tid'):
+    """Get a bash expression of the subdirectory of a member, with a trailing slash, for the job scripts; e.g.,
+    "GFDL-ESM2M/rcp26/shard-$(printf %03d $((tid / 100)))/".  `model` and `scenario` may be shell variables
+    (e.g., "${model}").  An empty string is returned for the flat layout.
+
+    """
+
+    if fanout is None:
+        return ''
+
+    return f"{model}/{scenario}/shard-$(printf %03d $(({task} / {fanout})))/"
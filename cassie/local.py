@@ -0,0 +1,365 @@
+import argparse
+import itertools
+import json
+import os
+import re
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+# `#SBATCH --option=value` directives read from the job scripts
+DIRECTIVE_PATTERN = re.compile(r'^#SBATCH\s+--([A-Za-z-]+)(?:[=\s]+(\S+))?', re.MULTILINE)
+
+# stands in for mpirun when it is not installed:  drops the launcher options and runs the command once
+MPIRUN_SHIM = """#!/bin/bash
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -np|-n|--np|-N|--host|--hostfile|--map-by|--bind-to) shift 2 ;;
+        --oversubscribe|--allow-run-as-root) shift ;;
+        *) break ;;
+    esac
+done
+exec "$@"
+"""
+
+
+def read_directives(script_file):
+    """Get the `#SBATCH` directives of a job script as a dictionary of option name to value (None for flags)."""
+
+    with open(script_file) as get:
+        return {name: value for name, value in DIRECTIVE_PATTERN.findall(get.read())}
+
+
+def parse_array(array_str):
+    """Parse a SLURM --array specification.
+
+    :param array_str:                   Array specification; e.g., "0-39", "0-99%10", or "1,3,5-7"
+    :type array_str:                    str
+
+    :return:                            (list of array task ids, maximum number running at once or None)
+
+    """
+
+    throttle = None
+
+    if '%' in array_str:
+        array_str, throttle = array_str.split('%')
+        throttle = int(throttle)
+
+    task_ids = []
+
+    for part in array_str.split(','):
+
+        if '-' in part:
+            first, last = part.split('-')
+            step = 1
+
+            if ':' in last:
+                last, step = last.split(':')
+
+            task_ids.extend(range(int(first), int(last) + 1, int(step)))
+
+        elif part:
+            task_ids.append(int(part))
+
+    return task_ids, throttle
+
+
+def count_array(array_str):
+    """Get the number of array tasks of a SLURM --array specification without listing them; see `parse_array`."""
+
+    n_tasks = 0
+
+    for part in array_str.split('%')[0].split(','):
+
+        if '-' in part:
+            first, last = part.split('-')
+            step = 1
+
+            if ':' in last:
+                last, step = last.split(':')
+
+            n_tasks += len(range(int(first), int(last) + 1, int(step)))
+
+        elif part:
+            n_tasks += 1
+
+    return n_tasks
+
+
+def expand_output(pattern, job_id, task_id, job_name, array_job_id=None):
+    """Expand the SLURM filename patterns used by --output (%A, %a, %j, %x); %A is `array_job_id` if given, else
+    `job_id`."""
+
+    return (pattern.replace('%A', str(job_id if array_job_id is None else array_job_id))
+                   .replace('%a', str(task_id))
+                   .replace('%j', str(job_id))
+                   .replace('%x', job_name))
+
+
+class CoreBudget:
+    """Counting allocator that blocks until enough cores are free.
+
+    :param cores:                       Total number of cores available to all running tasks
+    :type cores:                        int
+
+    """
+
+    def __init__(self, cores):
+        self.cores = cores
+        self.free = cores
+        self.running = 0
+        self.peak = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, n):
+        """Reserve `n` cores, waiting if needed; a task larger than the budget runs alone.  Returns the number of
+        tasks running including this one."""
+
+        n = min(n, self.cores)
+
+        with self.condition:
+            self.condition.wait_for(lambda: self.free >= n)
+            self.free -= n
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            return self.running
+
+    def release(self, n):
+        """Return `n` cores to the budget."""
+
+        n = min(n, self.cores)
+
+        with self.condition:
+            self.free += n
+            self.running -= 1
+            self.condition.notify_all()
+
+
+def run_task(script_file, task_id, job_id, directives, budget, env, shell='bash', array_job_id=None):
+    """Run one array task of a job script, blocking until the cores it requests are free.  As on the cluster, each
+    task has its own SLURM_JOB_ID `job_id` and shares the SLURM_ARRAY_JOB_ID `array_job_id` (`job_id` if None) with
+    the other tasks of its script.
+
+    :return:                            Dictionary with the script, array task id, start and end time, wall time in
+                                        seconds, exit code, number of tasks running when it started, and log file
+
+    """
+
+    ntasks = int(directives.get('ntasks') or 1)
+    cores = ntasks * int(directives.get('cpus-per-task') or 1)
+    job_name = directives.get('job-name') or os.path.basename(script_file)
+    output = directives.get('output') or 'slurm-%A_%a.out'
+
+    if array_job_id is None:
+        array_job_id = job_id
+
+    log_file = expand_output(output, job_id, task_id, job_name, array_job_id)
+
+    task_env = dict(env,
+                    SLURM_JOB_ID=str(job_id),
+                    SLURM_ARRAY_JOB_ID=str(array_job_id),
+                    SLURM_ARRAY_TASK_ID=str(task_id),
+                    SLURM_JOB_NAME=job_name,
+                    SLURM_NTASKS=str(ntasks),
+                    SLURM_JOB_NODELIST='localhost')
+
+    concurrency = budget.acquire(cores)
+
+    try:
+        start = time.time()
+
+        with open(log_file, 'w') as log:
+            code = subprocess.call([shell, script_file], stdout=log, stderr=subprocess.STDOUT, env=task_env)
+
+        end = time.time()
+
+    finally:
+        budget.release(cores)
+
+    return {'script': script_file,
+            'task_id': task_id,
+            'start': start,
+            'end': end,
+            'seconds': end - start,
+            'exit_code': code,
+            'concurrency': concurrency,
+            'log_file': log_file}
+
+
+def run_lane(pending, budget, env):
+    """Run queued array tasks one at a time until `pending` is empty.  Several lanes may share a queue; each lane
+    takes the next task when its previous task ends.
+
+    :param pending:                     Deque of (position, script file, array task id, job id, directives, array
+                                        job id) tuples
+    :type pending:                      collections.deque
+
+    :return:                            List of (position, result) tuples; see `run_task`
+
+    """
+
+    results = []
+
+    while True:
+        try:
+            position, script_file, task_id, job_id, directives, array_job_id = pending.popleft()
+
+        except IndexError:
+            return results
+
+        results.append((position, run_task(script_file, task_id, job_id, directives, budget, env,
+                                           array_job_id=array_job_id)))
+
+
+def run_local(script_files, cores=None, array=None, mpirun=None, env=None, job_id=None):
+    """Run generated SLURM job scripts on this machine in place of submitting them with `sbatch`.
+
+    Every array task of every script is run with `bash` as its own process, with the SLURM_ARRAY_TASK_ID,
+    SLURM_ARRAY_JOB_ID, SLURM_JOB_ID, SLURM_JOB_NAME, SLURM_NTASKS and SLURM_JOB_NODELIST environment a task gets on
+    the cluster.  Tasks start as soon as the `--ntasks` times `--cpus-per-task` cores they request are free within
+    the core budget, and the `%N` throttle of an array range is respected.  Output goes to the script's `--output`
+    file with %A, %a, %j and %x expanded.  Use a dummy `cassandra_main` script to measure throughput or smoke test an
+    ensemble.
+
+    :param script_files:                List of full paths to the job scripts to run
+    :type script_files:                 list
+
+    :param cores:                       Number of cores to share between running tasks.  Defaults to the number of
+                                        CPUs.
+    :type cores:                        int
+
+    :param array:                       Array specification overriding the `--array` directive of every script, as
+                                        `sbatch --array` would; e.g., "0-3" or "5,7".  Scripts without either run
+                                        array task 0.
+    :type array:                        str
+
+    :param mpirun:                      Full path to an `mpirun` to use, or 'shim' to run each command once without
+                                        MPI.  If None, the installed `mpirun` is used, or the shim if there is none.
+    :type mpirun:                       str
+
+    :param env:                         Extra environment variables for every task
+    :type env:                          dict
+
+    :param job_id:                      Array job id of the first script; each following script gets the next id,
+                                        and the array tasks get the ids after those of the scripts.  Defaults to the
+                                        current time in seconds.
+    :type job_id:                       int
+
+    :return:                            Dictionary with the core budget, total wall time in seconds, peak number of
+                                        running tasks, and the list of task results ordered by script and array
+                                        task id
+
+    """
+
+    # use default core budget if user does not give one
+    if cores is None:
+        cores = os.cpu_count() or 1
+
+    if job_id is None:
+        job_id = int(time.time())
+
+    task_env = dict(os.environ, **(env or {}))
+
+    shim_dir = None
+
+    if mpirun is not None or shutil.which('mpirun', path=task_env.get('PATH')) is None:
+        shim_dir = tempfile.mkdtemp(prefix='cassie-mpirun-')
+        shim = os.path.join(shim_dir, 'mpirun')
+
+        if mpirun in (None, 'shim'):
+            with open(shim, 'w') as out:
+                out.write(MPIRUN_SHIM)
+            os.chmod(shim, os.stat(shim).st_mode | stat.S_IXUSR)
+        else:
+            os.symlink(os.path.abspath(mpirun), shim)
+
+        task_env['PATH'] = shim_dir + os.pathsep + task_env.get('PATH', '')
+
+    budget = CoreBudget(cores)
+
+    jobs = []
+
+    for index, script_file in enumerate(script_files):
+        directives = read_directives(script_file)
+        task_ids, throttle = parse_array(array or directives.get('array') or '0')
+        jobs.append((script_file, job_id + index, directives, task_ids, throttle))
+
+    # every array task gets its own job id after the array job ids of the scripts
+    task_job_ids = itertools.count(job_id + len(jobs))
+    positions = itertools.count()
+
+    start = time.time()
+
+    try:
+        # one thread per running task, each waiting on its subprocess
+        with ThreadPoolExecutor(max_workers=max(1, cores)) as executor:
+            futures = []
+
+            for script_file, script_job_id, directives, task_ids, throttle in jobs:
+                pending = deque((next(positions), script_file, task_id, next(task_job_ids), directives, script_job_id)
+                                for task_id in task_ids)
+
+                # the %N throttle is the number of lanes of the script, so tasks it holds back wait in the queue
+                # instead of taking a thread from the other scripts
+                lanes = min(throttle or len(task_ids), len(task_ids))
+
+                futures.extend(executor.submit(run_lane, pending, budget, task_env) for _ in range(lanes))
+
+            results = [result for _, result in sorted(result for future in futures for result in future.result())]
+
+    finally:
+        if shim_dir is not None:
+            shutil.rmtree(shim_dir, ignore_errors=True)
+
+    return {'cores': cores,
+            'seconds': time.time() - start,
+            'peak_concurrency': budget.peak,
+            'tasks': results}
+
+
+def main(args=None):
+    """Command line interface for the local runner:
+
+        python -m cassie.local run_a_rcp26.sh run_a_rcp85.sh --cores 8 --report report.json
+
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m cassie.local',
+                                     description='Run generated SLURM job scripts on this machine.')
+    parser.add_argument('scripts', nargs='+', help='job scripts to run')
+    parser.add_argument('--cores', type=int, default=None, help='core budget shared by running tasks')
+    parser.add_argument('--array', default=None, help='array specification overriding the scripts, e.g., 0-3')
+    parser.add_argument('--mpirun', default=None, help="mpirun to use, or 'shim' to run without MPI; the shim "
+                                                               "is used if none is installed")
+    parser.add_argument('--report', default=None, help='JSON file to write the per-task results to')
+
+    args = parser.parse_args(args)
+
+    report = run_local(args.scripts, cores=args.cores, array=args.array, mpirun=args.mpirun)
+
+    failed = [task for task in report['tasks'] if task['exit_code'] != 0]
+
+    for task in report['tasks']:
+        print(f"{os.path.basename(task['script']):<40} {task['task_id']:>6} {task['seconds']:>10.2f} s "
+              f"exit {task['exit_code']:<4} running {task['concurrency']}", file=sys.stderr)
+
+    print(f"{len(report['tasks'])} task(s) in {report['seconds']:.2f} s on {report['cores']} core(s); "
+          f"peak {report['peak_concurrency']} running; {len(failed)} failed", file=sys.stderr)
+
+    if args.report is not None:
+        with open(args.report, 'w') as out:
+            json.dump(report, out, indent=2)
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
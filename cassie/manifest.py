@@ -0,0 +1,148 @@
+import json
+import os
+import warnings
+
+from cassie.emit import EmitError, emit_files
+from cassie.instrument import stage
+
+
+# choices for handling files recorded by a previous run that are no longer generated
+STALE_OPTIONS = ('report', 'remove', 'ignore')
+
+
+def read_manifest(manifest_file):
+    """Read a manifest written by `emit_incremental`.
+
+    :param manifest_file:               Full path with file name and extension to the manifest
+    :type manifest_file:                str
+
+    :return:                            Dictionary with the 'parameters' used to build the files, the 'files'
+                                        records of [file name, content hash, member...], and the 'stale' file names.
+                                        An empty manifest is returned if the file does not exist.
+
+    """
+
+    if not os.path.isfile(manifest_file):
+        return {'parameters': {}, 'files': [], 'stale': []}
+
+    with open(manifest_file) as get:
+        return json.load(get)
+
+
+def existing_files(output_dir, file_names=()):
+    """Get the set of file names in a directory using a single directory scan.  The subdirectories holding any of
+    `file_names` (e.g., the files of a previous manifest in a hierarchical layout) are scanned once each as well, and
+    their files are named relative to `output_dir`."""
+
+    found = set()
+
+    for subdir in {''}.union(os.path.dirname(file_name) for file_name in file_names):
+
+        try:
+            with os.scandir(os.path.join(output_dir, subdir)) as entries:
+                found.update(os.path.join(subdir, entry.name) for entry in entries if entry.is_file())
+
+        except FileNotFoundError:
+            continue
+
+    return found
+
+
+def emit_incremental(render, members, output_dir, manifest_file, parameters, stale='report', workers=None,
+                     backend='thread', profile=None):
+    """Render one file per member and only write the files whose content changed since the previous run.
+
+    A manifest of every generated file name, its content hash, and its member is kept in `manifest_file` along with
+    the build parameters.  Files recorded in the previous manifest that still exist and whose content hash matches
+    the newly rendered content are not rewritten, so a rebuild that changes nothing performs no writes.  Files
+    recorded by a previous run that are no longer generated (e.g., after shrinking the number of runs or the model
+    and scenario lists) are considered stale and are either reported or removed.
+
+    :param render:                      Callable taking a member and returning a (file name, text) tuple
+    :type render:                       callable
+
+    :param members:                     Iterable of members to generate files for
+    :type members:                      iterable
+
+    :param output_dir:                  Full path to the directory to write the files to
+    :type output_dir:                   str
+
+    :param manifest_file:               Full path with file name and extension to the manifest
+    :type manifest_file:                str
+
+    :param parameters:                  JSON serializable dictionary of the parameters used to build the files
+    :type parameters:                   dict
+
+    :param stale:                       'report' to warn about stale files and keep listing them in the manifest,
+                                        'remove' to delete them, or 'ignore' to skip the check (e.g., for a shard of
+                                        a build, where cassie.shard.merge_manifests checks the whole build)
+    :type stale:                        str
+
+    :param workers:                     Number of parallel workers to use.  None or 1 runs serially.
+    :type workers:                      int
+
+    :param backend:                     Either 'thread' or 'process'
+    :type backend:                      str
+
+    :param profile:                     Optional Profile to record stage timings, counters, and progress into
+    :type profile:                      cassie.instrument.Profile
+
+    :return:                            List of (member, file name, content hash, written) records and a summary
+                                        dictionary with the number of files 'written' and 'unchanged' and the list
+                                        of 'stale' file names
+
+    :raises EmitError:                  If any file could not be generated or written; the manifest is still
+                                        updated for the files that succeeded
+
+    """
+
+    if stale not in STALE_OPTIONS:
+        raise ValueError(f"Unknown stale option '{stale}'; use one of {STALE_OPTIONS}")
+
+    with stage('scan'):
+        manifest = read_manifest(manifest_file)
+
+        recorded = [record[0] for record in manifest['files']] + manifest.get('stale', [])
+
+        # only trust hashes for files that are still on disk
+        on_disk = existing_files(output_dir, recorded)
+        previous = {record[0]: record[1] for record in manifest['files'] if record[0] in on_disk}
+
+    records, failures = emit_files(render, members, output_dir, workers=workers, backend=backend,
+                                   previous=previous, raise_errors=False, profile=profile)
+
+    generated = {file_name for _, file_name, _, _ in records}
+
+    # failed files are not stale; they are retried on the next run
+    failed = {os.path.relpath(path, output_dir) for path, _ in failures}
+
+    stale_files = sorted({name for name in recorded if name in on_disk} - generated - failed)
+
+    if stale == 'ignore':
+        stale_files = []
+
+    if stale_files and stale == 'remove':
+        for file_name in stale_files:
+            os.remove(os.path.join(output_dir, file_name))
+        stale_files = []
+
+    elif stale_files:
+        warnings.warn(f"{len(stale_files)} file(s) in '{output_dir}' are no longer generated by this build and are "
+                      f"listed as stale in '{manifest_file}'")
+
+    with stage('manifest'):
+        content = json.dumps({'parameters': parameters,
+                              'files': [[file_name, digest, *member] for member, file_name, digest, _ in records],
+                              'stale': stale_files}, sort_keys=True, default=str)
+
+        # leave the manifest untouched when nothing changed
+        if not os.path.isfile(manifest_file) or json.dumps(manifest, sort_keys=True, default=str) != content:
+            with open(manifest_file, 'w') as out:
+                out.write(content)
+
+    if failures:
+        raise EmitError(failures)
+
+    written = sum(1 for record in records if record[3])
+
+    return records, {'written': written, 'unchanged': len(records) - written, 'stale': stale_files}
@@ -0,0 +1,422 @@
+"""Shared-base plus per-task overlay configuration files.
+
+Every configuration file of a (model, scenario) combination is nearly identical; only a few per-task keys differ.
+In overlay mode, each combination is written as two files instead of one file per task:
+
+    <stem>.base<ext>        the full configuration file of task 0
+    <stem>.overlay<ext>     one block per task holding only the lines that differ from the base
+
+where the configuration file of task `i` would have been named `<stem>_<i><ext>` (e.g., `IPSL-CM5A-LR_rcp26_7.cfg`
+is in `IPSL-CM5A-LR_rcp26.base.cfg` and `IPSL-CM5A-LR_rcp26.overlay.cfg`).  The overlay file starts with a header line
+and holds one block per task:
+
+    # cassie overlay of IPSL-CM5A-LR_rcp26.base.cfg
+    @ 7 IPSL-CM5A-LR_rcp26_7.cfg
+    [FldgenComponent]
+    RNGseed = 1234567
+
+Merge rule:  the configuration file of a task is the base with every `key = value` line of the task's block
+replacing the line of the same key in the same section of the base; section header lines (`[section]`,
+`[[subsection]]`) in the block only select the section and comment and blank lines are ignored.  Lines are copied
+verbatim, so the merged file is byte-identical to the file written without overlays.  Every key in a block must
+exist in its section of the base.  A block whose header ends with `full` instead holds the complete file; it is used
+for the rare task whose lines cannot be matched to the base (e.g., a value spanning several lines).
+
+Use `materialize` or `python -m cassie.overlay materialize` to write the full configuration file of a task at job
+start.
+
+"""
+import argparse
+import os
+import re
+import sys
+
+
+# first line of every overlay file
+OVERLAY_HEADER = '# cassie overlay of '
+
+# marker starting the block of each task
+BLOCK_MARKER = '@ '
+
+# file names of the per-task configuration files:  <stem>_<task><ext>
+TASK_NAME_PATTERN = re.compile(r'^(?P<stem>.+)_(?P<task>\d+)(?P<ext>\.[^._]+)$')
+
+
+def split_task_name(file_name):
+    """Split a per-task configuration file name into its (stem, task, extension)."""
+
+    match = TASK_NAME_PATTERN.match(file_name)
+
+    if match is None:
+        raise ValueError(f"File name '{file_name}' does not match '<stem>_<task><extension>'")
+
+    return match.group('stem'), int(match.group('task')), match.group('ext')
+
+
+def base_name(file_name):
+    """Get the name of the base file shared by the tasks of a per-task configuration file name."""
+
+    stem, _, ext = split_task_name(file_name)
+
+    return f"{stem}.base{ext}"
+
+
+def overlay_name(file_name):
+    """Get the name of the overlay file holding the block of a per-task configuration file name."""
+
+    stem, _, ext = split_task_name(file_name)
+
+    return f"{stem}.overlay{ext}"
+
+
+def parse_lines(lines):
+    """Get the (section path, key) of every key line; None for section header, comment, and blank lines.
+
+    :return:                            List of (section path, key) tuples or None, one per line
+
+    """
+
+    keys = []
+    path = ()
+
+    for line in lines:
+
+        stripped = line.strip()
+
+        if stripped.startswith('['):
+            depth = len(stripped) - len(stripped.lstrip('['))
+            path = path[:depth - 1] + (stripped.strip('[]').strip(),)
+            keys.append(None)
+
+        elif stripped and not stripped.startswith('#') and '=' in stripped:
+            keys.append((path, stripped.split('=', 1)[0].strip()))
+
+        else:
+            keys.append(None)
+
+    return keys
+
+
+def overlay_block(base_lines, base_keys, text):
+    """Get the lines of a task's block holding the key lines of `text` that differ from the base.
+
+    :return:                            List of lines, or None if `text` cannot be expressed as an overlay of the
+                                        base (its lines do not line up with the base or a changed key is ambiguous)
+
+    """
+
+    lines = text.split('\n')
+
+    if len(lines) != len(base_lines):
+        return None
+
+    block = []
+    path = ()
+    changed = set()
+
+    for line, base_line, key in zip(lines, base_lines, base_keys):
+
+        if line == base_line:
+            continue
+
+        # only key lines may differ and the key itself must not change
+        if key is None or parse_lines([line])[0] is None or line.split('=', 1)[0].strip() != key[1]:
+            return None
+
+        if key in changed:
+            return None
+
+        changed.add(key)
+
+        section_path, _ = key
+
+        if section_path != path:
+
+            # write the headers of every section level so the block is readable on its own
+            for depth, name in enumerate(section_path, 1):
+                if path[:depth] != section_path[:depth]:
+                    block.append(f"{'[' * depth}{name}{']' * depth}")
+
+            path = section_path
+
+        block.append(line)
+
+    # keys that appear more than once in a section of the base cannot be matched
+    counts = {}
+
+    for key in base_keys:
+        if key in changed:
+            counts[key] = counts.get(key, 0) + 1
+
+    if any(n > 1 for n in counts.values()):
+        return None
+
+    return block
+
+
+def render_overlay(base_file_name, base_text, tasks):
+    """Render an overlay file.
+
+    :param base_file_name:              File name of the base file
+    :type base_file_name:               str
+
+    :param base_text:                   Text of the base file
+    :type base_text:                    str
+
+    :param tasks:                       Iterable of (task, file name, text) tuples
+    :type tasks:                        iterable
+
+    :return:                            Overlay text
+
+    """
+
+    base_lines = base_text.split('\n')
+    base_keys = parse_lines(base_lines)
+
+    out = [f"{OVERLAY_HEADER}{base_file_name}"]
+
+    for task, file_name, text in tasks:
+
+        block = overlay_block(base_lines, base_keys, text)
+
+        if block is None:
+            out.append(f"{BLOCK_MARKER}{task} {file_name} full")
+            out.append(text)
+        else:
+            out.append(f"{BLOCK_MARKER}{task} {file_name}")
+            out.extend(block)
+
+    return '\n'.join(out) + '\n'
+
+
+def read_block(overlay_text, task):
+    """Get the (base file name, file name, lines, full) of a task's block in an overlay.
+
+    :raises KeyError:                   If the overlay has no block for `task`
+
+    """
+
+    lines = overlay_text.split('\n')
+
+    if not lines[0].startswith(OVERLAY_HEADER):
+        raise ValueError("Not a cassie overlay file")
+
+    base_file_name = lines[0][len(OVERLAY_HEADER):]
+    marker = f"{BLOCK_MARKER}{task} "
+
+    for index, line in enumerate(lines):
+
+        if not line.startswith(marker):
+            continue
+
+        fields = line.split(' ')
+        full = len(fields) > 3 and fields[3] == 'full'
+
+        end = index + 1
+
+        while end < len(lines) and not lines[end].startswith(BLOCK_MARKER):
+            end += 1
+
+        block = lines[index + 1:end]
+
+        # the final newline of the overlay file is not part of the last block
+        if end == len(lines) and block and block[-1] == '':
+            block = block[:-1]
+
+        return base_file_name, fields[2], block, full
+
+    raise KeyError(f"Overlay has no block for task {task}")
+
+
+def apply_overlay(base_text, block):
+    """Merge a task's block into the base text following the merge rule.
+
+    :param base_text:                   Text of the base file
+    :type base_text:                    str
+
+    :param block:                       Lines of the task's block
+    :type block:                        list
+
+    :return:                            Text of the task's configuration file
+
+    :raises ValueError:                 If a key in the block does not exist in its section of the base
+
+    """
+
+    replacements = {key: line for key, line in zip(parse_lines(block), block) if key is not None}
+
+    lines = base_text.split('\n')
+
+    for index, key in enumerate(parse_lines(lines)):
+        if key in replacements:
+            lines[index] = replacements.pop(key)
+
+    if replacements:
+        missing = ', '.join(f"{'/'.join(path)}/{key}" for path, key in replacements)
+        raise ValueError(f"Overlay keys are not in the base:  {missing}")
+
+    return '\n'.join(lines)
+
+
+def materialize_text(overlay_file, task):
+    """Get the (file name, text) of a task's configuration file from an overlay file and the base next to it."""
+
+    with open(overlay_file) as get:
+        base_file_name, file_name, block, full = read_block(get.read(), task)
+
+    if full:
+        return file_name, '\n'.join(block)
+
+    with open(os.path.join(os.path.dirname(overlay_file), base_file_name)) as get:
+        return file_name, apply_overlay(get.read(), block)
+
+
+def replace_value(text, section, key, value):
+    """Replace the value of a key line in a section, keeping the text before the value."""
+
+    lines = text.split('\n')
+
+    for index, line_key in enumerate(parse_lines(lines)):
+
+        if line_key is not None and line_key[0][-1:] == (section,) and line_key[1] == key:
+            prefix, old = lines[index].split('=', 1)
+            spaces = old[:len(old) - len(old.lstrip())]
+            lines[index] = f"{prefix}={spaces}{value}"
+
+    return '\n'.join(lines)
+
+
+def key_value(text, section, key):
+    """Get the value of a key line in a section, or None if it is not present."""
+
+    lines = text.split('\n')
+
+    for line, line_key in zip(lines, parse_lines(lines)):
+        if line_key is not None and line_key[0][-1:] == (section,) and line_key[1] == key:
+            return line.split('=', 1)[1].strip().strip('"\'')
+
+    return None
+
+
+def materialize(config_file, destination_dir, follow=()):
+    """Get a full configuration file on disk for a per-task configuration file path.
+
+    If `config_file` exists it is used as is.  Otherwise the task's block is read from the overlay file in the same
+    directory (see the module documentation for the naming convention) and merged with its base into
+    `destination_dir`.
+
+    :param config_file:                 Full path to the per-task configuration file as it would be written without
+                                        overlays; e.g., "/configs/IPSL-CM5A-LR_rcp26_7.cfg"
+    :type config_file:                  str
+
+    :param destination_dir:             Directory to write the merged file to; created if it does not exist
+    :type destination_dir:              str
+
+    :param follow:                      Iterable of (section, key) pairs whose values are paths to other per-task
+                                        configuration files (e.g., ('XanthosComponent', 'config_file')).  Those are
+                                        materialized as well and the value is changed to the merged file.
+    :type follow:                       iterable
+
+    :return:                            Full path to the configuration file
+
+    """
+
+    if os.path.isfile(config_file):
+        return config_file
+
+    directory, file_name = os.path.split(config_file)
+    _, task, _ = split_task_name(file_name)
+
+    file_name, text = materialize_text(os.path.join(directory, overlay_name(file_name)), task)
+
+    for section, key in follow:
+
+        path = key_value(text, section, key)
+
+        if path is None:
+            continue
+
+        local_path = materialize(path, destination_dir)
+
+        if local_path != path:
+            text = replace_value(text, section, key, local_path)
+
+    os.makedirs(destination_dir, exist_ok=True)
+
+    output_file = os.path.join(destination_dir, file_name)
+
+    with open(output_file, 'w') as out:
+        out.write(text)
+
+    return output_file
+
+
+class OverlayRenderer:
+    """Picklable render callable for overlay mode.
+
+    Wraps the render callable of a builder that maps a (model, scenario, task) member to a (file name, text) tuple.
+    The members of this renderer are (model, scenario, 'base') and (model, scenario, 'overlay'); see
+    `overlay_members`.
+
+    :param render:                      Render callable of the builder
+    :type render:                       callable
+
+    :param n_tasks:                     Number of tasks of each (model, scenario) combination
+    :type n_tasks:                      int
+
+    """
+
+    def __init__(self, render, n_tasks):
+        self.render = render
+        self.n_tasks = n_tasks
+
+    def __call__(self, member):
+
+        model, scenario, kind = member
+
+        file_name, base_text = self.render((model, scenario, 0))
+
+        if kind == 'base':
+            return base_name(file_name), base_text
+
+        tasks = ((i,) + self.render((model, scenario, i)) for i in range(self.n_tasks))
+
+        return overlay_name(file_name), render_overlay(base_name(file_name), base_text, tasks)
+
+
+def overlay_members(pairs):
+    """Get the members of an OverlayRenderer from an iterable of (model, scenario) pairs."""
+
+    for model, scenario in pairs:
+        yield model, scenario, 'base'
+        yield model, scenario, 'overlay'
+
+
+def main(args=None):
+    """Command line interface to materialize a configuration file at job start:
+
+        config=$(python -m cassie.overlay materialize /configs/IPSL-CM5A-LR_rcp26_7.cfg $TMPDIR \\
+                 --follow XanthosComponent config_file)
+
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m cassie.overlay',
+                                     description='Work with shared-base plus per-task overlay configuration files.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    merge = subparsers.add_parser('materialize', help='write the full configuration file of a task and print its path')
+    merge.add_argument('config_file', help='path to the per-task configuration file as written without overlays')
+    merge.add_argument('destination_dir')
+    merge.add_argument('--follow', nargs=2, action='append', default=[], metavar=('SECTION', 'KEY'),
+                       help='also materialize the per-task file named by this key')
+
+    args = parser.parse_args(args)
+
+    print(materialize(args.config_file, args.destination_dir, follow=[tuple(pair) for pair in args.follow]))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,421 @@
+"""Single-pass generation of a whole study from a declarative spec.
+
+A study spec is a JSON file describing the ensemble once:
+
+    {
+        "models": ["GFDL-ESM2M", "IPSL-CM5A-LR"],
+        "scenarios": ["rcp26", "rcp85"],
+        "runs": 20,
+        "output_dir": "/pic/projects/cassandra/study",
+        "pet_model_abbrev": "trn",
+        "runoff_model_abbrev": "abcd",
+        "xanthos": {"xanthos_root_dir": "...", "xanthos_output_dir": "...", "drought_thresholds_dir": "..."},
+        "cassandra": {"global_model_interface_jar": "...", "global_dbxml_lib": "...", "fldgen_emulator_dir": "..."},
+        "jobs": {"cassandra_log_dir": "...", "cassandra_main_script": "...", "sbatch_account": "..."}
+    }
+
+The keys of each section are the options of build_xanthos_configs, BuildCassandraConfigs, and build_job_scripts.
+The "xanthos" and "jobs" sections are optional.  The keys that make the files reference each other (the model and
+scenario lists, number of runs, output and configuration directories, and run name prefix) are set by the study
+and cannot be given in a section, so the Cassandra files always point at the Xanthos files that were written and
+the job scripts at the Cassandra files.  Files are written to the "xanthos", "cassandra", and "jobs"
+subdirectories of `output_dir`.  A "stage_dir" in the "jobs" section stages the inputs named by the "xanthos" and
+"cassandra" sections on node-local disk, and the configuration files point to the staged copies.
+A top level "cores_per_node" plans the MPI ranks and cores of every run from the Cassandra components (see
+BuildCassandraConfigs.resource_plan); the job scripts request the planned resources and Xanthos runs on the cores
+of its rank.
+A top level "fanout" writes the Xanthos and Cassandra files in the hierarchical layout of cassie.layout, and the
+job scripts read them from it.
+`Study.plan` (or `cassie build --dry-run`) reports the files, bytes, and core hours of the study without writing
+anything; see cassie.capacity.
+
+The members of the ensemble are enumerated once, in model, scenario, task order; each (model, scenario, task)
+member renders its Xanthos and Cassandra files and each (model, scenario) combination its job files in the same
+pass.
+
+"""
+import argparse
+import json
+import os
+import sys
+import warnings
+
+from cassie.build_cassandra_configs import BuildCassandraConfigs
+from cassie.build_job_scripts import job_file_members, job_script_plan, job_script_renderer
+from cassie.build_xanthos_configs import xanthos_input_files, xanthos_renderer
+from cassie.capacity import check_quota, combine_capacity, plan_files
+from cassie.catalog import write_catalog
+from cassie.emit import emit_files
+from cassie.instrument import make_profile, profiled, stage
+from cassie.layout import count_layout_dirs, make_layout
+from cassie.seeds import seed_collisions, write_seed_table
+from cassie.validate import make_index, validate_inputs
+
+
+# subdirectory of the study output directory for each kind of file
+STUDY_DIRS = {'xanthos': 'xanthos', 'cassandra': 'cassandra', 'jobs': 'jobs'}
+
+# top level keys of a study spec
+SPEC_KEYS = ('models', 'scenarios', 'runs', 'output_dir', 'pet_model_abbrev', 'runoff_model_abbrev',
+             'router_model_abbrev', 'cores_per_node', 'fanout', 'xanthos', 'cassandra', 'jobs')
+
+# section keys set by the study so that the files reference each other consistently
+DERIVED_KEYS = {'xanthos': ('pet_model_abbrev', 'runoff_model_abbrev', 'router_model_abbrev', 'stage_dir',
+                            'xanthos_jobs', 'fanout'),
+                'cassandra': ('model_list', 'scenario_list', 'output_dir', 'runs_per_config', 'xanthos_build',
+                              'xanthos_config_dir', 'xanthos_pet_model_abbrev', 'xanthos_runoff_model_abbrev',
+                              'xanthos_router_model_abbrev', 'cassandra_log_dir', 'stage_dir', 'fanout'),
+                'jobs': ('model_list', 'scenario_list', 'cassandra_config_dir', 'runs_per_config', 'task_list_dir',
+                         'fldgen_emulator_dir', 'fldgen_tgav_file_dir', 'an2month_file_dir',
+                         'drought_thresholds_dir', 'xanthos_template', 'resources', 'fanout')}
+
+# section keys of options that a study build does not support or sets from its own options
+UNSUPPORTED_KEYS = {'cassandra': BuildCassandraConfigs.RUNTIME_OPTIONS + ('overlay',),
+                    'jobs': ('cassandra_archive', 'xanthos_archive', 'cassandra_overlay', 'walltime_logs',
+                             'walltime_quantile', 'walltime_margin')}
+
+
+class StudyRenderer:
+    """Picklable render callable for the members of a Study; see `Study.members`.
+
+    :param renderers:                   Dictionary of file kind to the render callable of its builder
+    :type renderers:                    dict
+
+    """
+
+    def __init__(self, renderers):
+        self.renderers = renderers
+
+    def __call__(self, member):
+
+        kind, builder_member = member
+
+        file_name, text = self.renderers[kind](builder_member)
+
+        return os.path.join(STUDY_DIRS[kind], file_name), text
+
+
+class Study:
+    """Xanthos configuration files, Cassandra configuration files, and job scripts of an ensemble generated
+    together from a single spec.  See the module documentation for the spec format.
+
+    :param spec:                        Study spec dictionary
+    :type spec:                         dict
+
+    """
+
+    def __init__(self, spec):
+
+        unknown = set(spec).difference(SPEC_KEYS)
+
+        if unknown:
+            raise ValueError(f"Unknown study spec keys:  {', '.join(sorted(unknown))}")
+
+        for section in DERIVED_KEYS:
+
+            given = set(spec.get(section) or {})
+
+            for key in given.intersection(DERIVED_KEYS[section]):
+                raise ValueError(f"`{key}` is set by the study and cannot be given in the '{section}' section")
+
+            for key in given.intersection(UNSUPPORTED_KEYS.get(section, ())):
+                raise ValueError(f"`{key}` is not supported in the '{section}' section of a study")
+
+        self.spec = spec
+        self.model_list = list(spec['models'])
+        self.scenario_list = list(spec['scenarios'])
+        self.runs = spec['runs']
+
+        # RNG seeds depend on the full path of each Cassandra file
+        self.output_dir = os.path.abspath(spec['output_dir'])
+        self.dirs = {kind: os.path.join(self.output_dir, name) for kind, name in STUDY_DIRS.items()}
+
+        abbrevs = {key: spec.get(key) for key in ('pet_model_abbrev', 'runoff_model_abbrev', 'router_model_abbrev')}
+
+        # files per shard directory of the hierarchical layout, or None for the flat layout
+        self.fanout = spec.get('fanout')
+
+        self.xanthos = spec.get('xanthos')
+        self.jobs = spec.get('jobs')
+
+        # node-local directory the job scripts copy the shared inputs to; every file points to the copies
+        self.stage_dir = (self.jobs or {}).get('stage_dir')
+
+        renderers = {}
+
+        cassandra = dict(spec['cassandra'])
+        model_interface_jar = cassandra.pop('global_model_interface_jar')
+        dbxml_lib = cassandra.pop('global_dbxml_lib')
+
+        self.cassandra = BuildCassandraConfigs(self.model_list, self.scenario_list, self.dirs['cassandra'], self.runs,
+                                               model_interface_jar, dbxml_lib,
+                                               xanthos_build=self.xanthos is not None,
+                                               xanthos_config_dir=self.dirs['xanthos'],
+                                               xanthos_pet_model_abbrev=abbrevs['pet_model_abbrev'],
+                                               xanthos_runoff_model_abbrev=abbrevs['runoff_model_abbrev'],
+                                               xanthos_router_model_abbrev=abbrevs['router_model_abbrev'],
+                                               cassandra_log_dir=(self.jobs or {}).get('cassandra_log_dir'),
+                                               stage_dir=self.stage_dir, fanout=self.fanout, **cassandra)
+
+        unknown = set(cassandra).difference(vars(self.cassandra))
+
+        if unknown:
+            raise ValueError(f"Unknown keys in the 'cassandra' section:  {', '.join(sorted(unknown))}")
+
+        renderers['cassandra'] = self.cassandra.render_config
+
+        # MPI ranks and cores of every run, planned from the components of the Cassandra configuration files
+        self.resources = None
+        xanthos_jobs = {}
+
+        if spec.get('cores_per_node') is not None:
+            jobs = self.jobs or {}
+            self.resources = self.cassandra.resource_plan(spec['cores_per_node'], nodes=jobs.get('sbatch_nodes', 3),
+                                                          concurrency=jobs.get('bundle_concurrency', 1))
+            xanthos_jobs = {'xanthos_jobs': self.resources['xanthos_jobs']}
+
+        if self.xanthos is not None:
+            renderers['xanthos'] = xanthos_renderer(**self.xanthos, **abbrevs, stage_dir=self.stage_dir,
+                                                    fanout=self.fanout, **xanthos_jobs)
+
+        if self.jobs is not None:
+            inputs = {}
+
+            # the staged inputs are the ones the configuration files name
+            if self.stage_dir is not None:
+                inputs = {'fldgen_emulator_dir': self.cassandra.fldgen_emulator_dir,
+                          'fldgen_tgav_file_dir': self.cassandra.fldgen_tgav_file_dir,
+                          'an2month_file_dir': self.cassandra.an2month_file_dir}
+
+                if self.xanthos is not None and self.xanthos.get('generate_drought_stats'):
+                    inputs['drought_thresholds_dir'] = self.xanthos['drought_thresholds_dir']
+                    inputs['xanthos_template'] = self.xanthos.get('template')
+
+            renderers['jobs'] = job_script_renderer(self.model_list, self.scenario_list, self.dirs['cassandra'],
+                                                    runs_per_config=self.runs, task_list_dir=self.dirs['jobs'],
+                                                    resources=self.resources, fanout=self.fanout, **self.jobs,
+                                                    **inputs)
+
+        self.render = StudyRenderer(renderers)
+
+    @classmethod
+    def from_file(cls, spec_file):
+        """Read a study spec from a JSON file."""
+
+        with open(spec_file) as get:
+            return cls(json.load(get))
+
+    def job_members(self):
+        """Get the (kind, model, scenario) members of the job files of the study; see job_file_members."""
+
+        return job_file_members(self.model_list, self.scenario_list, bundle_size=self.jobs.get('bundle_size'),
+                                consolidated=self.jobs.get('consolidated', False), staged=self.stage_dir is not None)
+
+    def members(self):
+        """Lazily generate the (kind, builder member) members of the study in model, scenario, task order; the job
+        files of each (model, scenario) follow its configuration files and the files of a consolidated array job
+        come last."""
+
+        jobs = {}
+
+        if self.jobs is not None:
+            for member in self.job_members():
+                jobs.setdefault(member[1:], []).append(member)
+
+        for model in self.model_list:
+            for scenario in self.scenario_list:
+
+                for i in range(self.runs):
+
+                    if self.xanthos is not None:
+                        yield 'xanthos', (model, scenario, i)
+
+                    yield 'cassandra', (model, scenario, i)
+
+                for member in jobs.pop((model, scenario), ()):
+                    yield 'jobs', member
+
+        for members in jobs.values():
+            for member in members:
+                yield 'jobs', member
+
+    def input_files(self):
+        """Lazily generate the (description, full path) of every input file referenced by the study."""
+
+        yield from self.cassandra.input_files()
+
+        if self.xanthos is not None and self.xanthos.get('generate_drought_stats'):
+            yield from xanthos_input_files(self.render.renderers['xanthos'], self.model_list, self.scenario_list,
+                                           [self.xanthos['drought_thresholds_dir']], self.stage_dir)
+
+    def plan(self, quota=None):
+        """Plan the files of the study without writing them; see cassie.capacity.
+
+        :param quota:                   True to compare the plan of the whole study to the free space of the
+                                        filesystem holding `output_dir`, or a dictionary with 'bytes' and/or 'inodes'
+                                        limits to also compare to
+        :type quota:                    bool; dict
+
+        :return:                        Dictionary of the plan of each kind of file and of the whole study ('total')
+
+        """
+
+        pairs = [(model, scenario) for model in self.model_list for scenario in self.scenario_list]
+        directories = count_layout_dirs(len(self.model_list), len(self.scenario_list), self.runs, self.fanout)
+
+        plans = {}
+
+        if self.xanthos is not None:
+            plans['xanthos'] = plan_files(self.render.renderers['xanthos'], pairs, self.runs, self.dirs['xanthos'],
+                                          directories=directories)
+
+        plans['cassandra'] = plan_files(self.cassandra.render_config, pairs, self.runs, self.dirs['cassandra'],
+                                        directories=directories, exact=not self.cassandra.fldgen_build)
+
+        if self.jobs is not None:
+            plans['jobs'] = job_script_plan(self.render.renderers['jobs'], self.job_members(), self.dirs['jobs'])
+
+        total = combine_capacity(plans.values())
+
+        # the output directory and its subdirectories
+        total['directories'] += 1 + len(STUDY_DIRS)
+        total['inodes'] += 1 + len(STUDY_DIRS)
+
+        if quota not in (None, False):
+            total['quota'] = check_quota(total, self.output_dir, quota)
+
+        plans['total'] = total
+
+        return plans
+
+    def build(self, workers=None, backend='thread', catalog=None, seed_table=None, validate=False, profile=None,
+              progress=None):
+        """Write every file of the study in a single pass over its members.
+
+        :param workers:                 Number of parallel workers to use.  None or 1 runs serially.
+        :type workers:                  int
+
+        :param backend:                 Either 'thread' or 'process'
+        :type backend:                  str
+
+        :param catalog:                 File name of a run catalog to write; relative names are placed in
+                                        `output_dir`.  See `catalog` in BuildCassandraConfigs.
+        :type catalog:                  str
+
+        :param seed_table:              File name of a table of the RNGseed of every run to write; relative names are
+                                        placed in `output_dir`.  See `seed_table` in BuildCassandraConfigs.
+        :type seed_table:               str
+
+        :param validate:                If True, check that the input files exist before anything is written; see
+                                        cassie.validate
+        :type validate:                 bool; DirectoryIndex
+
+        :param profile:                 Full path to write a timing summary to, or a cassie.instrument.Profile to
+                                        record into
+        :type profile:                  str; Profile
+
+        :param progress:                Callable run as `progress(done, profile)` as files are generated
+        :type progress:                 callable
+
+        :return:                        List of (member, file name, content hash, written) records
+
+        """
+
+        if seed_table is not None and not self.cassandra.fldgen_build:
+            raise ValueError("`seed_table` requires the Cassandra files to build Fldgen")
+
+        profile_option, profile = profile, make_profile(profile, progress)
+
+        with profiled(profile, 'build_study', profile_option):
+
+            index = make_index(validate)
+
+            if index is not None:
+                with stage('validate'):
+                    validate_inputs(self.input_files(), index)
+
+            for directory in self.dirs.values():
+                os.makedirs(directory, exist_ok=True)
+
+            if self.fanout is not None:
+                with stage('layout'):
+                    for kind in ('xanthos', 'cassandra') if self.xanthos is not None else ('cassandra',):
+                        make_layout(self.dirs[kind], self.model_list, self.scenario_list, self.runs, self.fanout)
+
+            records, _ = emit_files(self.render, self.members(), self.output_dir, workers=workers, backend=backend,
+                                    profile=profile)
+
+            if catalog is not None:
+                with stage('catalog'):
+                    rows = (self.cassandra.catalog_row(member, os.path.relpath(file_name, STUDY_DIRS[kind]), digest)
+                            for (kind, member), file_name, digest, _ in records if kind == 'cassandra')
+
+                    write_catalog(rows, os.path.join(self.output_dir, catalog))
+
+            if seed_table is not None:
+                with stage('seeds'):
+                    seeds = self.cassandra.ensemble_seeds()
+                    write_seed_table(seeds, os.path.join(self.output_dir, seed_table))
+
+                collisions = seed_collisions(seeds)
+
+                if collisions:
+                    warnings.warn(f"{collisions} run(s) share their RNGseed with another run; set \"seed_mode\": "
+                                  f"\"unique\" in the 'cassandra' section to give every run a different seed")
+
+        return records
+
+
+def build_study(spec_file, **kwargs):
+    """Convenience function to generate every file of a study spec; see `Study.build` for the keyword arguments."""
+
+    return Study.from_file(spec_file).build(**kwargs)
+
+
+def main(args=None):
+    """Command line interface to generate a study:
+
+        cassie build study.json --workers 8 --catalog runs.npy --validate
+
+    """
+
+    parser = argparse.ArgumentParser(prog='cassie build',
+                                     description='Generate the Xanthos configs, Cassandra configs, and job scripts '
+                                                 'of a study spec in a single pass.')
+    parser.add_argument('spec', help='JSON study spec')
+    parser.add_argument('--workers', type=int, default=None, help='number of parallel workers')
+    parser.add_argument('--backend', choices=('thread', 'process'), default='thread')
+    parser.add_argument('--catalog', default=None, help='run catalog file name to write in the output directory')
+    parser.add_argument('--seed-table', default=None, help='seed table file name to write in the output directory')
+    parser.add_argument('--validate', action='store_true', help='check that input files exist before writing')
+    parser.add_argument('--profile', default=None, help='file to write a timing summary to')
+    parser.add_argument('--dry-run', action='store_true', help='print the plan of the study as JSON instead of '
+                                                               'writing it, compared to the free space of the '
+                                                               'output filesystem')
+    parser.add_argument('--quota-bytes', type=int, default=None, help='bytes limit to compare the plan to')
+    parser.add_argument('--quota-inodes', type=int, default=None, help='inodes limit to compare the plan to')
+
+    args = parser.parse_args(args)
+
+    if args.dry_run:
+        limits = {key: value for key, value in (('bytes', args.quota_bytes), ('inodes', args.quota_inodes))
+                  if value is not None}
+
+        plans = Study.from_file(args.spec).plan(quota=limits)
+
+        print(json.dumps(plans, indent=2))
+
+        return 0 if plans['total']['quota']['fits'] else 1
+
+    records = build_study(args.spec, workers=args.workers, backend=args.backend, catalog=args.catalog,
+                          seed_table=args.seed_table, validate=args.validate, profile=args.profile)
+
+    written = sum(1 for record in records if record[3])
+
+    print(f"{written} file(s) written", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
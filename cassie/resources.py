@@ -0,0 +1,185 @@
+import math
+
+
+# MPI weights of the components when the configuration files do not set them; the defaults of BuildCassandraConfigs
+DEFAULT_WEIGHTS = {'xanthos': 2.0, 'fldgen': 10.0}
+
+
+def component_weights(xanthos_build=True, fldgen_build=True, xanthos_mpi_weight=DEFAULT_WEIGHTS['xanthos'],
+                      fldgen_mpi_weight=DEFAULT_WEIGHTS['fldgen']):
+    """Get the `mp.weight` of every component enabled in the Cassandra configuration files as a dictionary of
+    component name to weight."""
+
+    weights = {}
+
+    if xanthos_build:
+        weights['xanthos'] = xanthos_mpi_weight
+
+    if fldgen_build:
+        weights['fldgen'] = fldgen_mpi_weight
+
+    return weights
+
+
+def split_cores(cores, weights):
+    """Split `cores` between items of the given weights, at least one core each and the rest in proportion to the
+    weights; cores left over from rounding go to the heaviest items.  Items share evenly if every weight is 0.
+
+    :return:                            List of the cores of each item
+
+    """
+
+    if not weights:
+        return []
+
+    total = sum(weights)
+    extra = cores - len(weights)
+
+    if total > 0:
+        exact = [extra * weight / total for weight in weights]
+    else:
+        exact = [extra / len(weights)] * len(weights)
+
+    shares = [1 + math.floor(value) for value in exact]
+
+    # largest remainder first, then the heaviest item first
+    order = sorted(range(len(weights)), key=lambda item: (math.floor(exact[item]) - exact[item], -weights[item], item))
+
+    for item in order[:cores - sum(shares)]:
+        shares[item] += 1
+
+    return shares
+
+
+def place_ranks(cores_per_node, nodes, ntasks, rank_weights):
+    """Get the cores each rank of a run uses when `ntasks` tasks are placed block-wise on `nodes` nodes, as SLURM
+    does by default.  Each node has the `--cpus-per-task` of every task placed on it; rank 0 of each run gets one
+    core if it only coordinates (weight None), and the other ranks on the node split the rest by weight.  A rank
+    placed differently in different runs gets the fewest cores it has in any run.
+
+    :return:                            (cpus per task, list of the cores of each rank) tuple, or None if the tasks
+                                        do not fill `nodes` nodes with at least one core each
+
+    """
+
+    ranks = len(rank_weights)
+    tasks_per_node = math.ceil(ntasks / nodes)
+    cpus_per_task = cores_per_node // tasks_per_node
+
+    if cpus_per_task < 1 or (nodes - 1) * tasks_per_node >= ntasks:
+        return None
+
+    rank_cores = [None] * ranks
+
+    for node in range(nodes):
+        tasks = range(node * tasks_per_node, min((node + 1) * tasks_per_node, ntasks))
+
+        coordinators = [task for task in tasks if rank_weights[task % ranks] is None]
+        workers = [task for task in tasks if rank_weights[task % ranks] is not None]
+
+        shares = split_cores(len(tasks) * cpus_per_task - len(coordinators),
+                             [rank_weights[task % ranks] for task in workers])
+
+        for task, cores in zip(coordinators + workers, [1] * len(coordinators) + shares):
+            rank = task % ranks
+            rank_cores[rank] = cores if rank_cores[rank] is None else min(rank_cores[rank], cores)
+
+    return cpus_per_task, rank_cores
+
+
+def resource_plan(cores_per_node, nodes=1, weights=None, concurrency=1):
+    """Plan the MPI ranks and cores of each Cassandra run from its components and their `mp.weight`.
+
+    Each run uses one rank to coordinate and one rank per component, like the three ranks of the shipped job
+    scripts for the Xanthos and Fldgen components.  When the nodes have fewer cores than that, the lightest
+    components share the least loaded rank, as Cassandra assigns components to ranks by weight.
+
+    SLURM gives every task the same `--cpus-per-task`, so that is what the job requests; the cores of a node are
+    then split between the ranks placed on it:  the coordinating rank uses a single core and the component ranks
+    share the rest in proportion to their weight (see `place_ranks`).  Xanthos runs its basins in parallel on the
+    cores of its rank, and on its share of them if it shares the rank with other components.  Of the node counts up
+    to `nodes`, the plan uses the one that leaves the smallest share of the cores of its nodes idle, and the larger
+    one on a tie.
+
+    :param cores_per_node:              Number of cores of each node
+    :type cores_per_node:               int
+
+    :param nodes:                       Largest number of nodes a job may use
+    :type nodes:                        int
+
+    :param weights:                     Dictionary of component name to MPI weight from `component_weights`.
+                                        Defaults to the Xanthos and Fldgen components with their default weights.
+    :type weights:                      dict
+
+    :param concurrency:                 Number of runs of a bundle that run at the same time
+    :type concurrency:                  int
+
+    :return:                            Dictionary with the MPI 'ranks' per run, 'concurrency', SLURM 'ntasks',
+                                        'nodes', and 'cpus_per_task', the Xanthos 'xanthos_jobs', the components
+                                        'assignment' and the cores 'rank_cores' of each rank (rank 0 coordinates),
+                                        and the 'idle_cores' of the nodes that no rank uses
+
+    """
+
+    if weights is None:
+        weights = dict(DEFAULT_WEIGHTS)
+
+    if cores_per_node < 1 or nodes < 1 or concurrency < 1:
+        raise ValueError("`cores_per_node`, `nodes`, and `concurrency` must be at least 1")
+
+    # at least one core per rank
+    max_ranks = nodes * cores_per_node // concurrency
+
+    if max_ranks < 1:
+        raise ValueError(f"{concurrency} concurrent run(s) do not fit on {nodes} node(s) of {cores_per_node} core(s)")
+
+    ranks = min(1 + len(weights), max_ranks)
+
+    # heaviest components first, each on the least loaded rank; rank 0 only runs components if it is the only one
+    workers = list(range(1, ranks)) or [0]
+    assignment = [[] for _ in range(ranks)]
+    load = {rank: 0.0 for rank in workers}
+
+    for component, weight in sorted(weights.items(), key=lambda item: (-item[1], item[0])):
+        rank = min(workers, key=lambda candidate: (load[candidate], candidate))
+        assignment[rank].append(component)
+        load[rank] += weight
+
+    # None for the coordinating rank
+    rank_weights = [load.get(rank) for rank in range(ranks)]
+
+    ntasks = ranks * concurrency
+
+    best = None
+
+    for n_nodes in range(1, min(nodes, ntasks) + 1):
+        placed = place_ranks(cores_per_node, n_nodes, ntasks, rank_weights)
+
+        if placed is None:
+            continue
+
+        cpus_per_task, rank_cores = placed
+        idle_cores = n_nodes * cores_per_node - concurrency * sum(rank_cores)
+
+        if best is None or idle_cores / n_nodes <= best[3] / best[0]:
+            best = (n_nodes, cpus_per_task, rank_cores, idle_cores)
+
+    n_nodes, cpus_per_task, rank_cores, idle_cores = best
+
+    # Xanthos gets its weight's share of its rank; all the cores of a task if Xanthos is not built
+    xanthos_jobs = cpus_per_task
+
+    for rank, components in enumerate(assignment):
+        if 'xanthos' in components:
+            xanthos_jobs = split_cores(rank_cores[rank], [weights[component] for component in components])[
+                components.index('xanthos')]
+
+    return {'ranks': ranks,
+            'concurrency': concurrency,
+            'ntasks': ntasks,
+            'nodes': n_nodes,
+            'cpus_per_task': cpus_per_task,
+            'xanthos_jobs': xanthos_jobs,
+            'assignment': assignment,
+            'rank_cores': rank_cores,
+            'idle_cores': idle_cores}
@@ -0,0 +1,348 @@
+import argparse
+import json
+import os
+import re
+import sys
+
+from cassie.build_job_scripts import ARRAY_SCRIPT, job_script_name
+from cassie.local import parse_array, read_directives
+
+
+# states of an ensemble member
+STATES = ('done', 'failed', 'missing')
+
+# SLURM output files written by the job scripts:  <logdir>/%A.%a.out
+OUTPUT_PATTERN = re.compile(r'^(\d+)\.(\d+)\.out$')
+
+# line echoed by every job script before launching a member; the Cassandra log directory is named after the member
+LAUNCH_PATTERN = re.compile(r'^mpirun .* -l (\S+) (\S+)$', re.MULTILINE)
+
+# text in an output file showing that a task without a status file did not finish cleanly
+FAILURE_PATTERNS = ('DUE TO TIME LIMIT', 'DUE TO NODE FAILURE', 'CANCELLED AT', 'oom-kill', 'Out Of Memory',
+                    'exited on signal', 'returned a non-zero exit code')
+
+# lines of a bundled or consolidated job script giving its bundle size and task list or lookup file
+BUNDLE_PATTERN = re.compile(r'^bundle_size=(\d+)$', re.MULTILINE)
+LIST_PATTERN = re.compile(r'^(?:tasklist|lookup)="(.+)"$', re.MULTILINE)
+
+
+def compact_array(task_ids, throttle=None):
+    """Get the shortest SLURM --array specification of a list of array task ids; e.g., [0, 1, 2, 3, 7] gives
+    "0-3,7", or "0-3,7%10" with a throttle of 10."""
+
+    parts = []
+    task_ids = sorted(set(task_ids))
+
+    index = 0
+
+    while index < len(task_ids):
+
+        first = last = task_ids[index]
+
+        while index + 1 < len(task_ids) and task_ids[index + 1] == last + 1:
+            index += 1
+            last = task_ids[index]
+
+        parts.append(str(first) if first == last else f"{first}-{last}")
+        index += 1
+
+    array_str = ','.join(parts)
+
+    if throttle:
+        array_str += f"%{throttle}"
+
+    return array_str
+
+
+def list_positions(list_file, lines):
+    """Get the position of each of `lines` in a task list or lookup file.
+
+    :raises ValueError:                 If a line is not in the file
+
+    """
+
+    with open(list_file) as get:
+        positions = {line: index for index, line in enumerate(get)}
+
+    missing = [line.strip() for line in lines if line not in positions]
+
+    if missing:
+        raise ValueError(f"{len(missing)} incomplete member(s) are not in '{list_file}', e.g. '{missing[0]}'; use "
+                         f"`write` to rewrite it")
+
+    return [positions[line] for line in lines]
+
+
+def read_attempts(sbatch_logdir):
+    """Get the outcome of the latest attempt of every member launched by a job script writing to `sbatch_logdir`.
+
+    Output files are read oldest first so that a resubmitted member takes the outcome of its latest attempt.  In
+    bundled and consolidated jobs, the exit code of each member is read from the bundle's status file and members
+    without one were still running when the task ended.  Otherwise a member succeeded if its output file reached
+    "Ended at" without a scheduler or MPI failure message (see FAILURE_PATTERNS).
+
+    :param sbatch_logdir:               Directory of the SLURM output files
+    :type sbatch_logdir:                str
+
+    :return:                            Dictionary of member name ("<model>_<scenario>_<task>") to a (succeeded,
+                                        output file) tuple
+
+    """
+
+    try:
+        with os.scandir(sbatch_logdir) as entries:
+            # ties in modification time are broken by job and array task id
+            outputs = sorted((entry.stat().st_mtime, *map(int, OUTPUT_PATTERN.match(entry.name).groups()),
+                              entry.name) for entry in entries if OUTPUT_PATTERN.match(entry.name))
+
+    except FileNotFoundError:
+        return {}
+
+    attempts = {}
+
+    for *_, file_name in outputs:
+
+        output_file = os.path.join(sbatch_logdir, file_name)
+
+        with open(output_file, errors='replace') as get:
+            text = get.read()
+
+        names = [os.path.basename(logdir) for logdir, _ in LAUNCH_PATTERN.findall(text)]
+
+        if not names:
+            continue
+
+        job_id, task_id = OUTPUT_PATTERN.match(file_name).groups()
+        status_file = os.path.join(sbatch_logdir, f"bundle_{job_id}_{task_id}.status")
+
+        if os.path.isfile(status_file):
+            by_task = {name.rsplit('_', 1)[1]: name for name in names}
+            codes = {}
+
+            with open(status_file) as get:
+                for line in get:
+                    fields = line.split()
+
+                    # "<task> <exit code>" lines in bundles and "<model> <scenario> <task> <exit code>" lines in
+                    # consolidated jobs
+                    if len(fields) == 2:
+                        codes[by_task.get(fields[0])] = fields[1]
+                    elif len(fields) == 4:
+                        codes['_'.join(fields[:3])] = fields[3]
+
+            for name in names:
+                attempts[name] = (codes.get(name) == '0', output_file)
+
+        else:
+            succeeded = 'Ended at' in text and not any(pattern in text for pattern in FAILURE_PATTERNS)
+
+            for name in names:
+                attempts[name] = (succeeded, output_file)
+
+    return attempts
+
+
+def classify_members(model_list, scenario_list, runs_per_config, sbatch_logdir, cassandra_log_dir=None):
+    """Classify every member of an ensemble as 'done', 'failed', or 'missing' from the output of its job scripts.
+
+    A member is done if its latest attempt succeeded (see `read_attempts`) and, when `cassandra_log_dir` is given,
+    its Cassandra log directory `<cassandra_log_dir>/<model>_<scenario>_<task>` exists.  It is failed if it was
+    attempted or has a log directory but is not done, and missing if there is no trace of it.  Each directory is
+    scanned once.
+
+    :param model_list:                  List of model names
+    :type model_list:                   list
+
+    :param scenario_list:               List of scenario names
+    :type scenario_list:                list
+
+    :param runs_per_config:             Number of runs per model and scenario
+    :type runs_per_config:              int
+
+    :param sbatch_logdir:               Directory of the SLURM output files (`sbatch_logdir` of build_job_scripts)
+    :type sbatch_logdir:                str
+
+    :param cassandra_log_dir:           Optional directory of the Cassandra log directories
+    :type cassandra_log_dir:            str
+
+    :return:                            Dictionary of (model, scenario, task) member to state in model, scenario,
+                                        task order
+
+    """
+
+    attempts = read_attempts(sbatch_logdir)
+
+    log_dirs = None
+
+    if cassandra_log_dir is not None:
+        try:
+            with os.scandir(cassandra_log_dir) as entries:
+                log_dirs = {entry.name for entry in entries if entry.is_dir()}
+
+        except FileNotFoundError:
+            log_dirs = set()
+
+    states = {}
+
+    for model in model_list:
+        for scenario in scenario_list:
+            for i in range(runs_per_config):
+
+                name = f"{model}_{scenario}_{i}"
+                succeeded, _ = attempts.get(name, (None, None))
+                logged = log_dirs is None or name in log_dirs
+
+                if succeeded and logged:
+                    state = 'done'
+                elif succeeded is not None or (log_dirs is not None and name in log_dirs):
+                    state = 'failed'
+                else:
+                    state = 'missing'
+
+                states[(model, scenario, i)] = state
+
+    return states
+
+
+def resume_jobs(states, job_dir, write=False):
+    """Get the `sbatch` commands that rerun only the members that are not done, using the job scripts generated by
+    build_job_scripts in `job_dir`.
+
+    Scripts running one member per array task are resubmitted with a compact `--array` list of the incomplete
+    tasks.  Bundled and consolidated scripts read their members from a task list or lookup file; with `write`,
+    that file is rewritten to hold only the incomplete members and the script is resubmitted with an array range
+    covering their bundles.  Only rewrite the files once the previous submission has finished; build_job_scripts
+    regenerates the full lists.  Without `write`, the bundles of the unchanged file that hold an incomplete member
+    are resubmitted, which also reruns the members of those bundles that are done.
+
+    :param states:                      Dictionary of member to state from `classify_members`
+    :type states:                       dict
+
+    :param job_dir:                     Directory of the generated job scripts
+    :type job_dir:                      str
+
+    :param write:                       If True, rewrite the task lists and lookup file of bundled and consolidated
+                                        scripts
+    :type write:                        bool
+
+    :return:                            List of `sbatch` command strings; empty if every member is done
+
+    :raises ValueError:                 If a job script does not exist, or without `write`, if an incomplete member
+                                        is not in the task list or lookup file of its script
+
+    """
+
+    incomplete = [member for member, state in states.items() if state != 'done']
+
+    consolidated_script = os.path.join(job_dir, ARRAY_SCRIPT)
+
+    groups = {}
+
+    for member in incomplete:
+        script_file = (consolidated_script if os.path.isfile(consolidated_script)
+                       else os.path.join(job_dir, job_script_name(*member[:2])))
+        groups.setdefault(script_file, []).append(member)
+
+    commands = []
+
+    for script_file, members in groups.items():
+
+        if not os.path.isfile(script_file):
+            raise ValueError(f"Job script '{script_file}' does not exist")
+
+        with open(script_file) as get:
+            text = get.read()
+
+        _, throttle = parse_array(read_directives(script_file).get('array') or '0')
+
+        bundle = BUNDLE_PATTERN.search(text)
+
+        if bundle is None:
+            array_str = compact_array([i for _, _, i in members], throttle)
+
+        else:
+            list_file = LIST_PATTERN.search(text).group(1)
+
+            if script_file == consolidated_script:
+                lines = [f"{model} {scenario} {i}\n" for model, scenario, i in members]
+            else:
+                lines = [f"{i}\n" for _, _, i in members]
+
+            if write:
+                with open(list_file, 'w') as out:
+                    out.writelines(lines)
+
+                positions = range(len(lines))
+
+            else:
+                positions = list_positions(list_file, lines)
+
+            bundle_size = int(bundle.group(1))
+
+            array_str = compact_array({position // bundle_size for position in positions}, throttle)
+
+        commands.append(f"sbatch --array={array_str} {script_file}")
+
+    return commands
+
+
+def main(args=None):
+    """Command line interface to resubmit the incomplete members of an ensemble:
+
+        cassie resume --spec study.json --write
+        cassie resume --models GFDL-ESM2M --scenarios rcp26 rcp85 --runs 40 --logdir /logs --job-dir /jobs
+
+    """
+
+    parser = argparse.ArgumentParser(prog='cassie resume',
+                                     description='Find the members of an ensemble that are not done and print the '
+                                                 'sbatch commands that rerun only those.')
+    parser.add_argument('--spec', default=None, help='study spec to read the ensemble and directories from')
+    parser.add_argument('--models', nargs='+', default=None)
+    parser.add_argument('--scenarios', nargs='+', default=None)
+    parser.add_argument('--runs', type=int, default=None, help='runs per model and scenario')
+    parser.add_argument('--logdir', default=None, help='directory of the SLURM output files')
+    parser.add_argument('--casslogdir', default=None, help='directory of the Cassandra log directories')
+    parser.add_argument('--job-dir', default=None, help='directory of the generated job scripts')
+    parser.add_argument('--write', action='store_true', help='rewrite the task lists of bundled scripts')
+    parser.add_argument('--report', default=None, help='JSON file to write the state of every member to')
+
+    args = parser.parse_args(args)
+
+    if args.spec is not None:
+        from cassie.pipeline import Study
+
+        study = Study.from_file(args.spec)
+        jobs = study.jobs or {}
+
+        args.models = args.models or study.model_list
+        args.scenarios = args.scenarios or study.scenario_list
+        args.runs = args.runs or study.runs
+        args.logdir = args.logdir or jobs.get('sbatch_logdir', '.')
+        args.casslogdir = args.casslogdir or jobs.get('cassandra_log_dir')
+        args.job_dir = args.job_dir or study.dirs['jobs']
+
+    if None in (args.models, args.scenarios, args.runs, args.logdir, args.job_dir):
+        parser.error('give --spec or all of --models, --scenarios, --runs, --logdir, and --job-dir')
+
+    states = classify_members(args.models, args.scenarios, args.runs, args.logdir, args.casslogdir)
+
+    counts = {state: 0 for state in STATES}
+
+    for state in states.values():
+        counts[state] += 1
+
+    print(', '.join(f"{counts[state]} {state}" for state in STATES), file=sys.stderr)
+
+    for command in resume_jobs(states, args.job_dir, write=args.write):
+        print(command)
+
+    if args.report is not None:
+        with open(args.report, 'w') as out:
+            json.dump([[*member, state] for member, state in states.items()], out, indent=2)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""Allocation of the Fldgen RNG seeds of an ensemble.
+
+Two modes are available:
+
+    crc         the seed of each run is the CRC32 of the full path of its Cassandra configuration file, as signed
+                32-bit integer.  Reproduces the seeds of earlier builds, but nothing keeps two runs from sharing a
+                seed.
+    unique      every run of the ensemble gets a different seed.  Runs are numbered task-major,
+                `task * n_pairs + pair` where `pair` is the index of the (model, scenario) combination in scenario,
+                model order, and each number is mapped to a seed by a keyed bijection of the 32-bit integers, so no
+                two runs can share a seed.  Seeds only depend on the model and scenario lists, the task, and the
+                study `seed`; they are the same for every shard and output layout, and adding runs per
+                configuration leaves the seeds of the existing runs unchanged.
+
+'unique' mode seeds are computed with NumPy for many runs at once; the builders compute them in blocks of
+`SEED_BLOCK` tasks so that planning or building a few runs of a large ensemble does not compute all of its seeds.
+
+"""
+from binascii import crc32
+
+from cassie.catalog import make_table, read_table, write_table
+
+
+# available seed allocation modes
+SEED_MODES = ('crc', 'unique')
+
+# seed table columns and their NumPy types; string widths are sized to the data
+FIELDS = (('model', 'U'),
+          ('scenario', 'U'),
+          ('task', 'i4'),
+          ('rng_seed', 'i8'))
+
+MASK32 = 0xffffffff
+
+# number of tasks of a (model, scenario) combination whose 'unique' mode seeds the builders compute at once
+SEED_BLOCK = 4096
+
+# added to the study seed so the default seed of 0 does not map the first run to 0
+SEED_OFFSET = 0x9e3779b9
+
+
+def signify32(x):
+    """Convert an unsigned 32-bit integer to the signed integer with the same bits."""
+
+    if x > 0x7fffffff:
+        return x - 4294967296  # x - 2**32
+    else:
+        return x
+
+
+def crc_seed(file_path):
+    """Get the 'crc' mode seed of a run from the full path of its Cassandra configuration file."""
+
+    return signify32(crc32(file_path.encode()))
+
+
+def mix32(x):
+    """Bijection of the unsigned 32-bit integers that spreads consecutive inputs across the range; works on Python
+    integers and on NumPy uint64 arrays of values below 2**32."""
+
+    x = x ^ (x >> 16)
+    x = (x * 0x7feb352d) & MASK32
+    x = x ^ (x >> 15)
+    x = (x * 0x846ca68b) & MASK32
+
+    return x ^ (x >> 16)
+
+
+def check_seed_mode(seed_mode, seed=0):
+    """Raise a ValueError for an unknown `seed_mode` or a `seed` that is not an unsigned 32-bit integer."""
+
+    if seed_mode not in SEED_MODES:
+        raise ValueError(f"Unknown seed mode '{seed_mode}'; use one of {SEED_MODES}")
+
+    if not isinstance(seed, int) or not 0 <= seed <= MASK32:
+        raise ValueError(f"`seed` must be an integer from 0 to {MASK32}, not {seed!r}")
+
+
+def seed_key(seed):
+    """Get the key of the bijection of 'unique' mode from the study seed."""
+
+    return mix32((seed + SEED_OFFSET) & MASK32)
+
+
+def unique_seeds(n_pairs, runs_per_config, seed=0, pairs=None, tasks=None):
+    """Get the 'unique' mode seeds of an ensemble, or of some of its runs.
+
+    :param n_pairs:                     Number of (model, scenario) combinations
+    :type n_pairs:                      int
+
+    :param runs_per_config:             Number of runs per combination
+    :type runs_per_config:              int
+
+    :param seed:                        Study seed selecting one of the 2**32 seed assignments
+    :type seed:                         int
+
+    :param pairs:                       Indices of the combinations in scenario, model order to get the seeds of.
+                                        Defaults to every combination.
+    :type pairs:                        sequence
+
+    :param tasks:                       Task numbers to get the seeds of.  Defaults to every task.
+    :type tasks:                        sequence
+
+    :return:                            NumPy int64 array of shape (pairs, tasks) of signed 32-bit seeds
+
+    :raises ValueError:                 If the ensemble has more than 2**32 runs
+
+    """
+
+    import numpy as np
+
+    if n_pairs * runs_per_config > MASK32 + 1:
+        raise ValueError(f"{n_pairs * runs_per_config} runs do not fit in the 2**32 unique seeds")
+
+    key = seed_key(seed)
+
+    pairs = np.arange(n_pairs) if pairs is None else np.asarray(pairs)
+    tasks = np.arange(runs_per_config) if tasks is None else np.asarray(tasks)
+
+    pairs = pairs.astype(np.uint64)[:, np.newaxis]
+    tasks = tasks.astype(np.uint64)[np.newaxis, :]
+
+    seeds = mix32((tasks * np.uint64(n_pairs) + pairs) ^ np.uint64(key)).astype(np.int64)
+
+    return np.where(seeds > 0x7fffffff, seeds - 4294967296, seeds)
+
+
+def unique_seed_table(model_list, scenario_list, runs_per_config, seed=0):
+    """Get the seed table of the 'unique' mode seeds of an ensemble in scenario, model, task order without a Python
+    object per run; see `make_seed_table`."""
+
+    import numpy as np
+
+    models = np.array(model_list, dtype=str)
+    scenarios = np.array(scenario_list, dtype=str)
+
+    dtype = [('model', models.dtype), ('scenario', scenarios.dtype), ('task', 'i4'), ('rng_seed', 'i8')]
+
+    table = np.empty(len(model_list) * len(scenario_list) * runs_per_config, dtype=dtype)
+
+    table['model'] = np.tile(np.repeat(models, runs_per_config), len(scenario_list))
+    table['scenario'] = np.repeat(scenarios, len(model_list) * runs_per_config)
+    table['task'] = np.tile(np.arange(runs_per_config), len(model_list) * len(scenario_list))
+    table['rng_seed'] = unique_seeds(len(model_list) * len(scenario_list), runs_per_config, seed).ravel()
+
+    return table
+
+
+def make_seed_table(rows):
+    """Build a seed table from an iterable of (model, scenario, task, rng_seed) rows.
+
+    :return:                            NumPy structured array with the seed table columns
+
+    """
+
+    return make_table(rows, FIELDS)
+
+
+def write_seed_table(table, table_file):
+    """Write a seed table; the format is chosen from the extension (.npy for a NumPy structured array, otherwise
+    CSV)."""
+
+    write_table(table, table_file)
+
+
+def read_seed_table(table_file):
+    """Read a seed table written by `write_seed_table`."""
+
+    return read_table(table_file, FIELDS)
+
+
+def seed_collisions(table):
+    """Get the number of runs of a seed table that share their seed with another run."""
+
+    import numpy as np
+
+    _, counts = np.unique(table['rng_seed'], return_counts=True)
+
+    return int(counts[counts > 1].sum())
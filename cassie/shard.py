@@ -0,0 +1,224 @@
+import argparse
+import json
+import os
+import sys
+import warnings
+from itertools import chain, islice
+
+from cassie.manifest import existing_files, read_manifest
+
+
+def check_shard(shard_index, num_shards):
+    """Ensure that a shard index and number of shards are valid."""
+
+    if num_shards < 1 or not 0 <= shard_index < num_shards:
+        raise ValueError(f"Invalid shard {shard_index} of {num_shards}; `shard_index` must be in [0, `num_shards`)")
+
+
+def shard_range(n_members, shard_index, num_shards):
+    """Get the (start, stop) member indices of a shard.
+
+    Members are split into `num_shards` contiguous slices whose sizes differ by at most one, so concatenating the
+    output of every shard in shard order gives the output of a serial build in the same order.
+
+    """
+
+    check_shard(shard_index, num_shards)
+
+    size, remainder = divmod(n_members, num_shards)
+
+    start = shard_index * size + min(shard_index, remainder)
+    stop = start + size + (1 if shard_index < remainder else 0)
+
+    return start, stop
+
+
+def shard_members(members, n_members, shard_index=0, num_shards=1):
+    """Get the members of a shard from the members of the whole ensemble.
+
+    :param members:                     Iterable of every member in build order
+    :type members:                      iterable
+
+    :param n_members:                   Number of members in the whole ensemble
+    :type n_members:                    int
+
+    :param shard_index:                 Index of the shard, from 0 to `num_shards` - 1
+    :type shard_index:                  int
+
+    :param num_shards:                  Number of shards the ensemble is split into
+    :type num_shards:                   int
+
+    :return:                            Iterable of the shard's members in build order
+
+    """
+
+    if num_shards == 1:
+        check_shard(shard_index, num_shards)
+        return members
+
+    start, stop = shard_range(n_members, shard_index, num_shards)
+
+    return islice(members, start, stop)
+
+
+def shard_name(file_name, shard_index, num_shards):
+    """Get the name of a shard's copy of a manifest, catalog, or other per-build file; e.g., 'runs.npy' is written
+    as 'runs.shard-03-of-16.npy' by shard 3 of 16.  The name is unchanged if there is a single shard."""
+
+    if num_shards == 1:
+        return file_name
+
+    root, ext = os.path.splitext(file_name)
+    width = len(str(num_shards - 1))
+
+    return f"{root}.shard-{shard_index:0{width}d}-of-{num_shards}{ext}"
+
+
+def merge_manifests(output_dir, manifest, num_shards, stale='report'):
+    """Combine the manifests of every shard of an incremental build into the manifest of the whole build.
+
+    The merged manifest is identical to the manifest a serial build would write.  Stale files are determined across
+    the whole build, against the merged manifest of the previous build, since a file may move between shards when
+    the ensemble changes size.
+
+    :param output_dir:                  Directory the shards wrote their files to
+    :type output_dir:                   str
+
+    :param manifest:                    Manifest file name given to the builders; relative names are placed in
+                                        `output_dir`
+    :type manifest:                     str
+
+    :param num_shards:                  Number of shards
+    :type num_shards:                   int
+
+    :param stale:                       'report' to warn about files that are no longer generated and keep listing
+                                        them in the manifest, or 'remove' to delete them
+    :type stale:                        str
+
+    :return:                            Dictionary with the number of 'files' in the merged manifest and the list
+                                        of 'stale' file names
+
+    :raises ValueError:                 If a shard manifest is missing or the shards were built with different
+                                        parameters
+
+    """
+
+    if stale not in ('report', 'remove'):
+        raise ValueError(f"Unknown stale option '{stale}'; use 'report' or 'remove'")
+
+    manifest_file = os.path.join(output_dir, manifest)
+
+    shards = []
+
+    for shard_index in range(num_shards):
+
+        shard_file = os.path.join(output_dir, shard_name(manifest, shard_index, num_shards))
+
+        if not os.path.isfile(shard_file):
+            raise ValueError(f"Manifest of shard {shard_index} of {num_shards} does not exist:  '{shard_file}'")
+
+        shards.append(read_manifest(shard_file))
+
+    parameters = shards[0]['parameters']
+
+    if any(shard['parameters'] != parameters for shard in shards):
+        raise ValueError("Shard manifests were built with different parameters")
+
+    files = list(chain.from_iterable(shard['files'] for shard in shards))
+
+    previous = read_manifest(manifest_file)
+
+    generated = {record[0] for record in files}
+    recorded = [record[0] for record in previous['files']] + previous.get('stale', [])
+    on_disk = existing_files(output_dir, recorded)
+    stale_files = sorted({name for name in recorded if name in on_disk} - generated)
+
+    if stale_files and stale == 'remove':
+        for file_name in stale_files:
+            os.remove(os.path.join(output_dir, file_name))
+        stale_files = []
+
+    elif stale_files:
+        warnings.warn(f"{len(stale_files)} file(s) in '{output_dir}' are no longer generated by this build and are "
+                      f"listed as stale in '{manifest_file}'")
+
+    content = json.dumps({'parameters': parameters, 'files': files, 'stale': stale_files}, sort_keys=True,
+                         default=str)
+
+    # leave the manifest untouched when nothing changed
+    if not os.path.isfile(manifest_file) or json.dumps(previous, sort_keys=True, default=str) != content:
+        with open(manifest_file, 'w') as out:
+            out.write(content)
+
+    return {'files': len(files), 'stale': stale_files}
+
+
+def merge_catalogs(output_dir, catalog, num_shards):
+    """Combine the run catalogs of every shard into the catalog of the whole build, in serial build order.
+
+    :param output_dir:                  Directory the shards wrote their files to
+    :type output_dir:                   str
+
+    :param catalog:                     Catalog file name given to the builders; relative names are placed in
+                                        `output_dir`
+    :type catalog:                      str
+
+    :param num_shards:                  Number of shards
+    :type num_shards:                   int
+
+    :return:                            Merged RunCatalog
+
+    """
+
+    import numpy as np
+
+    from cassie.catalog import RunCatalog, read_catalog
+
+    catalogs = [read_catalog(os.path.join(output_dir, shard_name(catalog, shard_index, num_shards)))
+                for shard_index in range(num_shards)]
+
+    # string columns are sized to the data of each shard; widen them to the longest of any shard
+    names = catalogs[0].data.dtype.names
+    dtype = [(name, np.result_type(*(part.data.dtype[name] for part in catalogs))) for name in names]
+
+    merged = RunCatalog(np.concatenate([part.data.astype(dtype) for part in catalogs]))
+
+    merged.write(os.path.join(output_dir, catalog))
+
+    return merged
+
+
+def main(args=None):
+    """Command line interface to merge the output of a sharded build once every shard has finished:
+
+        python -m cassie.shard merge /configs 16 --manifest .cassie_manifest.json --catalog runs.npy
+
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m cassie.shard',
+                                     description='Combine the per-shard manifests and catalogs of a sharded build.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    merge = subparsers.add_parser('merge', help='merge the per-shard manifest and/or catalog')
+    merge.add_argument('output_dir')
+    merge.add_argument('num_shards', type=int)
+    merge.add_argument('--manifest', default=None, help='manifest file name given to the builders')
+    merge.add_argument('--catalog', default=None, help='catalog file name given to the builders')
+    merge.add_argument('--stale', choices=('report', 'remove'), default='report')
+
+    args = parser.parse_args(args)
+
+    if args.manifest is not None:
+        summary = merge_manifests(args.output_dir, args.manifest, args.num_shards, stale=args.stale)
+        print(f"{summary['files']} file(s) in the merged manifest; {len(summary['stale'])} stale")
+
+    if args.catalog is not None:
+        catalog = merge_catalogs(args.output_dir, args.catalog, args.num_shards)
+        print(f"{len(catalog)} run(s) in the merged catalog")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,266 @@
+import argparse
+import fcntl
+import os
+import shutil
+import sys
+
+
+# file name of the list of shared input files written alongside the job scripts
+STAGE_LIST = 'stage_inputs.txt'
+
+# lock file and directory of owner markers kept in the node-local stage directory
+STAGE_LOCK = '.stage.lock'
+STAGE_OWNERS = '.owners'
+
+
+def fldgen_input_names(model, scenario):
+    """Get the file names of the Fldgen emulator, TGAV file, and an2month fractions of a (model, scenario)
+    combination as a dictionary keyed by their FldgenComponent option."""
+
+    return {'emulator': f"fldgen-{model}.rds",
+            'tgav_file': f"fldgen-{model}_{scenario}.csv.gz",
+            'a2mfrac': f"alpha_{model}_{scenario}.rds"}
+
+
+def stage_inputs(model_list, scenario_list, fldgen_emulator_dir=None, fldgen_tgav_file_dir=None,
+                 an2month_file_dir=None, drought_thresholds_dir=None, xanthos_template=None):
+    """Get the shared input files every (model, scenario) combination reads.  Inputs whose directory is not given
+    are not staged.  The drought thresholds are the files in `drought_thresholds_dir` that the Xanthos configuration
+    files rendered from `xanthos_template` (the default template if None) reference.
+
+    :return:                            Dictionary of (model, scenario) to the list of full paths of its input files
+
+    """
+
+    dirs = {'emulator': fldgen_emulator_dir, 'tgav_file': fldgen_tgav_file_dir, 'a2mfrac': an2month_file_dir}
+
+    if drought_thresholds_dir is not None:
+        from cassie.build_xanthos_configs import xanthos_input_files, xanthos_renderer
+
+        # only the paths in `drought_thresholds_dir` are read from the rendered files
+        xanthos_render = xanthos_renderer('', '', drought_thresholds_dir, template=xanthos_template,
+                                          generate_drought_stats=1)
+
+    inputs = {}
+
+    for model in model_list:
+        for scenario in scenario_list:
+
+            files = [os.path.join(dirs[key], name) for key, name in fldgen_input_names(model, scenario).items()
+                     if dirs[key] is not None]
+
+            if drought_thresholds_dir is not None:
+                files.extend(path for _, path in xanthos_input_files(xanthos_render, [model], [scenario],
+                                                                     [drought_thresholds_dir]))
+
+            inputs[(model, scenario)] = files
+
+    return inputs
+
+
+def render_stage_list(inputs):
+    """Get the text of a stage list with one "<model> <scenario> <full path>" line per input file."""
+
+    return ''.join(f"{model} {scenario} {path}\n" for (model, scenario), files in inputs.items() for path in files)
+
+
+def read_stage_list(stage_list, model, scenario):
+    """Get the full paths of the input files of a (model, scenario) combination from a stage list."""
+
+    with open(stage_list) as get:
+        return [fields[2] for fields in (line.rstrip('\n').split(' ', 2) for line in get)
+                if len(fields) == 3 and fields[:2] == [model, scenario]]
+
+
+# blocks of shell code the default job script templates get in place of their <stagein>, <stagemember> and
+#    <stageout> tags when inputs are staged; without staging the tags are left empty
+STAGE_SETUP = """
+# copy the shared inputs to node-local disk once per node, on every node of the job; the configuration files
+#    must have been built with the same stage directory
+stagedir="{stage_dir}"
+stage="python -m cassie.stage"
+if [ "${{SLURM_JOB_NUM_NODES:-1}}" -gt 1 ]; then
+    stage="srun --nodes=$SLURM_JOB_NUM_NODES --ntasks-per-node=1 $stage"
+fi
+"""
+
+STAGE_IN = """$stage in {stage_list} $stagedir $SLURM_JOB_ID {model} {scenario} || exit 1
+"""
+
+STAGE_MEMBER = """
+    if ! $stage in {stage_list} $stagedir $SLURM_JOB_ID $model $scenario; then
+        echo "${{model}} ${{scenario}} ${{tid}} 1" >> $status
+        return
+    fi
+"""
+
+STAGE_OUT = """
+# remove the staged inputs once no other task on the node uses them
+$stage out $stagedir $SLURM_JOB_ID
+"""
+
+
+def render_stage_blocks(stage_dir, stage_list, model=None, scenario=None):
+    """Get the values of the <stagein>, <stagemember> and <stageout> job script tags.  A script of a single
+    (model, scenario) combination stages its inputs up front; a script running members of any combination (model
+    and scenario None) stages the inputs of each member before it runs.  All are empty if `stage_dir` is None.
+
+    :return:                            Dictionary of tag to shell code
+
+    """
+
+    if stage_dir is None:
+        return {'stagein': '', 'stagemember': '', 'stageout': ''}
+
+    if model is None:
+        return {'stagein': STAGE_SETUP.format(stage_dir=stage_dir),
+                'stagemember': STAGE_MEMBER.format(stage_list=stage_list),
+                'stageout': STAGE_OUT}
+
+    return {'stagein': (STAGE_SETUP.format(stage_dir=stage_dir)
+                        + STAGE_IN.format(stage_list=stage_list, model=model, scenario=scenario)),
+            'stagemember': '',
+            'stageout': STAGE_OUT}
+
+
+class StageLock:
+    """Exclusive lock on a node-local stage directory shared by every task running on the node."""
+
+    def __init__(self, stage_dir):
+        self.lock_file = os.path.join(stage_dir, STAGE_LOCK)
+
+    def __enter__(self):
+        self.handle = open(self.lock_file, 'a')
+        fcntl.flock(self.handle, fcntl.LOCK_EX)
+
+        return self
+
+    def __exit__(self, *args):
+        fcntl.flock(self.handle, fcntl.LOCK_UN)
+        self.handle.close()
+
+
+def stage_in(files, stage_dir, owner):
+    """Copy shared input files to a node-local directory, once per node.
+
+    Tasks on the same node take turns holding the lock of `stage_dir`; the first one copies each file and the
+    others find the copy in place.  A copy is made again if the shared file changed size or is newer.  `owner`
+    (e.g., the SLURM job id) is registered as a user of the directory until `stage_out`.
+
+    :param files:                       List of full paths to the shared input files
+    :type files:                        list
+
+    :param stage_dir:                   Node-local directory to copy the files to
+    :type stage_dir:                    str
+
+    :param owner:                       Name of the task using the files
+    :type owner:                        str
+
+    :return:                            List of full paths to the local copies
+
+    """
+
+    os.makedirs(os.path.join(stage_dir, STAGE_OWNERS), exist_ok=True)
+
+    local_files = []
+
+    with StageLock(stage_dir):
+
+        open(os.path.join(stage_dir, STAGE_OWNERS, owner), 'w').close()
+
+        for shared_file in files:
+
+            local_file = os.path.join(stage_dir, os.path.basename(shared_file))
+            shared = os.stat(shared_file)
+
+            try:
+                local = os.stat(local_file)
+                current = local.st_size == shared.st_size and local.st_mtime >= shared.st_mtime
+
+            except FileNotFoundError:
+                current = False
+
+            if not current:
+                # copy next to the target and rename so a partial copy is never read
+                partial_file = f"{local_file}.part"
+                shutil.copy2(shared_file, partial_file)
+                os.replace(partial_file, local_file)
+
+            local_files.append(local_file)
+
+    return local_files
+
+
+def stage_out(stage_dir, owner):
+    """Unregister `owner` from a node-local stage directory and remove the staged files once no task uses them.
+
+    :return:                            True if the staged files were removed
+
+    """
+
+    owners_dir = os.path.join(stage_dir, STAGE_OWNERS)
+
+    if not os.path.isdir(owners_dir):
+        return False
+
+    with StageLock(stage_dir):
+
+        try:
+            os.remove(os.path.join(owners_dir, owner))
+        except FileNotFoundError:
+            pass
+
+        if os.listdir(owners_dir):
+            return False
+
+        # the lock file and owners directory stay for the tasks waiting on the lock to stage their own inputs
+        with os.scandir(stage_dir) as entries:
+            for entry in entries:
+                if entry.name in (STAGE_LOCK, STAGE_OWNERS):
+                    continue
+
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.remove(entry.path)
+
+    return True
+
+
+def main(args=None):
+    """Command line interface used by generated job scripts to stage the shared inputs of a task on node-local disk
+    and clean them up when the task ends:
+
+        python -m cassie.stage in <stage list> <stage dir> <owner> <model> <scenario>
+        python -m cassie.stage out <stage dir> <owner>
+
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m cassie.stage',
+                                     description='Stage shared input files on node-local disk.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    stage = subparsers.add_parser('in', help='copy the inputs of a model and scenario once per node')
+    stage.add_argument('stage_list')
+    stage.add_argument('stage_dir')
+    stage.add_argument('owner')
+    stage.add_argument('model')
+    stage.add_argument('scenario')
+
+    cleanup = subparsers.add_parser('out', help='remove the staged inputs once no task on the node uses them')
+    cleanup.add_argument('stage_dir')
+    cleanup.add_argument('owner')
+
+    args = parser.parse_args(args)
+
+    if args.command == 'in':
+        stage_in(read_stage_list(args.stage_list, args.model, args.scenario), args.stage_dir, args.owner)
+    else:
+        stage_out(args.stage_dir, args.owner)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import re
+
+
+# placeholder tags look like `<tagname>`; anything else in angle brackets (e.g., `<your dir>`) is literal text
+TAG_PATTERN = re.compile(r'<([A-Za-z_][A-Za-z0-9_]*)>')
+
+
+class Template:
+    """Template compiled once into a list of literal segments and `<tag>` placeholder slots.
+
+    Rendering fills each slot from a mapping of tag name to value and joins the segments in a single pass, so a
+    template only has to be read and parsed once no matter how many files are generated from it.
+
+    :param text:                        Template text containing `<tag>` placeholders
+    :type text:                         str
+
+    :param source:                      Optional description of where the template came from; used in error messages
+    :type source:                       str
+
+    """
+
+    def __init__(self, text, source=None):
+
+        self.text = text
+        self.source = source
+
+        # odd entries of the split are the tag names, even entries are the literal text between them
+        self.segments = TAG_PATTERN.split(text)
+        self.slots = tuple((index, self.segments[index]) for index in range(1, len(self.segments), 2))
+        self.tags = frozenset(tag for _, tag in self.slots)
+
+    def __repr__(self):
+        return f"Template(source={self.source!r}, tags={sorted(self.tags)})"
+
+    @classmethod
+    def from_file(cls, template_file):
+        """Read and compile a template file.
+
+        :param template_file:           Full path with file name and extension to the template file
+        :type template_file:            str
+
+        :return:                        Compiled template
+
+        """
+
+        with open(template_file) as get:
+            return cls(get.read(), source=template_file)
+
+    def validate(self, tags):
+        """Ensure that every placeholder in the template is supplied by `tags`.
+
+        :param tags:                    Iterable of tag names that will be supplied at render time
+        :type tags:                     iterable
+
+        :raises ValueError:             If the template contains a placeholder that is not in `tags`
+
+        """
+
+        missing = self.tags.difference(tags)
+
+        if missing:
+            tag_str = ', '.join(f"<{tag}>" for tag in sorted(missing))
+            raise ValueError(f"Template '{self.source}' contains tags that are not supplied:  {tag_str}")
+
+    def render(self, values):
+        """Render the template.
+
+        :param values:                  Mapping of tag name (without brackets) to replacement value
+        :type values:                   dict
+
+        :return:                        Rendered text
+
+        """
+
+        segments = list(self.segments)
+
+        for index, tag in self.slots:
+            segments[index] = str(values[tag])
+
+        return ''.join(segments)
+
+
+def read_package_template(name):
+    """Read a template file contained in this package's data directory.
+
+    :param name:                        File name of the template in the cassie/data directory
+    :type name:                         str
+
+    :return:                            Template text
+
+    """
+
+    try:
+        from importlib.resources import files
+
+    except ImportError:  # Python < 3.9
+        from importlib.resources import read_text
+        return read_text('cassie.data', name)
+
+    return files('cassie.data').joinpath(name).read_text()
+
+
+def load_template(template, default_name):
+    """Get a compiled template from a user option.
+
+    :param template:                    A compiled Template, a full path to a template file, or None to use the
+                                        package template `default_name`
+    :type template:                     Template; str; None
+
+    :param default_name:                File name of the template in the cassie/data directory to use when
+                                        `template` is None
+    :type default_name:                 str
+
+    :return:                            Compiled template
+
+    """
+
+    if isinstance(template, Template):
+        return template
+
+    if template is None:
+        return Template(read_package_template(default_name), source=f"cassie/data/{default_name}")
+
+    return Template.from_file(template)
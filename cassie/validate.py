@@ -0,0 +1,121 @@
+import os
+
+from cassie.manifest import existing_files
+
+
+class MissingInputError(ValueError):
+    """Raised before anything is written when input files referenced by the configuration files do not exist.
+
+    :param missing:                     List of (description, full path) tuples; one per missing file
+    :type missing:                      list
+
+    """
+
+    def __init__(self, missing):
+
+        self.missing = missing
+
+        detail = '\n'.join(f"  {description}:  {path}" for description, path in missing)
+
+        super().__init__(f"{len(missing)} input file(s) do not exist:\n{detail}")
+
+
+class DirectoryIndex:
+    """In-memory index of the files in each directory, built with one directory scan the first time a directory is
+    looked up.  Checking whether a file exists is then a set lookup instead of a `stat` call, so an ensemble costs
+    one scan per input directory no matter how many files reference it.  Share an index between builders to reuse
+    the scans.
+
+    """
+
+    def __init__(self):
+        self.directories = {}
+
+    def files(self, directory):
+        """Get the set of file names in a directory, scanning it on first use."""
+
+        directory = os.path.normpath(directory)
+
+        names = self.directories.get(directory)
+
+        if names is None:
+            names = self.directories[directory] = existing_files(directory)
+
+        return names
+
+    def exists(self, path):
+        """Check whether a file exists according to the index."""
+
+        directory, file_name = os.path.split(path)
+
+        return file_name in self.files(directory or '.')
+
+
+def check_inputs(inputs, index=None):
+    """Get the input files that do not exist.
+
+    :param inputs:                      Iterable of (description, full path) tuples; repeated paths are only checked
+                                        once
+    :type inputs:                       iterable
+
+    :param index:                       Optional index to look files up in; a new one is used if not given
+    :type index:                        DirectoryIndex
+
+    :return:                            List of (description, full path) tuples of the missing files in input order
+
+    """
+
+    if index is None:
+        index = DirectoryIndex()
+
+    missing = []
+    seen = set()
+
+    for description, path in inputs:
+
+        if path in seen:
+            continue
+
+        seen.add(path)
+
+        if not index.exists(path):
+            missing.append((description, path))
+
+    return missing
+
+
+def validate_inputs(inputs, index=None):
+    """Ensure that every input file exists; see `check_inputs`.
+
+    :raises MissingInputError:          If any input file does not exist
+
+    """
+
+    missing = check_inputs(inputs, index)
+
+    if missing:
+        raise MissingInputError(missing)
+
+
+def make_index(validate):
+    """Get the DirectoryIndex to validate a build with from the `validate` builder option; None if it is off."""
+
+    if isinstance(validate, DirectoryIndex):
+        return validate
+
+    return DirectoryIndex() if validate else None
+
+
+def referenced_paths(text, directories):
+    """Get the (key, path) of every `key = value` line of a configuration file whose value is a path in one of
+    `directories`."""
+
+    prefixes = tuple(os.path.join(directory, '') for directory in directories)
+
+    for line in text.split('\n'):
+
+        key, _, value = line.partition('=')
+        value = value.strip().strip('"\'')
+
+        if value.startswith(prefixes) and not line.lstrip().startswith('#'):
+            yield key.strip(), value
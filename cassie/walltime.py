@@ -0,0 +1,326 @@
+import math
+import os
+import re
+from datetime import datetime
+
+from cassie.resume import FAILURE_PATTERNS, LAUNCH_PATTERN, OUTPUT_PATTERN
+
+
+# formats of `date` output echoed by the job scripts after "Started at" and "Ended at", without the time zone
+DATE_FORMATS = ('%a %b %d %H:%M:%S %Y', '%a %d %b %Y %H:%M:%S', '%a %d %b %Y %I:%M:%S %p', '%Y-%m-%dT%H:%M:%S')
+
+# message slurmstepd writes to the output file of a task killed at its time limit
+TIME_LIMIT_PATTERN = re.compile(r'CANCELLED AT (\S+) DUE TO TIME LIMIT')
+
+
+def parse_walltime(walltime):
+    """Get the number of seconds of a SLURM time limit; e.g., "90", "1:30:00", or "1-12:00:00"."""
+
+    days = 0
+
+    if '-' in walltime:
+        days, walltime = walltime.split('-')
+        fields = [int(field) for field in walltime.split(':')]
+
+        # "days-hours", "days-hours:minutes", and "days-hours:minutes:seconds"
+        hours, minutes, seconds = (fields + [0, 0])[:3]
+
+    else:
+        fields = [int(field) for field in walltime.split(':')]
+
+        # "minutes", "minutes:seconds", and "hours:minutes:seconds"
+        hours, minutes, seconds = (0, fields[0], 0) if len(fields) == 1 else ([0] + fields)[-3:]
+
+    return ((int(days) * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def format_walltime(seconds):
+    """Format a number of seconds as a SLURM time limit rounded up to a whole minute; e.g., "01:05:00"."""
+
+    minutes = max(1, math.ceil(seconds / 60))
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+
+    walltime = f"{hours:02d}:{minutes:02d}:00"
+
+    return f"{days}-{walltime}" if days else walltime
+
+
+def parse_date(date_str):
+    """Parse the output of `date` as echoed by the job scripts; None if it is not recognized.  The time zone name
+    (e.g., "UTC" or "PDT") is ignored since the start and end of a task are in the same zone."""
+
+    date_str = ' '.join(field for field in date_str.split()
+                        if not (field.isalpha() and field.isupper() and len(field) > 2))
+
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(date_str, date_format)
+        except ValueError:
+            continue
+
+    return None
+
+
+def read_runtimes(log_dirs):
+    """Get the runtime of every completed array task from the SLURM output files of previous runs.
+
+    The runtime is the time from the "Started at" to the "Ended at" line echoed by the job scripts.  Tasks that did
+    not end cleanly (e.g., walltime kills) have no runtime and are listed separately.  The runtime of a task killed
+    at its time limit is only known to be at least the time from its start to the kill.
+
+    :param log_dirs:                    Directory or list of directories of SLURM output files (%A.%a.out)
+    :type log_dirs:                     str; list
+
+    :return:                            List of (member names, seconds) tuples, one per completed array task, where
+                                        member names are the "<model>_<scenario>_<task>" the task ran, and a list of
+                                        (member names, timed out, seconds) tuples, one per task that timed out or
+                                        failed, where seconds is the time until a time limit kill, or None if it is
+                                        not known
+
+    """
+
+    if isinstance(log_dirs, str):
+        log_dirs = [log_dirs]
+
+    runtimes = []
+    killed = []
+
+    for log_dir in log_dirs:
+
+        with os.scandir(log_dir) as entries:
+            file_names = sorted(entry.name for entry in entries if OUTPUT_PATTERN.match(entry.name))
+
+        for file_name in file_names:
+
+            with open(os.path.join(log_dir, file_name), errors='replace') as get:
+                text = get.read()
+
+            names = [os.path.basename(logdir) for logdir, _ in LAUNCH_PATTERN.findall(text)]
+
+            if not names:
+                continue
+
+            start = end = None
+
+            for line in text.splitlines():
+                if line.startswith('Started at '):
+                    start = parse_date(line[len('Started at '):])
+                elif line.startswith('Ended at '):
+                    end = parse_date(line[len('Ended at '):])
+
+            timeout = TIME_LIMIT_PATTERN.search(text)
+
+            if timeout is not None:
+                cancelled = parse_date(timeout.group(1))
+                seconds = (cancelled - start).total_seconds() if start is not None and cancelled is not None else None
+                killed.append((names, True, seconds))
+
+            elif start is None or end is None or any(pattern in text for pattern in FAILURE_PATTERNS):
+                killed.append((names, False, None))
+
+            else:
+                runtimes.append((names, (end - start).total_seconds()))
+
+    return runtimes, killed
+
+
+def quantile(values, q):
+    """Get the `q` quantile of a list of values by linear interpolation between the closest ranks."""
+
+    values = sorted(values)
+    position = (len(values) - 1) * q
+    lower = math.floor(position)
+    upper = min(lower + 1, len(values) - 1)
+
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def estimate_walltimes(model_list, scenario_list, log_dirs, quantile_level=0.95, margin=0.2, default='01:00:00'):
+    """Estimate the time limit of each job script from the runtimes of previous runs.
+
+    Runtimes are fit per (model, scenario) from the array tasks that ran members of a single combination; tasks of
+    a consolidated job that ran several combinations only count toward the ensemble wide estimate keyed by
+    (None, None).  The time limit is the `quantile_level` quantile of the runtimes plus `margin`, rounded up to a
+    whole minute.  Combinations without history keep `default`.  Use logs from runs with the same bundling options,
+    since the runtime of an array task depends on the number of members it runs.
+
+    A task killed at its time limit ran for at least that long, so it counts toward the quantile with the time
+    until the kill (the old limit, `default` if the log does not show it), and a combination with such a task gets
+    at least the old limit plus `margin`.  Tasks that failed otherwise are only counted.
+
+    :param model_list:                  List of model names
+    :type model_list:                   list
+
+    :param scenario_list:               List of scenario names
+    :type scenario_list:                list
+
+    :param log_dirs:                    Directory or list of directories of SLURM output files of previous runs
+    :type log_dirs:                     str; list
+
+    :param quantile_level:              Quantile of the runtimes to cover; e.g., 0.95
+    :type quantile_level:               float
+
+    :param margin:                      Safety margin added to the quantile as a fraction; e.g., 0.2 for 20%
+    :type margin:                       float
+
+    :param default:                     Time limit used for combinations without history
+    :type default:                      str
+
+    :return:                            Dictionary of (model, scenario) to time limit for the combinations with
+                                        history, and a JSON serializable report with the runtime statistics and
+                                        time limit of each combination ('scripts')
+
+    """
+
+    runtimes, killed = read_runtimes(log_dirs)
+
+    pairs = {f"{model}_{scenario}_": (model, scenario) for model in model_list for scenario in scenario_list}
+
+    def pair_of(names):
+        """Get the (model, scenario) every member name belongs to, or (None, None) if they are not all the same."""
+
+        found = set()
+
+        for name in names:
+            prefix = name.rsplit('_', 1)[0] + '_'
+            found.add(pairs.get(prefix))
+
+        return found.pop() if len(found) == 1 and None not in found else (None, None)
+
+    samples = {}
+    timeouts = {}
+
+    for names, seconds in runtimes:
+        pair = pair_of(names)
+        samples.setdefault(pair, []).append(seconds)
+
+        if pair != (None, None):
+            samples.setdefault((None, None), []).append(seconds)
+
+    # runtimes of the tasks killed at their time limit, at least the old limit
+    limits = {}
+
+    for names, timed_out, seconds in killed:
+        pair = pair_of(names)
+        keys = [pair] if pair == (None, None) else [pair, (None, None)]
+
+        for key in keys:
+            timeouts[key] = timeouts.get(key, 0) + 1
+
+            if timed_out:
+                limits.setdefault(key, []).append(parse_walltime(default) if seconds is None else seconds)
+
+    walltimes = {}
+    scripts = {}
+
+    for pair in list(pairs.values()) + [(None, None)]:
+
+        completed = samples.get(pair, [])
+        values = completed + limits.get(pair, [])
+        entry = {'samples': len(completed), 'killed': timeouts.get(pair, 0), 'timed_out': len(limits.get(pair, []))}
+
+        if values:
+            seconds = quantile(values, quantile_level) * (1 + margin)
+
+            if pair in limits:
+                seconds = max(seconds, max(limits[pair]) * (1 + margin))
+
+            walltimes[pair] = format_walltime(seconds)
+
+            entry.update(median_seconds=quantile(values, 0.5),
+                         quantile_seconds=quantile(values, quantile_level),
+                         max_seconds=max(values),
+                         coverage=(sum(1 for value in completed if value <= parse_walltime(walltimes[pair]))
+                                   / len(completed) if completed else None))
+
+        entry['walltime'] = walltimes.get(pair, default)
+
+        scripts['ensemble' if pair == (None, None) else '_'.join(pair)] = entry
+
+    report = {'quantile': quantile_level, 'margin': margin, 'default': default, 'scripts': scripts}
+
+    return walltimes, report
+
+
+def requested_core_hours(walltimes, default, array_tasks, cores_per_task):
+    """Get the core hours the job scripts request with the default and the estimated time limits.
+
+    :param walltimes:                   Dictionary of (model, scenario) to estimated time limit
+    :type walltimes:                    dict
+
+    :param default:                     Time limit used without an estimate
+    :type default:                      str
+
+    :param array_tasks:                 Dictionary of (model, scenario) to the number of array tasks its script
+                                        runs; (None, None) for a consolidated array job
+    :type array_tasks:                  dict
+
+    :param cores_per_task:              Number of cores each array task requests
+    :type cores_per_task:               int
+
+    :return:                            Dictionary with the 'default' and 'estimated' core hours and the core hours
+                                        'saved'
+
+    """
+
+    core_hours = {'default': 0.0, 'estimated': 0.0}
+
+    for pair, n_tasks in array_tasks.items():
+        hours = n_tasks * cores_per_task / 3600
+        core_hours['default'] += hours * parse_walltime(default)
+        core_hours['estimated'] += hours * parse_walltime(walltimes.get(pair, default))
+
+    core_hours['saved'] = core_hours['default'] - core_hours['estimated']
+
+    return core_hours
+
+
+def queue_savings(walltimes, default, array_tasks, nodes_per_task):
+    """Estimate how the estimated time limits shorten the wait of the job scripts in the queue.
+
+    The scheduler plans the start of each pending job from the time limits of the running jobs, and a backfill
+    scheduler starts a task ahead of its turn only if its time limit ends before the next planned start.  A task
+    therefore fits the gaps of the queue that are at least as long as its time limit, and holds its nodes away from
+    the planned starts of other jobs for the node hours of its time limit.  Both shrink with the time limit; the
+    time actually saved depends on the other jobs in the queue.
+
+    :param walltimes:                   Dictionary of (model, scenario) to estimated time limit
+    :type walltimes:                    dict
+
+    :param default:                     Time limit used without an estimate
+    :type default:                      str
+
+    :param array_tasks:                 Dictionary of (model, scenario) to the number of array tasks its script
+                                        runs; (None, None) for a consolidated array job
+    :type array_tasks:                  dict
+
+    :param nodes_per_task:              Number of nodes each array task requests
+    :type nodes_per_task:               int
+
+    :return:                            Dictionary with the 'default' and 'estimated' node hours the tasks hold
+                                        for the scheduler and the node hours 'saved', and the time limit of each
+                                        script ('scripts') with the 'default' and 'estimated' seconds and the
+                                        'reduction' as a fraction of the default; the smallest queue gap a task
+                                        fits shrinks by the same fraction
+
+    """
+
+    node_hours = {'default': 0.0, 'estimated': 0.0}
+    scripts = {}
+
+    for pair, n_tasks in array_tasks.items():
+        default_seconds = parse_walltime(default)
+        estimated_seconds = parse_walltime(walltimes.get(pair, default))
+
+        node_hours['default'] += n_tasks * nodes_per_task * default_seconds / 3600
+        node_hours['estimated'] += n_tasks * nodes_per_task * estimated_seconds / 3600
+
+        scripts['ensemble' if pair == (None, None) else '_'.join(pair)] = {
+            'default': default_seconds,
+            'estimated': estimated_seconds,
+            'reduction': 1 - estimated_seconds / default_seconds}
+
+    node_hours['saved'] = node_hours['default'] - node_hours['estimated']
+
+    return dict(node_hours, scripts=scripts)
@@ -16,6 +16,7 @@ setup(
     author_email='chris.vernon@pnnl.gov',
     description='Configuration builders scripts for the Cassandra coupler',
     install_requires=get_requirements(),
-    python_requires='>=3.6',
-    include_package_data=True
+    python_requires='>=3.7',
+    include_package_data=True,
+    entry_points={'console_scripts': ['cassie = cassie.cli:main']}
 )
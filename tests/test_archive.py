@@ -0,0 +1,53 @@
+import os
+import tarfile
+
+from cassie.archive import ConfigArchive, index_file
+from cassie.build_cassandra_configs import build_cassandra_configs
+
+MODELS = ['MIROC5', 'GFDL-ESM2M']
+SCENARIOS = ['rcp26', 'rcp85']
+
+
+def build(output_dir, **kwargs):
+    os.makedirs(output_dir)
+
+    build_cassandra_configs(MODELS, SCENARIOS, str(output_dir), 6, '/gcam/ModelInterface.jar', '/gcam/dbxml/lib',
+                            xanthos_config_dir='/xanthos/configs', xanthos_pet_model_abbrev='trn',
+                            fldgen_emulator_dir='/fldgen/emulators', fldgen_tgav_file_dir='/fldgen/tgav',
+                            an2month_file_dir='/fldgen/an2month', seed_mode='unique', **kwargs)
+
+
+def test_archive_index_round_trip(tmp_path):
+    build(tmp_path / 'files')
+    build(tmp_path / 'archive', archive='configs.tar')
+
+    archive_file = str(tmp_path / 'archive' / 'configs.tar')
+    assert os.path.isfile(index_file(archive_file))
+
+    archive = ConfigArchive(archive_file)
+    assert len(archive) == len(MODELS) * len(SCENARIOS) * 6
+
+    for model, scenario, task in archive.keys():
+        file_name = f"{model}_{scenario}_{task}.cfg"
+
+        with open(tmp_path / 'files' / file_name) as get:
+            assert archive.read(model, scenario, task) == get.read()
+
+    # the index offsets agree with a plain tar reader
+    with tarfile.open(archive_file) as tar:
+        assert sorted(tar.getnames()) == sorted(f"{model}_{scenario}_{task}.cfg"
+                                                for model, scenario, task in archive.keys())
+
+
+def test_archive_extract(tmp_path):
+    build(tmp_path / 'archive', archive='configs.tar')
+
+    archive = ConfigArchive(str(tmp_path / 'archive' / 'configs.tar'))
+    (tmp_path / 'local').mkdir()
+    extracted = archive.extract('GFDL-ESM2M', 'rcp85', 5, str(tmp_path / 'local'))
+
+    with open(extracted) as get:
+        assert get.read() == archive.read('GFDL-ESM2M', 'rcp85', 5)
+
+    assert ('MIROC5', 'rcp26', 0) in archive
+    assert ('MIROC5', 'rcp26', 6) not in archive
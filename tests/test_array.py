@@ -0,0 +1,53 @@
+import os
+
+from cassie.build_job_scripts import build_job_scripts, iter_job_scripts
+from cassie.local import run_local
+
+
+def test_consolidated_array(tmp_path):
+    build_job_scripts(['M1', 'M2'], ['rcp26', 'rcp85'], str(tmp_path), '/cc', '/cl', '/main', 'acct',
+                      runs_per_config=2, consolidated=True, max_running_nodes=6, task_list_dir='/lists')
+
+    assert sorted(os.listdir(tmp_path)) == ['ensemble_lookup.txt', 'run_ensemble.sh']
+
+    script = (tmp_path / 'run_ensemble.sh').read_text()
+
+    assert '#SBATCH --array=0-7%2\n' in script
+    assert 'lookup="/lists/ensemble_lookup.txt"' in script
+
+    # one line per member in model, scenario, task order
+    with open(tmp_path / 'ensemble_lookup.txt') as get:
+        assert get.read().splitlines() == [f"{model} {scenario} {task}" for model in ('M1', 'M2')
+                                           for scenario in ('rcp26', 'rcp85') for task in range(2)]
+
+
+def test_consolidated_array_bundles_past_max_array_size():
+    scripts = dict(iter_job_scripts(['M1', 'M2'], ['rcp26', 'rcp85'], '/cc', '/cl', '/main', 'acct',
+                                    runs_per_config=2, consolidated=True, max_array_size=3))
+
+    # 8 members in bundles of 3
+    assert '#SBATCH --array=0-2\n' in scripts['run_ensemble.sh']
+    assert 'bundle_size=3\n' in scripts['run_ensemble.sh']
+
+
+def test_bundle_members_do_not_read_the_lookup(tmp_path):
+    log_dir = tmp_path / 'logs'
+    log_dir.mkdir()
+
+    # reads its stdin like OpenMPI forwarding it to rank 0
+    mpirun = tmp_path / 'mpirun'
+    mpirun.write_text(f"#!/bin/bash\ncat > /dev/null\necho \"${{@: -1}}\" >> {tmp_path}/ran.txt\n")
+    mpirun.chmod(0o755)
+
+    build_job_scripts(['M1', 'M2'], ['rcp26'], str(tmp_path), '/cc', '/cl', '/main', 'acct', runs_per_config=3,
+                      consolidated=True, bundle_size=4, bundle_concurrency=2, sbatch_logdir=str(log_dir),
+                      task_list_dir=str(tmp_path))
+
+    report = run_local([str(tmp_path / 'run_ensemble.sh')], cores=4, mpirun=str(mpirun))
+
+    assert [task['exit_code'] for task in report['tasks']] == [0, 0]
+
+    with open(tmp_path / 'ran.txt') as get:
+        ran = sorted(os.path.basename(line.strip()) for line in get)
+
+    assert ran == sorted(f"{model}_rcp26_{task}.cfg" for model in ('M1', 'M2') for task in range(3))
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from cassie.build_job_scripts import array_range, build_job_scripts
+from cassie.local import run_local
+
+
+def test_array_range():
+    assert array_range(5, 2, 3) == '0-2'
+    assert array_range(6, 2, 3) == '0-2'
+    assert array_range(5, 1, 3, max_running_nodes=7) == '0-4%2'
+    assert array_range(5, 1, 3, max_running_nodes=2) == '0-4%1'
+    assert array_range(None, 1, 3) == ''
+
+
+def test_bundled_scripts(tmp_path):
+    build_job_scripts(['M1', 'M2'], ['rcp26'], str(tmp_path), '/cc', '/cl', '/main', 'acct', runs_per_config=5,
+                      bundle_size=2, max_running_nodes=6, task_list_dir='/lists')
+
+    assert sorted(os.listdir(tmp_path)) == ['run_m1_rcp26.sh', 'run_m2_rcp26.sh',
+                                            'tasks_m1_rcp26.txt', 'tasks_m2_rcp26.txt']
+
+    script = (tmp_path / 'run_m2_rcp26.sh').read_text()
+
+    assert '#SBATCH --array=0-2%2\n' in script
+    assert 'tasklist="/lists/tasks_m2_rcp26.txt"' in script
+    assert (tmp_path / 'tasks_m2_rcp26.txt').read_text() == '0\n1\n2\n3\n4\n'
+
+
+def test_bundle_requires_runs_per_config(tmp_path):
+    with pytest.raises(ValueError, match='runs_per_config'):
+        build_job_scripts(['M1'], ['rcp26'], str(tmp_path), '/cc', '/cl', '/main', 'acct', bundle_size=2)
+
+
+def test_bundles_run_every_task(tmp_path):
+    log_dir = tmp_path / 'logs'
+    log_dir.mkdir()
+
+    mpirun = tmp_path / 'mpirun'
+    mpirun.write_text(f"#!/bin/bash\necho \"${{@: -1}}\" >> {tmp_path}/ran.txt\n")
+    mpirun.chmod(0o755)
+
+    build_job_scripts(['M1'], ['rcp26'], str(tmp_path), '/cc', '/cl', '/main', 'acct', runs_per_config=5,
+                      bundle_size=2, bundle_concurrency=2, sbatch_logdir=str(log_dir), task_list_dir=str(tmp_path))
+
+    report = run_local([str(tmp_path / 'run_m1_rcp26.sh')], cores=3, mpirun=str(mpirun))
+
+    assert [task['exit_code'] for task in report['tasks']] == [0, 0, 0]
+
+    with open(tmp_path / 'ran.txt') as get:
+        ran = sorted(os.path.basename(line.strip()) for line in get)
+
+    assert ran == [f"M1_rcp26_{task}.cfg" for task in range(5)]
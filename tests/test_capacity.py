@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from cassie.build_cassandra_configs import build_cassandra_configs
+from cassie.capacity import combine_capacity, digit_samples, disk_size, file_capacity, filesystem
+from cassie.overlay import OverlayRenderer, overlay_members
+
+MODELS = ['MIROC5', 'GFDL-ESM2M']
+SCENARIOS = ['rcp26', 'rcp85']
+
+# crosses the one, two, and three digit task numbers
+N = 120
+
+
+def build(output_dir, **kwargs):
+    os.makedirs(output_dir, exist_ok=True)
+
+    return build_cassandra_configs(MODELS, SCENARIOS, str(output_dir), N, '/gcam/ModelInterface.jar',
+                                   '/gcam/dbxml/lib', xanthos_config_dir='/xanthos/configs',
+                                   xanthos_pet_model_abbrev='trn', fldgen_emulator_dir='/fldgen/emulators',
+                                   fldgen_tgav_file_dir='/fldgen/tgav', an2month_file_dir='/fldgen/an2month',
+                                   **kwargs)
+
+
+def actual_size(output_dir):
+    block_size, _, _ = filesystem(str(output_dir))
+    sizes = [os.path.getsize(os.path.join(output_dir, name)) for name in os.listdir(output_dir)]
+
+    return len(sizes), sum(sizes), sum(disk_size(size, block_size) for size in sizes)
+
+
+def render(member):
+    model, scenario, task = member
+    return f"{model}_{scenario}_{task}.cfg", f"[Global]\nmodel = {model}\n[Run]\ntask = {task}\nscenario = {scenario}\n"
+
+
+def test_digit_samples():
+    assert digit_samples(250) == [(0, 10), (10, 90), (100, 150)]
+    assert digit_samples(1) == [(0, 1)]
+    assert digit_samples(0) == []
+
+
+@pytest.mark.parametrize('n_tasks', [1, 2, 10, 11, 120])
+def test_file_capacity_exact(n_tasks):
+    pairs = [(model, scenario) for scenario in SCENARIOS for model in MODELS]
+
+    plan = file_capacity(render, pairs, n_tasks, block_size=512)
+    assert plan['exact']
+    sizes = [len(render(pair + (task,))[1].encode()) for pair in pairs for task in range(n_tasks)]
+
+    assert plan['files'] == len(sizes)
+    assert plan['bytes'] == sum(sizes)
+    assert plan['disk_bytes'] == sum(disk_size(size, 512) for size in sizes)
+
+    plan = file_capacity(render, pairs, n_tasks, output='overlay', block_size=512)
+    overlay_render = OverlayRenderer(render, n_tasks)
+    sizes = [len(overlay_render(member)[1].encode()) for member in overlay_members(pairs)]
+
+    assert plan['files'] == len(sizes)
+    assert plan['bytes'] == sum(sizes)
+    assert plan['disk_bytes'] == sum(disk_size(size, 512) for size in sizes)
+
+
+@pytest.mark.parametrize('options', [{}, {'seed_mode': 'unique'}, {'overlay': True}, {'archive': 'configs.tar'}])
+def test_plan_matches_build(tmp_path, options):
+    plan = build(tmp_path, dry_run=True, **options)
+
+    # a dry run writes nothing
+    assert os.listdir(tmp_path) == []
+
+    build(tmp_path, **options)
+    files, n_bytes, disk_bytes = actual_size(tmp_path)
+
+    assert plan['files'] == files
+    assert plan['inodes'] == files + plan['directories']
+
+    # RNG seeds differ in length between runs, which the plan does not sample
+    assert not plan['exact']
+    assert plan['bytes'] == pytest.approx(n_bytes, rel=0.005)
+    assert plan['disk_bytes'] == pytest.approx(disk_bytes, rel=0.005)
+
+
+@pytest.mark.parametrize('options', [{}, {'overlay': True}])
+def test_exact_plan_matches_build(tmp_path, options):
+    # without Fldgen there are no RNG seeds
+    plan = build(tmp_path, dry_run=True, fldgen_build=False, **options)
+
+    build(tmp_path, fldgen_build=False, **options)
+    files, n_bytes, disk_bytes = actual_size(tmp_path)
+
+    assert plan['exact']
+    assert (plan['files'], plan['bytes'], plan['disk_bytes']) == (files, n_bytes, disk_bytes)
+
+
+def test_combine_capacity():
+    combined = combine_capacity([{'files': 2, 'bytes': 10, 'exact': True},
+                                 {'files': 3, 'bytes': 20, 'core_hours': None, 'exact': False}])
+
+    assert combined == {'files': 5, 'bytes': 30, 'exact': False}
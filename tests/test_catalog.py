@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from cassie import build_cassandra_configs
+from cassie.catalog import RunCatalog, read_catalog, write_catalog
+
+ROWS = [('MIROC5', 'rcp26', task, f"out_{task}", f"/configs/MIROC5_rcp26_{task}.cfg", task - 2, '', f"{task:08x}")
+        for task in range(4)] + [('GFDL-ESM2M', 'rcp85', 0, 'out_0', '/configs/GFDL-ESM2M_rcp85_0.cfg', 9, '', 'ff')]
+
+
+@pytest.mark.parametrize('extension', ['csv', 'npy'])
+def test_catalog_round_trip(tmp_path, extension):
+    catalog_file = str(tmp_path / f"runs.{extension}")
+
+    catalog = write_catalog(ROWS, catalog_file)
+
+    assert (read_catalog(catalog_file).data == catalog.data).all()
+    assert catalog.data.tolist() == ROWS
+
+
+def test_catalog_select():
+    catalog = RunCatalog.from_rows(ROWS)
+
+    assert len(catalog.select(model='MIROC5', tasks=range(1, 3))) == 2
+    assert catalog.select(scenario=['rcp85'])['model'].tolist() == ['GFDL-ESM2M']
+
+
+def test_builder_catalog(tmp_path):
+    build_cassandra_configs(['M1', 'M2'], ['rcp26'], str(tmp_path), 3, '/jar', '/dbxml',
+                            xanthos_config_dir='/xanthos', xanthos_pet_model_abbrev='trn',
+                            fldgen_emulator_dir='/emulators', fldgen_tgav_file_dir='/tgav',
+                            an2month_file_dir='/an2month', catalog='runs.csv')
+
+    catalog = read_catalog(str(tmp_path / 'runs.csv'))
+
+    assert len(catalog) == 6
+    assert catalog['model'].tolist() == ['M1'] * 3 + ['M2'] * 3
+    assert catalog['task'].tolist() == [0, 1, 2] * 2
+    assert all(os.path.isfile(config) for config in catalog['cassandra_config'])
@@ -0,0 +1,88 @@
+import filecmp
+import os
+
+import pytest
+
+from cassie.build_cassandra_configs import build_cassandra_configs
+from cassie.emit import EmitError, emit_files, map_chunks
+
+MEMBERS = [(model, 'rcp26', task) for model in ('M1', 'M2') for task in range(25)]
+
+
+def render(member):
+    model, scenario, task = member
+
+    if task == 13 and model == 'M2':
+        raise KeyError('no seed')
+
+    return f"{model}_{scenario}_{task}.cfg", f"[Global]\nmodel = {model}\ntask = {task}\n"
+
+
+def first(chunk):
+    return [member[2] for member in chunk]
+
+
+@pytest.mark.parametrize('workers, backend', [(None, 'thread'), (3, 'thread'), (3, 'process')])
+def test_map_chunks_keeps_member_order(workers, backend):
+    results = [task for chunk in map_chunks(first, MEMBERS, workers=workers, backend=backend) for task in chunk]
+
+    assert results == [task for _, _, task in MEMBERS]
+
+
+def test_map_chunks_unknown_backend():
+    with pytest.raises(ValueError, match='Unknown backend'):
+        list(map_chunks(first, MEMBERS, workers=2, backend='gpu'))
+
+
+@pytest.mark.parametrize('workers, backend', [(3, 'thread'), (3, 'process')])
+def test_backends_write_identical_files(tmp_path, workers, backend):
+    serial_dir, parallel_dir = tmp_path / 'serial', tmp_path / 'parallel'
+    serial_dir.mkdir()
+    parallel_dir.mkdir()
+
+    serial, _ = emit_files(render, MEMBERS, str(serial_dir), raise_errors=False)
+    parallel, _ = emit_files(render, MEMBERS, str(parallel_dir), workers=workers, backend=backend,
+                             raise_errors=False)
+
+    assert parallel == serial
+
+    names = sorted(os.listdir(serial_dir))
+    assert len(names) == len(MEMBERS) - 1
+    assert filecmp.cmpfiles(serial_dir, parallel_dir, names, shallow=False)[0] == names
+
+
+@pytest.mark.parametrize('workers, backend', [(None, 'thread'), (3, 'thread'), (3, 'process')])
+def test_failures_are_raised_after_the_other_files(tmp_path, workers, backend):
+    with pytest.raises(EmitError) as error:
+        emit_files(render, MEMBERS, str(tmp_path), workers=workers, backend=backend)
+
+    assert error.value.failures == [("('M2', 'rcp26', 13)", "KeyError: 'no seed'")]
+    assert '1 file(s) failed' in str(error.value)
+    assert len(os.listdir(tmp_path)) == len(MEMBERS) - 1
+
+
+def test_write_failures_name_the_file(tmp_path):
+    _, failures = emit_files(lambda member: ('missing/file.cfg', 'text'), [('M1', 'rcp26', 0)], str(tmp_path),
+                             raise_errors=False)
+
+    (path, message), = failures
+    assert path == str(tmp_path / 'missing' / 'file.cfg')
+    assert message.startswith('FileNotFoundError')
+
+
+@pytest.mark.parametrize('backend', ['thread', 'process'])
+def test_parallel_builder_output_is_identical(tmp_path, backend):
+    # 'crc' mode seeds depend on the full path, so both builds are written to the same directory
+    output_dir = tmp_path / 'configs'
+
+    for name, workers in (('serial', None), ('parallel', 4)):
+        output_dir.mkdir()
+        build_cassandra_configs(['M1', 'M2'], ['rcp26', 'rcp85'], str(output_dir), 10, '/jar', '/dbxml',
+                                xanthos_config_dir='/xanthos', xanthos_pet_model_abbrev='trn',
+                                fldgen_emulator_dir='/emulators', fldgen_tgav_file_dir='/tgav',
+                                an2month_file_dir='/an2month', workers=workers, backend=backend)
+        os.rename(output_dir, tmp_path / name)
+
+    names = sorted(os.listdir(tmp_path / 'serial'))
+    assert len(names) == 40
+    assert filecmp.cmpfiles(tmp_path / 'serial', tmp_path / 'parallel', names, shallow=False)[0] == names
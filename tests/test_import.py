@@ -0,0 +1,36 @@
+import json
+import subprocess
+import sys
+
+from cassie.benchmark import import_time
+
+# modules `import cassie` must not load; they are only needed once a builder is used
+HEAVY_MODULES = ('configobj', 'numpy', 'pkg_resources', 'cassie.build_cassandra_configs')
+
+# seconds `import cassie` may take in a fresh interpreter; it took over 0.1 s when it loaded every builder
+IMPORT_BUDGET = 0.02
+
+
+def imported_after(statement):
+    """Get the modules a fresh interpreter has loaded after running `statement`."""
+
+    code = f"import json, sys; {statement}; print(json.dumps(sorted(sys.modules)))"
+
+    return set(json.loads(subprocess.run([sys.executable, '-c', code], check=True, stdout=subprocess.PIPE,
+                                         universal_newlines=True).stdout))
+
+
+def test_import_is_lazy():
+    modules = imported_after('import cassie')
+
+    assert not modules.intersection(HEAVY_MODULES)
+
+
+def test_builder_loads_on_first_use():
+    modules = imported_after('import cassie; cassie.build_cassandra_configs')
+
+    assert {'cassie.build_cassandra_configs', 'configobj'} <= modules
+
+
+def test_import_time_budget():
+    assert import_time('cassie') < IMPORT_BUDGET
@@ -0,0 +1,55 @@
+import json
+
+from cassie import build_xanthos_configs
+from cassie.instrument import NULL_STAGE, Profile, collecting, count, stage
+
+
+def test_summary_and_folded():
+    profile = Profile()
+    profile.seconds = 2.0
+    profile.timings.add(('build',), 2.0)
+    profile.timings.add(('build', 'render'), 1.5, calls=3)
+    profile.timings.add(('build', 'render', 'seed'), 0.5, calls=3)
+    profile.timings.count('files', 4)
+
+    summary = profile.summary()
+
+    assert summary['counters'] == {'files': 4}
+    assert summary['files_per_second'] == 2.0
+    assert summary['stages']['build;render'] == {'seconds': 1.5, 'self_seconds': 1.0, 'calls': 3}
+    assert summary['stages']['build']['self_seconds'] == 0.5
+
+    assert profile.folded() == 'build 500000\nbuild;render 1000000\nbuild;render;seed 500000\n'
+
+
+def test_stages_only_record_when_on():
+    assert stage('render') is NULL_STAGE
+
+    with collecting() as timings:
+        with stage('render'):
+            with stage('seed'):
+                count('files')
+
+    assert sorted(timings.stages) == [('render',), ('render', 'seed')]
+    assert timings.counters == {'files': 1}
+    assert stage('render') is NULL_STAGE
+
+
+def test_builder_profile(tmp_path):
+    done = []
+
+    build_xanthos_configs(['M1'], ['rcp26', 'rcp85'], str(tmp_path), 3, '/xanthos', 'out', '/thresholds',
+                          profile=str(tmp_path / 'timing.json'), progress=lambda n, _: done.append(n))
+
+    with open(tmp_path / 'timing.json') as get:
+        summary = json.load(get)
+
+    assert summary['counters']['files'] == 6
+    assert summary['stages']['build_xanthos_configs;render']['calls'] == 6
+    assert done[-1] == 6
+
+    build_xanthos_configs(['M1'], ['rcp26'], str(tmp_path), 3, '/xanthos', 'out', '/thresholds',
+                          profile=str(tmp_path / 'timing.folded'))
+
+    with open(tmp_path / 'timing.folded') as get:
+        assert all(line.startswith('build_xanthos_configs') for line in get)
@@ -0,0 +1,66 @@
+import os
+import types
+
+import cassie
+from cassie.build_cassandra_configs import BuildCassandraConfigs
+
+MODELS = ['M1', 'M2']
+SCENARIOS = ['rcp26', 'rcp85']
+
+
+def read_files(output_dir):
+    files = {}
+
+    for root, _, names in os.walk(output_dir):
+        for name in names:
+            with open(os.path.join(root, name)) as get:
+                files[os.path.relpath(os.path.join(root, name), output_dir)] = get.read()
+
+    return files
+
+
+def test_iter_xanthos_configs(tmp_path):
+    args = (MODELS, SCENARIOS, 3, '/xanthos', 'output/trn_abcd', '/thresholds')
+
+    configs = cassie.iter_xanthos_configs(*args, pet_model_abbrev='trn', fanout=2)
+
+    assert isinstance(configs, types.GeneratorType)
+    assert os.listdir(tmp_path) == []
+
+    cassie.build_xanthos_configs(MODELS, SCENARIOS, str(tmp_path), *args[2:], pet_model_abbrev='trn', fanout=2)
+
+    configs = list(configs)
+    assert len(configs) == 12
+    assert dict(configs) == read_files(tmp_path)
+
+
+def test_iter_configs(tmp_path):
+    builder = BuildCassandraConfigs(MODELS, SCENARIOS, str(tmp_path), 3, '/jar', '/dbxml',
+                                    xanthos_config_dir='/xanthos', xanthos_pet_model_abbrev='trn',
+                                    fldgen_emulator_dir='/emulators', fldgen_tgav_file_dir='/tgav',
+                                    an2month_file_dir='/an2month')
+
+    configs = builder.iter_configs()
+
+    # the first file is rendered without rendering the others
+    file_name, _ = next(configs)
+    assert file_name == 'M1_rcp26_0.cfg'
+    assert os.listdir(tmp_path) == []
+
+    builder.build_config()
+
+    configs = [(file_name, _)] + list(configs)
+    assert [name for name, _ in configs] == [f"{model}_{scenario}_{i}.cfg" for scenario in SCENARIOS
+                                             for model in MODELS for i in range(3)]
+    assert dict(configs) == read_files(tmp_path)
+
+
+def test_iter_job_scripts(tmp_path):
+    kwargs = dict(runs_per_config=5, bundle_size=2, task_list_dir=str(tmp_path))
+
+    scripts = dict(cassie.iter_job_scripts(MODELS, SCENARIOS, '/configs', '/logs', '/main.py', 'acct', **kwargs))
+
+    cassie.build_job_scripts(MODELS, SCENARIOS, str(tmp_path), '/configs', '/logs', '/main.py', 'acct', **kwargs)
+
+    assert scripts == read_files(tmp_path)
+    assert scripts['tasks_m1_rcp26.txt'] == '0\n1\n2\n3\n4\n'
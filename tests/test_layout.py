@@ -0,0 +1,70 @@
+import os
+import subprocess
+
+import pytest
+
+from cassie import build_cassandra_configs, build_xanthos_configs
+from cassie.layout import check_fanout, count_layout_dirs, layout_expr, layout_name, make_layout
+
+
+def list_tree(output_dir):
+    return sorted(os.path.relpath(os.path.join(root, name), output_dir)
+                  for root, dirs, files in os.walk(output_dir) for name in dirs + files)
+
+
+def test_layout_name():
+    assert layout_name('M1_rcp26_7.cfg', 'M1', 'rcp26', 7) == 'M1_rcp26_7.cfg'
+    assert layout_name('M1_rcp26_7.cfg', 'M1', 'rcp26', 7, fanout=4) == 'M1/rcp26/shard-001/M1_rcp26_7.cfg'
+    assert layout_name('M1_rcp26_1000.cfg', 'M1', 'rcp26', 1000, fanout=1) == 'M1/rcp26/shard-1000/M1_rcp26_1000.cfg'
+
+
+@pytest.mark.parametrize('n_tasks, fanout', [(1, 1), (5, 2), (8, 4), (3, 10)])
+def test_count_layout_dirs(tmp_path, n_tasks, fanout):
+    make_layout(str(tmp_path), ['M1', 'M2'], ['rcp26', 'rcp45', 'rcp85'], n_tasks, fanout)
+
+    assert count_layout_dirs(2, 3, n_tasks, fanout) == len(list_tree(tmp_path))
+
+
+def test_flat_layout(tmp_path):
+    make_layout(str(tmp_path), ['M1'], ['rcp26'], 5)
+
+    assert os.listdir(tmp_path) == []
+    assert count_layout_dirs(1, 1, 5) == 0
+    assert layout_expr('M1', 'rcp26') == ''
+
+
+@pytest.mark.parametrize('fanout', [0, -1, 2.0, '2'])
+def test_check_fanout(fanout):
+    with pytest.raises(ValueError, match='`fanout` must be a positive integer'):
+        check_fanout(fanout)
+
+
+def test_layout_expr():
+    expr = layout_expr('${model}', '${scenario}', fanout=4)
+
+    result = subprocess.run(['bash', '-c', f'model=M1; scenario=rcp26; tid=9; echo "{expr}"'], capture_output=True,
+                            text=True, check=True)
+
+    assert result.stdout == 'M1/rcp26/shard-002/\n'
+
+
+def test_builder_fanout(tmp_path):
+    xanthos_dir, cassandra_dir = tmp_path / 'xanthos', tmp_path / 'cassandra'
+    xanthos_dir.mkdir()
+    cassandra_dir.mkdir()
+
+    build_xanthos_configs(['M1'], ['rcp26'], str(xanthos_dir), 3, '/xanthos', 'out', '/thresholds',
+                          pet_model_abbrev='trn', fanout=2)
+    build_cassandra_configs(['M1'], ['rcp26'], str(cassandra_dir), 3, '/jar', '/dbxml',
+                            xanthos_config_dir=str(xanthos_dir), xanthos_pet_model_abbrev='trn', fanout=2,
+                            fldgen_emulator_dir='/emulators', fldgen_tgav_file_dir='/tgav',
+                            an2month_file_dir='/an2month')
+
+    assert list_tree(xanthos_dir) == ['M1', 'M1/rcp26', 'M1/rcp26/shard-000', 'M1/rcp26/shard-000/trn_M1_rcp26_0.ini',
+                                      'M1/rcp26/shard-000/trn_M1_rcp26_1.ini', 'M1/rcp26/shard-001',
+                                      'M1/rcp26/shard-001/trn_M1_rcp26_2.ini']
+
+    # each Cassandra file points at the Xanthos file in the same shard
+    config = (cassandra_dir / 'M1' / 'rcp26' / 'shard-001' / 'M1_rcp26_2.cfg').read_text()
+
+    assert f"config_file = {xanthos_dir}/M1/rcp26/shard-001/trn_M1_rcp26_2.ini\n" in config
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from cassie.local import count_array, parse_array, run_local
+
+
+@pytest.mark.parametrize('array_str, task_ids, throttle', [
+    ('0', [0], None),
+    ('0-3', [0, 1, 2, 3], None),
+    ('0-99%10', list(range(100)), 10),
+    ('1,3,5-7', [1, 3, 5, 6, 7], None),
+    ('0-10:5', [0, 5, 10], None),
+])
+def test_parse_array(array_str, task_ids, throttle):
+    assert parse_array(array_str) == (task_ids, throttle)
+    assert count_array(array_str) == len(task_ids)
+
+
+def test_count_array_large():
+    assert count_array('0-7999999%100') == 8000000
+
+
+def write_script(path, body, array='0-3'):
+    with open(path, 'w') as out:
+        out.write('#!/bin/bash\n'
+                  f"#SBATCH --array={array}\n"
+                  f"#SBATCH --output={os.path.dirname(path)}/%A.%a.out\n"
+                  f"{body}\n")
+
+
+def test_run_local_job_ids(tmp_path):
+    script = str(tmp_path / 'ids.sh')
+    write_script(script, 'echo $SLURM_JOB_ID $SLURM_ARRAY_JOB_ID $SLURM_ARRAY_TASK_ID')
+
+    report = run_local([script], cores=4, job_id=100)
+
+    ids = []
+    for task in report['tasks']:
+        with open(task['log_file']) as get:
+            job_id, array_job_id, task_id = get.read().split()
+        assert task['log_file'] == str(tmp_path / f"100.{task_id}.out")
+        assert array_job_id == '100'
+        ids.append(job_id)
+
+    # each task has its own job id, distinct from the array job id
+    assert len(set(ids)) == 4
+    assert '100' not in ids
+
+
+def test_run_local_exit_codes(tmp_path):
+    script = str(tmp_path / 'fail.sh')
+    write_script(script, 'exit $((SLURM_ARRAY_TASK_ID % 2))')
+
+    report = run_local([script], cores=2, job_id=1)
+
+    assert [task['exit_code'] for task in report['tasks']] == [0, 1, 0, 1]
+
+
+def test_run_local_throttle_does_not_starve_other_scripts(tmp_path):
+    throttled = str(tmp_path / 'throttled.sh')
+    write_script(throttled, 'sleep 0.5', array='0-3%1')
+
+    other = str(tmp_path / 'other.sh')
+    write_script(other, 'sleep 0.5')
+
+    report = run_local([throttled, other], cores=5, job_id=1)
+
+    first_end = min(task['end'] for task in report['tasks'] if task['script'] == throttled)
+
+    # the throttled tasks waiting for their turn leave the other cores to the other script
+    assert all(task['start'] < first_end for task in report['tasks'] if task['script'] == other)
+    assert report['peak_concurrency'] == 5
+    assert [task['task_id'] for task in report['tasks']] == [0, 1, 2, 3] * 2
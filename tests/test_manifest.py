@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from cassie.manifest import emit_incremental, read_manifest
+
+
+def render(member):
+    model, task = member
+    return f"{model}_{task}.cfg", f"model = {model}\ntask = {task}\n"
+
+
+def emit(tmp_path, n_tasks, render=render, stale='report'):
+    members = [(model, task) for model in ('M1', 'M2') for task in range(n_tasks)]
+
+    return emit_incremental(render, members, str(tmp_path), str(tmp_path / 'manifest.json'),
+                            {'n_tasks': n_tasks}, stale=stale)
+
+
+def test_rebuild_writes_only_changed_files(tmp_path):
+    _, summary = emit(tmp_path, 3)
+    assert summary == {'written': 6, 'unchanged': 0, 'stale': []}
+
+    _, summary = emit(tmp_path, 3)
+    assert summary == {'written': 0, 'unchanged': 6, 'stale': []}
+
+    def changed(member):
+        file_name, text = render(member)
+        return file_name, text + 'changed\n' if member == ('M2', 1) else text
+
+    _, summary = emit(tmp_path, 3, render=changed)
+    assert summary['written'] == 1
+
+    with open(tmp_path / 'M2_1.cfg') as get:
+        assert get.read().endswith('changed\n')
+
+
+def test_shrinking_reports_stale_files(tmp_path):
+    emit(tmp_path, 3)
+
+    with pytest.warns(UserWarning, match='2 file'):
+        _, summary = emit(tmp_path, 2)
+
+    assert summary['stale'] == ['M1_2.cfg', 'M2_2.cfg']
+    assert read_manifest(str(tmp_path / 'manifest.json'))['stale'] == ['M1_2.cfg', 'M2_2.cfg']
+    assert os.path.isfile(tmp_path / 'M1_2.cfg')
+
+    # still stale on the next run, until removed
+    with pytest.warns(UserWarning):
+        emit(tmp_path, 2)
+
+    _, summary = emit(tmp_path, 2, stale='remove')
+
+    assert summary['stale'] == []
+    assert not os.path.exists(tmp_path / 'M1_2.cfg')
+    assert not os.path.exists(tmp_path / 'M2_2.cfg')
+    assert os.path.isfile(tmp_path / 'M2_1.cfg')
@@ -0,0 +1,49 @@
+import os
+
+from cassie.build_cassandra_configs import build_cassandra_configs
+from cassie.overlay import materialize
+
+MODELS = ['MIROC5', 'GFDL-ESM2M']
+SCENARIOS = ['rcp26', 'rcp85']
+N = 12
+
+
+def build(output_dir, **kwargs):
+    os.makedirs(output_dir)
+
+    build_cassandra_configs(MODELS, SCENARIOS, str(output_dir), N, '/gcam/ModelInterface.jar', '/gcam/dbxml/lib',
+                            xanthos_config_dir='/xanthos/configs', xanthos_pet_model_abbrev='trn',
+                            fldgen_emulator_dir='/fldgen/emulators', fldgen_tgav_file_dir='/fldgen/tgav',
+                            an2month_file_dir='/fldgen/an2month', **kwargs)
+
+
+def test_materialize_matches_plain_build(tmp_path):
+    # 'crc' mode seeds depend on the full path, so both builds are written to the same directory
+    output_dir = tmp_path / 'configs'
+
+    build(output_dir)
+    os.rename(output_dir, tmp_path / 'plain')
+
+    build(output_dir, overlay=True)
+
+    # one base and one overlay file per (model, scenario)
+    assert len(os.listdir(output_dir)) == 2 * len(MODELS) * len(SCENARIOS)
+
+    for model in MODELS:
+        for scenario in SCENARIOS:
+            for task in range(N):
+                file_name = f"{model}_{scenario}_{task}.cfg"
+
+                local_file = materialize(str(output_dir / file_name), str(tmp_path / 'local'))
+                assert local_file == str(tmp_path / 'local' / file_name)
+
+                with open(local_file) as get, open(tmp_path / 'plain' / file_name) as expected:
+                    assert get.read() == expected.read()
+
+
+def test_materialize_existing_file(tmp_path):
+    build(tmp_path / 'configs')
+
+    config_file = str(tmp_path / 'configs' / 'MIROC5_rcp26_0.cfg')
+    assert materialize(config_file, str(tmp_path / 'local')) == config_file
+    assert not os.path.exists(tmp_path / 'local')
@@ -0,0 +1,103 @@
+import json
+import os
+
+import pytest
+
+from cassie import build_cassandra_configs, build_job_scripts, build_xanthos_configs
+from cassie.cli import main
+from cassie.pipeline import Study, build_study
+
+MODELS = ['M1', 'M2']
+SCENARIOS = ['rcp26']
+
+
+def make_spec(output_dir, **kwargs):
+    spec = {'models': MODELS,
+            'scenarios': SCENARIOS,
+            'runs': 3,
+            'output_dir': str(output_dir),
+            'pet_model_abbrev': 'trn',
+            'xanthos': {'xanthos_root_dir': '/xanthos', 'xanthos_output_dir': 'out',
+                        'drought_thresholds_dir': '/thresholds'},
+            'cassandra': {'global_model_interface_jar': '/jar', 'global_dbxml_lib': '/dbxml',
+                          'fldgen_emulator_dir': '/emulators', 'fldgen_tgav_file_dir': '/tgav',
+                          'an2month_file_dir': '/an2month'},
+            'jobs': {'cassandra_log_dir': '/logs', 'cassandra_main_script': '/main.py', 'sbatch_account': 'acct'}}
+    spec.update(kwargs)
+
+    return spec
+
+
+def write_spec(path, spec):
+    with open(path, 'w') as out:
+        json.dump(spec, out)
+
+    return str(path)
+
+
+def read_files(output_dir):
+    files = {}
+
+    for root, _, names in os.walk(output_dir):
+        for name in names:
+            with open(os.path.join(root, name)) as get:
+                files[os.path.relpath(os.path.join(root, name), output_dir)] = get.read()
+
+    return files
+
+
+def test_study_matches_the_builders(tmp_path):
+    study_dir = tmp_path / 'study'
+
+    records = build_study(write_spec(tmp_path / 'study.json', make_spec(study_dir)))
+
+    assert len(records) == 14
+    study = read_files(study_dir)
+
+    # build each kind of file into the same directories, which the RNG seeds depend on
+    os.rename(study_dir, tmp_path / 'built')
+
+    for name in ('xanthos', 'cassandra', 'jobs'):
+        os.makedirs(study_dir / name)
+
+    build_xanthos_configs(MODELS, SCENARIOS, str(study_dir / 'xanthos'), 3, '/xanthos', 'out', '/thresholds',
+                          pet_model_abbrev='trn')
+    build_cassandra_configs(MODELS, SCENARIOS, str(study_dir / 'cassandra'), 3, '/jar', '/dbxml',
+                            xanthos_config_dir=str(study_dir / 'xanthos'), xanthos_pet_model_abbrev='trn',
+                            cassandra_log_dir='/logs', fldgen_emulator_dir='/emulators',
+                            fldgen_tgav_file_dir='/tgav', an2month_file_dir='/an2month')
+    build_job_scripts(MODELS, SCENARIOS, str(study_dir / 'jobs'), str(study_dir / 'cassandra'), '/logs', '/main.py',
+                      'acct', runs_per_config=3, task_list_dir=str(study_dir / 'jobs'))
+
+    assert study == read_files(study_dir)
+
+
+def test_study_rejects_derived_keys(tmp_path):
+    spec = make_spec(tmp_path)
+    spec['jobs']['cassandra_config_dir'] = '/elsewhere'
+
+    with pytest.raises(ValueError, match='`cassandra_config_dir` is set by the study'):
+        Study(spec)
+
+    with pytest.raises(ValueError, match='Unknown study spec keys:  model'):
+        Study(make_spec(tmp_path, model='M1'))
+
+
+def test_cli_build(tmp_path, capsys):
+    spec_file = write_spec(tmp_path / 'study.json', make_spec(tmp_path / 'study'))
+
+    assert main(['build', spec_file, '--catalog', 'runs.csv']) == 0
+    assert '14 file(s) written' in capsys.readouterr().err
+    assert os.path.isfile(tmp_path / 'study' / 'runs.csv')
+
+    # the plan is printed and the exit status is 1 when it does not fit the quota
+    with pytest.warns(UserWarning, match='exceeds bytes_limit'):
+        assert main(['build', spec_file, '--dry-run', '--quota-bytes', '1']) == 1
+
+    assert json.loads(capsys.readouterr().out)['total']['quota']['fits'] is False
+
+
+def test_cli_usage(capsys):
+    assert main([]) == 2
+    assert main(['unknown']) == 2
+    assert "unknown command 'unknown'" in capsys.readouterr().err
@@ -0,0 +1,52 @@
+import pytest
+
+from cassie.resources import resource_plan, split_cores
+
+
+def test_split_cores():
+    assert split_cores(29, [10.0, 2.0]) == [24, 5]
+    assert split_cores(2, [10.0, 2.0]) == [1, 1]
+    assert split_cores(6, [0.0, 0.0]) == [3, 3]
+    assert split_cores(5, []) == []
+
+
+@pytest.mark.parametrize('cores_per_node, nodes, concurrency', [
+    (32, 3, 1), (32, 1, 1), (4, 3, 1), (32, 3, 3), (8, 2, 2), (2, 1, 1), (64, 4, 5),
+])
+def test_resource_plan_fits(cores_per_node, nodes, concurrency):
+    plan = resource_plan(cores_per_node, nodes=nodes, concurrency=concurrency)
+
+    assert plan['nodes'] <= nodes
+    assert plan['ntasks'] == plan['ranks'] * concurrency
+    assert plan['ntasks'] * plan['cpus_per_task'] <= plan['nodes'] * cores_per_node
+
+    # idle cores are the cores of the nodes that no rank uses
+    used = concurrency * sum(plan['rank_cores'])
+    assert used <= plan['ntasks'] * plan['cpus_per_task']
+    assert plan['idle_cores'] == plan['nodes'] * cores_per_node - used
+
+
+def test_coordinator_gets_one_core():
+    plan = resource_plan(32, nodes=3)
+
+    assert plan['assignment'] == [[], ['fldgen'], ['xanthos']]
+    assert plan['rank_cores'][0] == 1
+
+    # Fldgen and Xanthos share the node by weight instead of each holding a node
+    fldgen, xanthos = plan['rank_cores'][1:]
+    assert fldgen > xanthos
+    assert plan['xanthos_jobs'] == xanthos
+    assert plan['idle_cores'] < 32
+
+
+def test_shared_rank_splits_by_weight():
+    plan = resource_plan(8, nodes=1, weights={'xanthos': 2.0, 'fldgen': 10.0}, concurrency=4)
+
+    assert plan['ranks'] == 2
+    assert plan['assignment'] == [[], ['fldgen', 'xanthos']]
+    assert plan['xanthos_jobs'] <= plan['rank_cores'][1]
+
+
+def test_resource_plan_too_small():
+    with pytest.raises(ValueError):
+        resource_plan(2, nodes=1, concurrency=3)
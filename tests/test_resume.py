@@ -0,0 +1,51 @@
+import pytest
+
+from cassie.build_job_scripts import build_job_scripts
+from cassie.resume import compact_array, resume_jobs
+
+
+def test_compact_array():
+    assert compact_array([7, 0, 1, 2, 3]) == '0-3,7'
+    assert compact_array([5], 10) == '5%10'
+
+
+def states(failed, runs=8):
+    return {('M1', 'rcp26', i): 'failed' if i in failed else 'done' for i in range(runs)}
+
+
+def test_resume_unbundled(tmp_path):
+    build_job_scripts(['M1'], ['rcp26'], str(tmp_path), '/cc', '/cl', '/main', 'acct', runs_per_config=8)
+
+    assert resume_jobs(states({1, 2, 6}), str(tmp_path)) == [f"sbatch --array=1-2,6 {tmp_path}/run_m1_rcp26.sh"]
+
+
+def test_resume_bundled(tmp_path):
+    build_job_scripts(['M1'], ['rcp26'], str(tmp_path), '/cc', '/cl', '/main', 'acct', runs_per_config=8,
+                      bundle_size=2, task_list_dir=str(tmp_path))
+
+    script_file = tmp_path / 'run_m1_rcp26.sh'
+    task_list = tmp_path / 'tasks_m1_rcp26.txt'
+
+    # without write, the bundles of the full list holding a failed member: [0, 1], [6, 7]
+    assert resume_jobs(states({1, 6, 7}), str(tmp_path)) == [f"sbatch --array=0,3 {script_file}"]
+    assert task_list.read_text().split() == [str(i) for i in range(8)]
+
+    # with write, the list only holds the failed members
+    assert resume_jobs(states({1, 6, 7}), str(tmp_path), write=True) == [f"sbatch --array=0-1 {script_file}"]
+    assert task_list.read_text().split() == ['1', '6', '7']
+
+    # the rewritten list is used as is; 7 is the first member of bundle 1
+    assert resume_jobs(states({7}), str(tmp_path)) == [f"sbatch --array=1 {script_file}"]
+
+    with pytest.raises(ValueError, match='not in'):
+        resume_jobs(states({2}), str(tmp_path))
+
+
+def test_resume_consolidated(tmp_path):
+    build_job_scripts(['M1', 'M2'], ['rcp26'], str(tmp_path), '/cc', '/cl', '/main', 'acct', runs_per_config=4,
+                      bundle_size=3, consolidated=True, task_list_dir=str(tmp_path))
+
+    # lookup lines 3 and 7 are in bundles 1 and 2
+    members = {(model, 'rcp26', i): 'failed' if i == 3 else 'done' for model in ('M1', 'M2') for i in range(4)}
+
+    assert resume_jobs(members, str(tmp_path)) == [f"sbatch --array=1-2 {tmp_path}/run_ensemble.sh"]
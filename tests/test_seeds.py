@@ -0,0 +1,76 @@
+import pytest
+
+from cassie.build_cassandra_configs import BuildCassandraConfigs
+from cassie.seeds import (SEED_BLOCK, make_seed_table, read_seed_table, seed_collisions, unique_seed_table,
+                          unique_seeds, write_seed_table)
+
+MODELS = ['MIROC5', 'GFDL-ESM2M', 'HadGEM2-ES']
+SCENARIOS = ['rcp26', 'rcp85']
+
+
+def builder(output_dir, runs_per_config, **kwargs):
+    return BuildCassandraConfigs(MODELS, SCENARIOS, str(output_dir), runs_per_config, '/gcam/ModelInterface.jar',
+                                 '/gcam/dbxml/lib', xanthos_config_dir='/xanthos/configs',
+                                 xanthos_pet_model_abbrev='trn', fldgen_emulator_dir='/fldgen/emulators',
+                                 fldgen_tgav_file_dir='/fldgen/tgav', an2month_file_dir='/fldgen/an2month',
+                                 **kwargs)
+
+
+def test_unique_seeds_subset():
+    seeds = unique_seeds(6, 100, seed=3)
+
+    assert (unique_seeds(6, 100, seed=3, pairs=[4], tasks=range(10, 20)) == seeds[4:5, 10:20]).all()
+
+
+def test_unique_seeds_capacity():
+    with pytest.raises(ValueError):
+        unique_seeds(2, 2 ** 31 + 1, pairs=[0], tasks=[0])
+
+
+def test_builder_seeds_match_table(tmp_path):
+    runs_per_config = SEED_BLOCK + 10
+    build = builder(tmp_path, runs_per_config, seed_mode='unique', seed=11)
+
+    table = unique_seed_table(MODELS, SCENARIOS, runs_per_config, seed=11)
+
+    # every run of the first and last block of each combination, read back in task order
+    for row in table[(table['task'] < 10) | (table['task'] >= SEED_BLOCK - 10)]:
+        assert build.rng_seed(row['model'], row['scenario'], int(row['task']), '') == row['rng_seed']
+
+
+def test_builder_capacity(tmp_path):
+    build = builder(tmp_path, 2 ** 32, seed_mode='unique')
+
+    with pytest.raises(ValueError):
+        build.rng_seed(MODELS[0], SCENARIOS[0], 0, '')
+
+
+def test_unique_seeds_do_not_collide():
+    table = unique_seed_table([f"MODEL-{i}" for i in range(8)], SCENARIOS, 100000, seed=5)
+
+    assert len(table) == 1600000
+    assert seed_collisions(table) == 0
+
+
+def test_seeds_depend_on_study_seed():
+    assert (unique_seeds(4, 1000, seed=1) != unique_seeds(4, 1000, seed=2)).any()
+
+
+@pytest.mark.parametrize('extension', ['csv', 'npy'])
+@pytest.mark.parametrize('seed_mode', ['crc', 'unique'])
+def test_seed_table_round_trip(tmp_path, extension, seed_mode):
+    table = builder(tmp_path, 5, seed_mode=seed_mode).ensemble_seeds()
+    table_file = str(tmp_path / f"seeds.{extension}")
+
+    write_seed_table(table, table_file)
+
+    assert (read_seed_table(table_file) == table).all()
+    assert table.dtype.names == ('model', 'scenario', 'task', 'rng_seed')
+
+
+def test_make_seed_table():
+    table = make_seed_table([('MIROC5', 'rcp85', 0, -5), ('A', 'rcp26', 1, 7)])
+
+    assert table['model'].tolist() == ['MIROC5', 'A']
+    assert table['rng_seed'].tolist() == [-5, 7]
+    assert len(make_seed_table([])) == 0
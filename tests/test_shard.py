@@ -0,0 +1,64 @@
+import filecmp
+import json
+import os
+
+import pytest
+
+from cassie.build_cassandra_configs import build_cassandra_configs
+from cassie.catalog import read_catalog
+from cassie.shard import merge_catalogs, merge_manifests, shard_name, shard_range
+
+MODELS = ['MIROC5', 'GFDL-ESM2M', 'HadGEM2-ES-LONGER-NAME']
+SCENARIOS = ['rcp26', 'rcp85']
+
+
+def build(output_dir, **kwargs):
+    build_cassandra_configs(MODELS, SCENARIOS, str(output_dir), 7, '/gcam/ModelInterface.jar', '/gcam/dbxml/lib',
+                            xanthos_config_dir='/xanthos/configs', xanthos_pet_model_abbrev='trn',
+                            fldgen_emulator_dir='/fldgen/emulators', fldgen_tgav_file_dir='/fldgen/tgav',
+                            an2month_file_dir='/fldgen/an2month', manifest='manifest.json', catalog='runs.npy',
+                            **kwargs)
+
+
+@pytest.mark.parametrize('n_members, num_shards', [(42, 4), (5, 8), (100, 1)])
+def test_shard_range_covers_members(n_members, num_shards):
+    ranges = [shard_range(n_members, index, num_shards) for index in range(num_shards)]
+
+    assert ranges[0][0] == 0 and ranges[-1][1] == n_members
+    assert all(stop == start for (_, stop), (start, _) in zip(ranges, ranges[1:]))
+    assert max(stop - start for start, stop in ranges) - min(stop - start for start, stop in ranges) <= 1
+
+
+def test_shard_name():
+    assert shard_name('runs.npy', 3, 16) == 'runs.shard-03-of-16.npy'
+    assert shard_name('runs.npy', 0, 1) == 'runs.npy'
+
+
+def test_sharded_build_matches_serial(tmp_path):
+    output_dir = tmp_path / 'configs'
+    output_dir.mkdir()
+    build(output_dir)
+    os.rename(output_dir, tmp_path / 'serial')
+
+    # same output directory so that 'crc' mode seeds, which depend on the full path, are the same
+    output_dir.mkdir()
+    for shard_index in range(4):
+        build(output_dir, shard_index=shard_index, num_shards=4)
+
+    merge_manifests(str(output_dir), 'manifest.json', 4)
+    merged = merge_catalogs(str(output_dir), 'runs.npy', 4)
+
+    configs = sorted(name for name in os.listdir(tmp_path / 'serial') if name.endswith('.cfg'))
+    assert len(configs) == len(MODELS) * len(SCENARIOS) * 7
+
+    _, mismatch, errors = filecmp.cmpfiles(tmp_path / 'serial', output_dir, configs, shallow=False)
+    assert mismatch == [] and errors == []
+
+    with open(tmp_path / 'serial' / 'manifest.json') as get:
+        serial_manifest = json.load(get)
+    with open(output_dir / 'manifest.json') as get:
+        assert json.load(get) == serial_manifest
+
+    serial_catalog = read_catalog(str(tmp_path / 'serial' / 'runs.npy'))
+    assert merged.data.dtype == serial_catalog.data.dtype
+    assert (merged.data == serial_catalog.data).all()
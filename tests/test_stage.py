@@ -0,0 +1,72 @@
+import os
+import sys
+
+from cassie.build_job_scripts import build_job_scripts
+from cassie.local import run_local
+from cassie.stage import stage_in, stage_inputs, stage_out
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_stage_out_waits_for_every_owner(tmp_path):
+    shared = tmp_path / 'shared.rds'
+    shared.write_text('emulator')
+    stage_dir = str(tmp_path / 'stage')
+
+    local_file, = stage_in([str(shared)], stage_dir, 'job-1')
+    stage_in([str(shared)], stage_dir, 'job-2')
+
+    assert not stage_out(stage_dir, 'job-1')
+    assert os.path.isfile(local_file)
+
+    assert stage_out(stage_dir, 'job-2')
+    assert not os.path.exists(local_file)
+
+
+def test_default_scripts_do_not_stage(tmp_path):
+    build_job_scripts(['M1'], ['rcp26'], str(tmp_path), '/cc', '/cl', '/main', 'acct')
+
+    with open(tmp_path / 'run_m1_rcp26.sh') as get:
+        assert 'stage' not in get.read()
+
+
+def test_concurrent_staged_tasks(tmp_path):
+    emulator_dir = tmp_path / 'emulators'
+    emulator_dir.mkdir()
+    (emulator_dir / 'fldgen-M1.rds').write_text('emulator')
+
+    stage_dir = tmp_path / 'stage'
+    log_dir = tmp_path / 'logs'
+    log_dir.mkdir()
+
+    # stands in for Cassandra; fails if the staged input is gone while it runs
+    main = tmp_path / 'main.sh'
+    main.write_text(f"#!/bin/bash\nsleep 0.2\ntest -f {stage_dir}/fldgen-M1.rds\n")
+    main.chmod(0o755)
+
+    build_job_scripts(['M1'], ['rcp26'], str(tmp_path), '/cc', '/cl', str(main), 'acct', sbatch_ntasks=1,
+                      sbatch_logdir=str(log_dir), stage_dir=str(stage_dir), fldgen_emulator_dir=str(emulator_dir))
+
+    env = {'PATH': os.path.dirname(sys.executable) + os.pathsep + os.environ.get('PATH', ''),
+           'PYTHONPATH': ROOT}
+
+    report = run_local([str(tmp_path / 'run_m1_rcp26.sh')], cores=4, array='0-7', mpirun='shim', env=env)
+
+    assert [task['exit_code'] for task in report['tasks']] == [0] * 8
+    assert not (stage_dir / 'fldgen-M1.rds').exists()
+
+
+def test_stage_inputs_follow_the_xanthos_template(tmp_path):
+    inputs = stage_inputs(['M1'], ['rcp26'], drought_thresholds_dir='/thresholds')
+    assert inputs[('M1', 'rcp26')] == ['/thresholds/drought_thresholds_M1.npy']
+
+    template = tmp_path / 'xanthos.ini'
+    with open(os.path.join(ROOT, 'cassie', 'data', 'xanthos_thorn_abcd_drought_template.ini')) as get:
+        template.write_text(get.read().replace('drought_thresholds_<model>.npy',
+                                               'thresholds_<model>_<scenario>_16610101-22991231.npy'))
+
+    inputs = stage_inputs(['M1'], ['rcp26'], fldgen_emulator_dir='/emulators', drought_thresholds_dir='/thresholds',
+                          xanthos_template=str(template))
+
+    assert inputs[('M1', 'rcp26')] == ['/emulators/fldgen-M1.rds',
+                                       '/thresholds/thresholds_M1_rcp26_16610101-22991231.npy']
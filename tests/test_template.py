@@ -0,0 +1,53 @@
+import os
+
+import pytest
+
+from cassie.build_xanthos_configs import build_xanthos_configs
+from cassie.template import Template, load_template
+
+
+def test_parse_and_render():
+    template = Template('name = <model>_<scenario>\ndir = <your dir>\nagain = <model>\n', source='test')
+
+    assert template.tags == {'model', 'scenario'}
+    assert template.render({'model': 'M1', 'scenario': 'rcp26', 'unused': 1}) == ('name = M1_rcp26\n'
+                                                                                  'dir = <your dir>\n'
+                                                                                  'again = M1\n')
+
+
+def test_render_values_are_not_rescanned():
+    template = Template('<a><b>')
+
+    assert template.render({'a': '<b>', 'b': 2}) == '<b>2'
+
+
+def test_validate():
+    template = Template('<model> <extra> <other>', source='custom.ini')
+
+    template.validate(['model', 'extra', 'other', 'more'])
+
+    with pytest.raises(ValueError, match=r"'custom.ini' .* <extra>, <other>"):
+        template.validate(['model'])
+
+
+def test_load_template(tmp_path):
+    template_file = tmp_path / 'template.ini'
+    template_file.write_text('model = <model>\n')
+
+    template = load_template(str(template_file), 'xanthos_thorn_abcd_drought_template.ini')
+    assert template.source == str(template_file)
+    assert load_template(template, None) is template
+
+    default = load_template(None, 'xanthos_thorn_abcd_drought_template.ini')
+    assert 'model' in default.tags
+
+
+def test_builder_rejects_unknown_tags(tmp_path):
+    template_file = tmp_path / 'template.ini'
+    template_file.write_text('model = <model>\nmystery = <mystery>\n')
+
+    with pytest.raises(ValueError, match='<mystery>'):
+        build_xanthos_configs(['M1'], ['rcp26'], str(tmp_path), 1, '/root', 'out', '/thresholds',
+                              template=str(template_file))
+
+    assert os.listdir(tmp_path) == ['template.ini']
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from cassie import build_cassandra_configs, build_xanthos_configs
+from cassie.validate import DirectoryIndex, MissingInputError, check_inputs, referenced_paths
+
+
+def make_inputs(root):
+    for directory, name in (('emulators', 'fldgen-M1.rds'), ('tgav', 'fldgen-M1_rcp26.csv.gz'),
+                            ('an2month', 'alpha_M1_rcp26.rds')):
+        os.makedirs(root / directory, exist_ok=True)
+        (root / directory / name).touch()
+
+
+def build(root, output_dir, **kwargs):
+    build_cassandra_configs(['M1'], ['rcp26'], str(output_dir), 2, '/jar', '/dbxml', xanthos_config_dir='/xanthos',
+                            xanthos_pet_model_abbrev='trn', fldgen_emulator_dir=str(root / 'emulators'),
+                            fldgen_tgav_file_dir=str(root / 'tgav'), an2month_file_dir=str(root / 'an2month'),
+                            validate=True, **kwargs)
+
+
+def test_check_inputs(tmp_path):
+    (tmp_path / 'a.txt').touch()
+    index = DirectoryIndex()
+
+    inputs = [('a', str(tmp_path / 'a.txt')), ('b', str(tmp_path / 'b.txt')), ('b again', str(tmp_path / 'b.txt'))]
+
+    assert check_inputs(inputs, index) == [('b', str(tmp_path / 'b.txt'))]
+    assert list(index.directories) == [str(tmp_path)]
+
+
+def test_missing_inputs_stop_the_build(tmp_path):
+    output_dir = tmp_path / 'configs'
+    output_dir.mkdir()
+
+    make_inputs(tmp_path)
+    os.remove(tmp_path / 'tgav' / 'fldgen-M1_rcp26.csv.gz')
+
+    with pytest.raises(MissingInputError) as error:
+        build(tmp_path, output_dir)
+
+    assert error.value.missing == [('Fldgen TGAV file', str(tmp_path / 'tgav' / 'fldgen-M1_rcp26.csv.gz'))]
+    assert os.listdir(output_dir) == []
+
+
+def test_existing_inputs_pass(tmp_path):
+    output_dir = tmp_path / 'configs'
+    output_dir.mkdir()
+
+    make_inputs(tmp_path)
+    build(tmp_path, output_dir)
+
+    assert sorted(os.listdir(output_dir)) == ['M1_rcp26_0.cfg', 'M1_rcp26_1.cfg']
+
+
+def test_xanthos_drought_thresholds(tmp_path):
+    thresholds = tmp_path / 'thresholds'
+    thresholds.mkdir()
+
+    with pytest.raises(MissingInputError, match='drought_thresholds_M1.npy'):
+        build_xanthos_configs(['M1'], ['rcp26'], str(tmp_path), 2, '/xanthos', 'out', str(thresholds),
+                              generate_drought_stats=1, validate=True)
+
+    assert os.listdir(tmp_path) == ['thresholds']
+
+    (thresholds / 'drought_thresholds_M1.npy').touch()
+    build_xanthos_configs(['M1'], ['rcp26'], str(tmp_path), 2, '/xanthos', 'out', str(thresholds),
+                          generate_drought_stats=1, validate=True)
+
+
+def test_referenced_paths():
+    text = 'a = /in/a.npy\n# b = /in/b.npy\nc = "/in/c.npy"\nd = /elsewhere/d.npy\n'
+
+    assert list(referenced_paths(text, ['/in'])) == [('a', '/in/a.npy'), ('c', '/in/c.npy')]
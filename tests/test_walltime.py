@@ -0,0 +1,84 @@
+from cassie.build_job_scripts import build_job_scripts
+from cassie.walltime import estimate_walltimes, format_walltime, parse_walltime, queue_savings, read_runtimes
+
+
+def write_log(log_dir, task, start, end=None, cancelled=None):
+    lines = [f"Started at Mon Jan 06 {start} 2020",
+             f"mpirun -np 3 /cassandra_main.py --mp -v -l /logs/M1_rcp26_{task} /configs/M1_rcp26_{task}.cfg"]
+
+    if cancelled is not None:
+        lines.append(f"slurmstepd: error: *** JOB 7 ON node1 CANCELLED AT 2020-01-06T{cancelled} DUE TO TIME LIMIT ***")
+
+    if end is not None:
+        lines.append(f"Ended at Mon Jan 06 {end} 2020")
+
+    (log_dir / f"100.{task}.out").write_text('\n'.join(lines) + '\n')
+
+
+def test_parse_walltime():
+    assert parse_walltime('90') == 90 * 60
+    assert parse_walltime('1:30:00') == 5400
+    assert parse_walltime('1-12:00:00') == 36 * 3600
+    assert format_walltime(5400) == '01:30:00'
+    assert format_walltime(36 * 3600 + 1) == '1-12:01:00'
+
+
+def test_read_runtimes(tmp_path):
+    write_log(tmp_path, 0, '10:00:00', end='10:20:00')
+    write_log(tmp_path, 1, '10:00:00', cancelled='11:00:00')
+
+    runtimes, killed = read_runtimes(str(tmp_path))
+
+    assert runtimes == [(['M1_rcp26_0'], 1200.0)]
+    assert killed == [(['M1_rcp26_1'], True, 3600.0)]
+
+
+def test_timed_out_runs_raise_the_limit(tmp_path):
+    # nine runs of 20 minutes and one killed at the one hour limit
+    for task in range(9):
+        write_log(tmp_path, task, '10:00:00', end='10:20:00')
+
+    write_log(tmp_path, 9, '10:00:00', cancelled='11:00:00')
+
+    walltimes, report = estimate_walltimes(['M1'], ['rcp26'], str(tmp_path), quantile_level=0.5, margin=0.2)
+
+    # the median alone would give 24 minutes
+    assert parse_walltime(walltimes[('M1', 'rcp26')]) >= 3600 * 1.2
+
+    entry = report['scripts']['M1_rcp26']
+    assert (entry['samples'], entry['killed'], entry['timed_out']) == (9, 1, 1)
+
+
+def test_completed_runs_only(tmp_path):
+    for task in range(4):
+        write_log(tmp_path, task, '10:00:00', end='10:10:00')
+
+    walltimes, report = estimate_walltimes(['M1'], ['rcp26'], str(tmp_path), margin=0.2)
+
+    assert walltimes[('M1', 'rcp26')] == '00:12:00'
+    assert report['scripts']['M1_rcp26']['coverage'] == 1.0
+
+
+def test_queue_savings():
+    savings = queue_savings({('M1', 'rcp26'): '00:15:00'}, '01:00:00', {('M1', 'rcp26'): 4, ('M2', 'rcp26'): 4}, 2)
+
+    assert savings['default'] == 16.0
+    assert savings['estimated'] == 10.0
+    assert savings['saved'] == 6.0
+    assert savings['scripts']['M1_rcp26'] == {'default': 3600, 'estimated': 900, 'reduction': 0.75}
+    assert savings['scripts']['M2_rcp26']['reduction'] == 0
+
+
+def test_build_job_scripts_report(tmp_path):
+    log_dir = tmp_path / 'logs'
+    log_dir.mkdir()
+
+    for task in range(4):
+        write_log(log_dir, task, '10:00:00', end='10:10:00')
+
+    report = build_job_scripts(['M1'], ['rcp26'], str(tmp_path), '/cc', '/cl', '/main', 'acct', runs_per_config=4,
+                               sbatch_ntasks=3, sbatch_nodes=1, walltime_logs=str(log_dir))
+
+    assert report['core_hours']['estimated'] == 4 * 3 * 0.2
+    assert report['queue']['estimated'] == 4 * 0.2
+    assert report['queue']['scripts']['M1_rcp26']['reduction'] == 0.8
@@ -0,0 +1,39 @@
+import filecmp
+import os
+
+import pytest
+
+from cassie.build_cassandra_configs import build_cassandra_configs
+
+MODELS = ['MIROC5', 'GFDL-ESM2M']
+SCENARIOS = ['rcp26', 'rcp85']
+
+
+def build(tmp_path, name, **kwargs):
+    """Build into the same directory each time, since 'crc' mode seeds depend on the full file path, and move the
+    files to `name`."""
+
+    output_dir = str(tmp_path / 'out')
+    os.makedirs(output_dir)
+
+    build_cassandra_configs(MODELS, SCENARIOS, output_dir, 12, '/gcam/ModelInterface.jar', '/gcam/dbxml/lib',
+                            xanthos_config_dir='/xanthos/configs', xanthos_pet_model_abbrev='trn',
+                            xanthos_runoff_model_abbrev='abcd', fldgen_emulator_dir='/fldgen/emulators',
+                            fldgen_tgav_file_dir='/fldgen/tgav', an2month_file_dir='/fldgen/an2month', **kwargs)
+
+    os.rename(output_dir, tmp_path / name)
+
+    return sorted(os.listdir(tmp_path / name))
+
+
+@pytest.mark.parametrize('seed_mode', ['crc', 'unique'])
+def test_native_matches_configobj(tmp_path, seed_mode):
+    native = build(tmp_path, 'native', writer='native', seed_mode=seed_mode)
+    configobj = build(tmp_path, 'configobj', writer='configobj', seed_mode=seed_mode)
+
+    assert native == configobj
+    assert len(native) == len(MODELS) * len(SCENARIOS) * 12
+
+    _, mismatch, errors = filecmp.cmpfiles(tmp_path / 'native', tmp_path / 'configobj', native, shallow=False)
+
+    assert mismatch == [] and errors == []